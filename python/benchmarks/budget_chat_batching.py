@@ -0,0 +1,91 @@
+"""Syscalls and CPU per delivered message with and without micro-batching.
+
+Run with ``python -m benchmarks.budget_chat_batching`` from the python
+directory. Clients and server share this process. `SENDERS` clients send
+`MESSAGES` messages each, one at a time and interleaved, to a room of
+`CLIENTS` clients. Sends counts the ``socket.send`` calls made by the server,
+CPU is the process time of server and clients together per delivery, counting
+the sends adds a little to it.
+"""
+import asyncio
+import logging
+import socket
+import time
+from typing import Set, Tuple
+
+from protohackers.m0003_budget_chat.chat import Chat
+
+CLIENTS = 50
+SENDERS = 10
+MESSAGES = 200
+WINDOWS = (0, 0.001, 0.005)
+
+sends = 0
+server_ports: Set[int] = set()
+original_send = socket.socket.send
+
+
+def counting_send(self: socket.socket, data, *args) -> int:
+    global sends
+    if self.getsockname()[1] in server_ports:
+        sends += 1
+    return original_send(self, data, *args)
+
+
+async def receive(reader: asyncio.StreamReader, lines: int) -> None:
+    while lines > 0:
+        lines -= (await reader.read(65536)).count(b"\n")
+
+
+async def send(writer: asyncio.StreamWriter) -> None:
+    for i in range(MESSAGES):
+        writer.write(b"message %d\n" % i)
+        await asyncio.sleep(0)
+
+
+async def measure(window: float) -> Tuple[float, float]:
+    global sends
+    chat = Chat(queue_size=100_000, flush_window=window)
+    server = await asyncio.start_server(chat.handle, "127.0.0.1", 0)
+    server_ports.add(server.sockets[0].getsockname()[1])
+    clients = []
+    for i in range(CLIENTS):
+        reader, writer = await asyncio.open_connection("127.0.0.1", *server_ports)
+        await reader.readline()
+        writer.write(b"client%d\n" % i)
+        await reader.readline()
+        clients.append((reader, writer))
+    joins = [CLIENTS - i - 1 for i in range(CLIENTS)]
+    await asyncio.gather(*(receive(r, n) for (r, _), n in zip(clients, joins)))
+
+    expected = [
+        SENDERS * MESSAGES - (MESSAGES if i < SENDERS else 0) for i in range(CLIENTS)
+    ]
+    sends = 0
+    start = time.process_time()
+    await asyncio.gather(
+        *(receive(r, n) for (r, _), n in zip(clients, expected)),
+        *(send(writer) for _, writer in clients[:SENDERS]),
+    )
+    cpu = time.process_time() - start
+    for _, writer in clients:
+        writer.close()
+    server.close()
+    server_ports.clear()
+    return sends / sum(expected), cpu / sum(expected)
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    socket.socket.send = counting_send  # type: ignore[method-assign]
+    for window in WINDOWS:
+        per_message, cpu = asyncio.run(measure(window))
+        name = f"{window * 1000:g}ms window" if window else "unbatched"
+        print(
+            f"{name:>14} {per_message:>6.3f} sends/message"
+            f" {cpu * 1e6:>6.2f}us CPU/message"
+        )
+
+
+if __name__ == "__main__":
+    main()
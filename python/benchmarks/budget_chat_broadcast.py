@@ -0,0 +1,99 @@
+"""Broadcast latency of budget chat while one client stops reading.
+
+Run with ``python -m benchmarks.budget_chat_broadcast`` from the python
+directory. One client sends messages one at a time and waits for another
+client to receive each, while the other clients keep reading. Before the
+per-session queues every broadcast waited for the stalled client's drain, so
+latency grew without bound once its socket buffers were full.
+"""
+import asyncio
+import logging
+import socket
+import statistics
+import time
+from typing import List, Optional, Tuple
+
+from protohackers.m0003_budget_chat.chat import SLOW_POLICIES, Chat
+
+READERS = 20
+MESSAGES = 10000
+PAYLOAD = b"x" * 1000
+
+
+async def join(port: int, name: str):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    await reader.readline()
+    writer.write(name.encode() + b"\n")
+    await reader.readline()
+    return reader, writer
+
+
+async def drain_forever(reader: asyncio.StreamReader) -> None:
+    while await reader.read(65536):
+        pass
+
+
+def stalled_client(port: int) -> socket.socket:
+    # A client with a small receive buffer that joins and never reads again
+    sock = socket.socket()
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    sock.connect(("127.0.0.1", port))
+    sock.recv(1024)
+    sock.sendall(b"stalled\n")
+    return sock
+
+
+async def measure(policy: str, stall: bool) -> Tuple[List[float], str]:
+    chat = Chat(policy=policy)
+    server = await asyncio.start_server(chat.handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    stalled: Optional[socket.socket] = None
+    if stall:
+        stalled = await asyncio.to_thread(stalled_client, port)
+    probe_reader, probe_writer = await join(port, "probe")
+    readers = [await join(port, f"reader{i}") for i in range(READERS)]
+    tasks = [asyncio.create_task(drain_forever(reader)) for reader, _ in readers]
+    sender_reader, sender_writer = await join(port, "sender")
+    while b"sender" not in await probe_reader.readline():
+        pass
+
+    latencies = []
+    for i in range(MESSAGES):
+        start = time.perf_counter()
+        sender_writer.write(b"%d %s\n" % (i, PAYLOAD))
+        await probe_reader.readline()
+        latencies.append(time.perf_counter() - start)
+
+    session = chat.sessions.get("stalled")
+    state = f"{len(session.outbox)} queued for it" if session else "disconnected"
+    for task in tasks:
+        task.cancel()
+    for _, writer in [*readers, (probe_reader, probe_writer)]:
+        writer.close()
+    sender_writer.close()
+    if stalled:
+        stalled.close()
+    server.close()
+    return latencies, state if stall else ""
+
+
+def report(name: str, latencies: List[float], state: str) -> None:
+    last = statistics.mean(latencies[-100:]) * 1e6
+    latencies = sorted(latencies)
+    median = statistics.median(latencies) * 1e6
+    p99 = latencies[int(len(latencies) * 0.99)] * 1e6
+    print(
+        f"{name:>24} p50 {median:>6.0f}us p99 {p99:>6.0f}us"
+        f" last 100 {last:>6.0f}us {state}"
+    )
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    report("no stalled client", *asyncio.run(measure("disconnect", False)))
+    for policy in SLOW_POLICIES:
+        report(f"stalled, {policy}", *asyncio.run(measure(policy, True)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Broadcast cost in budget chat, encoding once against once per recipient.
+
+Run with ``python -m benchmarks.budget_chat_encode`` from the python directory.
+Sessions write to in-memory writers and traffic logging goes to
+``os.devnull`` through the queue listener. Buffers counts the distinct
+``bytes`` objects handed to the writers per broadcast.
+"""
+import asyncio
+import atexit
+import contextlib
+import os
+import time
+from typing import List, Optional, Tuple, Type
+
+from protohackers.log import setup_logging
+from protohackers.m0003_budget_chat.chat import Chat, traffic
+
+MESSAGES = 200_000  # Recipient writes per measurement
+
+
+class MemoryWriter:
+    def __init__(self) -> None:
+        self.written: List[bytes] = []
+        self.keep = False
+
+    def write(self, data: bytes) -> None:
+        if self.keep:
+            self.written.append(data)
+
+    def writelines(self, data: List[bytes]) -> None:
+        for buffer in data:
+            self.write(buffer)
+
+    async def drain(self) -> None:
+        pass
+
+
+class PerRecipientChat(Chat):
+    # Chat.send before encoding once, encoding and logging for every session
+    def send(self, template: str, *args, name: Optional[str] = None):
+        message = template.format(*args)
+        for session in self.sessions.values():
+            if name and name == session.name:
+                continue
+            session.send(bytes(message, encoding="ascii"))
+            traffic.info("%s --> %s: %r", session.uuid, session.name, message)
+
+
+async def measure(chat_type: Type[Chat], users: int) -> Tuple[float, float]:
+    chat = chat_type(queue_size=MESSAGES)
+    writers = [MemoryWriter() for _ in range(users)]
+    for i, writer in enumerate(writers):
+        session = await chat.Session.create(None, writer, f"{i}", MESSAGES)
+        session.name = f"user{i}"
+        chat.sessions[session.name] = session
+
+    for writer in writers:
+        writer.keep = True
+    for i in range(10):
+        chat.send(chat.message, "user0", f"message {i}", name="user0")
+    await asyncio.sleep(0)
+    buffers = {id(data) for writer in writers for data in writer.written}
+    for writer in writers:
+        writer.keep = False
+
+    broadcasts = MESSAGES // users
+    start = time.perf_counter()
+    for i in range(broadcasts):
+        chat.send(chat.message, "user0", f"message {i}", name="user0")
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+    for session in chat.sessions.values():
+        await session.close()
+    return len(buffers) / 10, broadcasts / elapsed
+
+
+def main():
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        listener = setup_logging()
+        results = []
+        chats = (("per recipient", PerRecipientChat), ("once", Chat))
+        for users in (10, 100, 1000):
+            for name, chat_type in chats:
+                buffers, rate = asyncio.run(measure(chat_type, users))
+                results.append((users, name, buffers, rate))
+        atexit.unregister(listener.stop)
+        listener.stop()
+    for users, name, buffers, rate in results:
+        print(
+            f"{users:>5} users {name:>14} {buffers:>6.0f} buffers/broadcast"
+            f" {rate:>10,.0f} broadcasts/s {rate * (users - 1):>12,.0f} writes/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
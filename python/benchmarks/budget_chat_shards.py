@@ -0,0 +1,90 @@
+"""Load test of budget chat with a growing number of worker processes.
+
+Run with ``python -m benchmarks.budget_chat_shards`` from the python directory.
+Starts the server on port 10007 with each worker count, connects `CLIENTS`
+clients from this process and has `SENDERS` of them send `MESSAGES` messages
+each, timing until every client received every message. The queues are large
+enough for the bursts so no client is disconnected. One worker runs the
+single process server without a hub. Scaling needs more free cores than
+workers, the client load shares them too.
+"""
+import asyncio
+import socket
+import subprocess  # nosec
+import sys
+import time
+
+CLIENTS = 100
+SENDERS = 10
+MESSAGES = 200
+WORKERS = (1, 2, 4)
+SERVER = (
+    "import sys; from protohackers.m0003_budget_chat import main; "
+    "sys.argv = ['budget_chat', '--no-traffic-log', '--queue-size', '100000',"
+    " '-w', sys.argv[1]]; main()"
+)
+
+
+def wait_for_server() -> None:
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", 10007)).close()
+            return
+        except ConnectionRefusedError:
+            time.sleep(0.1)
+    raise TimeoutError("Server did not start")
+
+
+async def receive(reader: asyncio.StreamReader, lines: int) -> None:
+    while lines > 0:
+        data = await reader.read(65536)
+        if not data:
+            raise ConnectionError("Server closed the connection")
+        lines -= data.count(b"\n")
+
+
+async def measure() -> float:
+    clients = []
+    for i in range(CLIENTS):
+        reader, writer = await asyncio.open_connection("127.0.0.1", 10007)
+        await reader.readline()
+        writer.write(b"client%d\n" % i)
+        await reader.readline()
+        clients.append((reader, writer))
+    # Let the join announcements arrive before timing
+    joins = [CLIENTS - i - 1 for i in range(CLIENTS)]
+    await asyncio.gather(*(receive(r, n) for (r, _), n in zip(clients, joins)))
+
+    expected = [
+        SENDERS * MESSAGES - (MESSAGES if i < SENDERS else 0) for i in range(CLIENTS)
+    ]
+    start = time.perf_counter()
+    receivers = [receive(r, n) for (r, _), n in zip(clients, expected)]
+    for _, writer in clients[:SENDERS]:
+        writer.write(b"".join(b"message %d\n" % i for i in range(MESSAGES)))
+    await asyncio.gather(*receivers)
+    elapsed = time.perf_counter() - start
+    for _, writer in clients:
+        writer.close()
+    return sum(expected) / elapsed
+
+
+def main():
+    for workers in WORKERS:
+        server = subprocess.Popen(  # nosec
+            [sys.executable, "-c", SERVER, str(workers)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_for_server()
+            rate = asyncio.run(measure())
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"{workers} workers {rate:>12,.0f} deliveries/s")
+        time.sleep(0.5)
+
+
+if __name__ == "__main__":
+    main()
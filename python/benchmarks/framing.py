@@ -0,0 +1,97 @@
+"""Line framing throughput of LineFramer against the approaches it replaces.
+
+Run with ``python -m benchmarks.framing`` from the python directory.
+"""
+import asyncio
+import io
+import time
+from typing import Callable, List
+
+from protohackers.framing import LineFramer, readline
+
+CHUNK = 8192
+LINES = 100_000
+
+
+def make_chunks() -> List[bytes]:
+    data = b"".join(b'{"method":"isPrime","number":%d}\n' % i for i in range(LINES))
+    return [data[i : i + CHUNK] for i in range(0, len(data), CHUNK)]
+
+
+def concatenate(chunks: List[bytes]) -> int:
+    # ThreadedTCPRequestHandler.handle before the framer
+    count, data, start = 0, b"", 0
+    for chunk in chunks:
+        data += chunk
+        end = data.find(b"\n", start)
+        while end != -1:
+            count += len(data[start:end]) >= 0
+            start = end + 1
+            end = data.find(b"\n", start)
+    return count
+
+
+def byte_at_a_time(chunks: List[bytes]) -> int:
+    # Session.receive in insecure sockets layer before the framer
+    stream, count, line = io.BytesIO(b"".join(chunks)), 0, ""
+    while char := stream.read(1):
+        if char == b"\n":
+            count, line = count + 1, ""
+        else:
+            line += char.decode(encoding="ascii")
+    return count
+
+
+def stream_readline(chunks: List[bytes]) -> int:
+    async def read() -> int:
+        reader, count = asyncio.StreamReader(), 0
+        for chunk in chunks:
+            reader.feed_data(chunk)
+        reader.feed_eof()
+        while await reader.readline():
+            count += 1
+        return count
+
+    return asyncio.run(read())
+
+
+def framer_lines(chunks: List[bytes]) -> int:
+    framer, count = LineFramer(), 0
+    for chunk in chunks:
+        framer.feed(chunk)
+        for _ in framer.lines():
+            count += 1
+    return count
+
+
+def framer_readline(chunks: List[bytes]) -> int:
+    async def read() -> int:
+        reader, framer, count = asyncio.StreamReader(), LineFramer(), 0
+        for chunk in chunks:
+            reader.feed_data(chunk)
+        reader.feed_eof()
+        while await readline(reader, framer, keepends=True):
+            count += 1
+        return count
+
+    return asyncio.run(read())
+
+
+def measure(name: str, func: Callable[[List[bytes]], int], chunks: List[bytes]):
+    start = time.perf_counter()
+    count = func(chunks)
+    elapsed = time.perf_counter() - start
+    print(f"{name:>28} {count / elapsed:>14,.0f} lines/s")
+
+
+def main():
+    chunks = make_chunks()
+    measure("bytes concatenation", concatenate, chunks)
+    measure("byte at a time", byte_at_a_time, chunks[: len(chunks) // 10])
+    measure("StreamReader.readline", stream_readline, chunks)
+    measure("LineFramer.lines", framer_lines, chunks)
+    measure("framing.readline", framer_readline, chunks)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""CPU use of the line reversal server holding idle sessions.
+
+Run with ``python -m benchmarks.line_reversal_idle`` from the python
+directory. The server runs in its own process without traffic logging or
+asyncio debug mode. `SESSIONS` sessions connect, send a line and acknowledge
+its reversal, then the server's CPU time is read from ``/proc`` (Linux only)
+over `WINDOW` seconds. One more session never acknowledges, to time its
+retransmissions.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from multiprocessing.connection import Connection
+from typing import Dict, List
+
+from protohackers.m0007_line_reversal.line_reversal import LineReversalProtocol
+
+SESSIONS = 10_000
+BATCH = 200
+WINDOW = 10.0
+
+spawn = multiprocessing.get_context("spawn")
+
+
+def serve(ready: Connection) -> None:
+    async def main():
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(
+            LineReversalProtocol, local_addr=("127.0.0.1", 0)
+        )
+        ready.send(transport.get_extra_info("sockname")[1])
+        await asyncio.sleep(3600)
+
+    logging.disable(logging.CRITICAL)
+    asyncio.run(main())
+
+
+def cpu_seconds(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as stat:
+        fields = stat.read().rpartition(")")[2].split()
+    # utime and stime, fields 14 and 15 counting from the pid
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+class Client(asyncio.DatagramProtocol):
+    def __init__(self) -> None:
+        self.transport: asyncio.DatagramTransport
+        self.acknowledged: set = set()
+        self.retransmits: Dict[str, List[float]] = {}
+
+    def connection_made(self, transport) -> None:
+        self.transport = transport  # type: ignore[assignment]
+
+    def datagram_received(self, data: bytes, address) -> None:
+        kind, session, *_ = data.decode().split("/")[1:]
+        if kind != "data":
+            return
+        if session in self.retransmits:
+            self.retransmits[session].append(time.perf_counter())
+        else:
+            self.transport.sendto(f"/ack/{session}/6/".encode())
+            self.acknowledged.add(session)
+
+
+async def load(port: int) -> List[float]:
+    loop = asyncio.get_running_loop()
+    transport, client = await loop.create_datagram_endpoint(
+        Client, remote_addr=("127.0.0.1", port)
+    )
+    while len(client.acknowledged) < SESSIONS:
+        # Sessions whose line or ack was dropped are sent again
+        missing = [s for s in range(SESSIONS) if str(s) not in client.acknowledged]
+        for start in range(0, len(missing), BATCH):
+            for session in missing[start : start + BATCH]:
+                transport.sendto(f"/connect/{session}/".encode())
+                transport.sendto(f"/data/{session}/0/hello\n/".encode())
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.5)
+    timed = str(SESSIONS)
+    client.retransmits[timed] = [time.perf_counter()]
+    transport.sendto(f"/connect/{timed}/".encode())
+    transport.sendto(f"/data/{timed}/0/hello\n/".encode())
+    await asyncio.sleep(7)
+    transport.close()
+    times = client.retransmits[timed]
+    return [b - a for a, b in zip(times[1:], times[2:])]
+
+
+def main():
+    receiver, sender = spawn.Pipe(duplex=False)
+    server = spawn.Process(target=serve, args=(sender,), daemon=True)
+    server.start()
+    port = receiver.recv()
+    try:
+        retransmits = asyncio.run(load(port))
+        before = cpu_seconds(server.pid)
+        time.sleep(WINDOW)
+        used = cpu_seconds(server.pid) - before
+    finally:
+        server.terminate()
+    print(f"{SESSIONS:,} idle sessions: {used / WINDOW:.2%} CPU")
+    intervals = ", ".join(f"{interval:.3f}s" for interval in retransmits)
+    print(f"retransmitted after {intervals}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Messages per second of a means to an end session under each logging setup.
+
+Run with ``python -m benchmarks.logging_throughput`` from the python directory.
+Log output goes to ``os.devnull``. The queued setups are timed until the
+session is answered, the time the listener thread then needs to write out the
+backlog is printed separately.
+"""
+import asyncio
+import atexit
+import contextlib
+import logging
+import logging.config
+import logging.handlers
+import os
+import random
+import struct
+import time
+from typing import Callable, Optional
+
+from protohackers import logging_config
+from protohackers.log import setup_logging
+from protohackers.m0002_means_to_an_end import price
+
+INSERTS = 50_000
+QUERIES = 1000
+
+
+def session(rng: random.Random) -> bytes:
+    times = sorted(rng.sample(range(-(2**31), 2**31 - 1), INSERTS))
+    messages = [struct.pack(">cii", b"I", t, t & 0xFFFF) for t in times]
+    for _ in range(QUERIES):
+        min_time, max_time = sorted(rng.sample(times, 2))
+        messages.append(struct.pack(">cii", b"Q", min_time, max_time))
+    return b"".join(messages)
+
+
+async def measure(data: bytes) -> float:
+    server = await asyncio.start_server(price.handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    start = time.perf_counter()
+    writer.write(data)
+    await reader.readexactly(QUERIES * 4)
+    elapsed = time.perf_counter() - start
+    writer.close()
+    server.close()
+    await server.wait_closed()
+    return (INSERTS + QUERIES) / elapsed
+
+
+def synchronous() -> None:
+    # Handlers writing from the event loop, like before the queue
+    logging.config.dictConfig(logging_config)
+
+
+def run(name: str, configure: Callable[[], Optional[object]], data: bytes):
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        listener = configure()
+        rate = asyncio.run(measure(data))
+        start = time.perf_counter()
+        if isinstance(listener, logging.handlers.QueueListener):
+            atexit.unregister(listener.stop)
+            listener.stop()
+        drained = time.perf_counter() - start
+    print(f"{name:>20} {rate:>12,.0f} messages/s, {drained:.2f}s to drain")
+
+
+def main():
+    data = session(random.Random(3))
+    run("synchronous", synchronous, data)
+    run("queued, traffic on", lambda: setup_logging(True), data)
+    run("queued, traffic off", lambda: setup_logging(False), data)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Inserts and range-mean queries per second of PriceStore against a dict.
+
+Run with ``python -m benchmarks.means_to_an_end`` from the python directory.
+"""
+import random
+import time
+from typing import Dict, List, Tuple
+
+from protohackers.m0002_means_to_an_end.store import PriceStore
+
+# Queries run right after the inserts, so they include building the lazily
+# computed prefix sums of the blocks they touch
+QUERIES = 2000
+# The dict filters every key per query, so it is only measured up to here
+DICT_LIMIT = 100_000
+
+
+def dict_mean(prices: Dict[int, int], min_time: int, max_time: int) -> int:
+    # query() before PriceStore
+    keys = list(filter(lambda x: x >= min_time and x <= max_time, prices.keys()))
+    if not keys:
+        return 0
+    return int(sum([prices[key] for key in keys]) / len(keys))
+
+
+def workload(size: int, rng: random.Random) -> Tuple[List[int], List[Tuple[int, int]]]:
+    times = rng.sample(range(-(2**31), 2**31 - 1), size)
+    queries = [tuple(sorted(rng.sample(times, 2))) for _ in range(QUERIES)]
+    return times, queries  # type: ignore[return-value]
+
+
+def rate(count: int, start: float) -> str:
+    return f"{count / (time.perf_counter() - start):>12,.0f}"
+
+
+def main():
+    rng = random.Random(2)
+    print(f"{'entries':>9} {'store inserts/s':>16} {'store queries/s':>16}", end="")
+    print(f" {'dict inserts/s':>15} {'dict queries/s':>15}")
+    for size in (10**3, 10**4, 10**5, 10**6):
+        times, queries = workload(size, rng)
+
+        start = time.perf_counter()
+        store = PriceStore()
+        for timestamp in times:
+            store.insert(timestamp, timestamp & 0xFFFF)
+        inserts = rate(size, start)
+        start = time.perf_counter()
+        for min_time, max_time in queries:
+            store.mean(min_time, max_time)
+        print(f"{size:>9} {inserts:>16} {rate(QUERIES, start):>16}", end="")
+
+        if size > DICT_LIMIT:
+            print(f" {'-':>15} {'-':>15}")
+            continue
+        start = time.perf_counter()
+        prices: Dict[int, int] = {}
+        for timestamp in times:
+            prices[timestamp] = timestamp & 0xFFFF
+        inserts = rate(size, start)
+        start = time.perf_counter()
+        for min_time, max_time in queries[: QUERIES // 10]:
+            dict_mean(prices, min_time, max_time)
+        print(f" {inserts:>15} {rate(QUERIES // 10, start):>15}")
+
+
+if __name__ == "__main__":
+    main()
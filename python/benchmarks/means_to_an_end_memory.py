@@ -0,0 +1,62 @@
+"""Bytes per stored price of a session, before and after compact storage.
+
+Run with ``python -m benchmarks.means_to_an_end_memory`` from the python
+directory.
+"""
+import random
+import tracemalloc
+from typing import Callable, Dict, List
+
+from protohackers.m0002_means_to_an_end.store import CompactPriceStore, PriceStore
+
+SIZES = (1000, 10_000, 100_000)
+
+
+def fill_dict(times: List[int]) -> Dict[int, int]:
+    # The session dict before PriceStore
+    prices: Dict[int, int] = {}
+    for time in times:
+        prices[time] = time >> 8
+    return prices
+
+
+def fill(store: Callable) -> Callable[[List[int]], object]:
+    def insert(times: List[int]):
+        prices = store()
+        for time in times:
+            prices.insert(time, time >> 8)
+        prices.mean(times[0], times[-1])
+        return prices
+
+    return insert
+
+
+def allocated(func: Callable[[List[int]], object], times: List[int]) -> int:
+    tracemalloc.start()
+    kept = func(times)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return size
+
+
+def main():
+    rng = random.Random(5)
+    stores = {
+        "dict": fill_dict,
+        "indexed": fill(PriceStore),
+        "compact": fill(CompactPriceStore),
+    }
+    print("bytes allocated per stored price")
+    print(f"{'prices':>8} {'order':>8}", *(f"{name:>10}" for name in stores))
+    for size in SIZES:
+        for order in ("sorted", "random"):
+            times = rng.sample(range(-(2**31), 2**31 - 1), size)
+            if order == "sorted":
+                times.sort()
+            per_price = (allocated(func, times) / size for func in stores.values())
+            print(f"{size:>8} {order:>8}", *(f"{value:>10.1f}" for value in per_price))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Messages per second of a bulk-insert session, batched against per-message.
+
+Run with ``python -m benchmarks.means_to_an_end_session`` from the python
+directory. Logging is turned off, the per-message handler still formats its
+log messages eagerly like it did before.
+"""
+import asyncio
+import logging
+import random
+import struct
+import time
+
+from protohackers.m0002_means_to_an_end import price
+from protohackers.m0002_means_to_an_end.store import PriceStore
+
+INSERTS = 200_000
+QUERIES = 1000
+
+
+async def insert(data: bytes, prices: PriceStore) -> PriceStore:
+    time = int.from_bytes(data[:4], "big", signed=True)
+    value = int.from_bytes(data[4:], "big", signed=True)
+    price.logger.info(f"Inserting: '{time}: {value}'")
+    prices.insert(time, value)
+    return prices
+
+
+async def query(data: bytes, prices: PriceStore) -> bytes:
+    min_time = int.from_bytes(data[:4], "big", signed=True)
+    max_time = int.from_bytes(data[4:], "big", signed=True)
+    price.logger.info(f"Querying: '{min_time}' to '{max_time}'")
+    return price.query(min_time, max_time, prices)
+
+
+async def per_message(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    # handle() before batched decoding, with the same store
+    prices = PriceStore()
+    try:
+        while data := await reader.readexactly(price.LENGTH):
+            price.logger.debug(f"Processing: {data}")
+            match data[0]:
+                case 73:  # I
+                    prices = await insert(data[1:], prices)
+                case 81:  # Q
+                    writer.write(await query(data[1:], prices))
+                    await writer.drain()
+    except asyncio.IncompleteReadError:
+        pass
+    writer.close()
+
+
+def session(rng: random.Random) -> bytes:
+    # Bulk loads mostly arrive in timestamp order
+    times = sorted(rng.sample(range(-(2**31), 2**31 - 1), INSERTS))
+    messages = [struct.pack(">cii", b"I", t, t & 0xFFFF) for t in times]
+    for _ in range(QUERIES):
+        min_time, max_time = sorted(rng.sample(times, 2))
+        messages.append(struct.pack(">cii", b"Q", min_time, max_time))
+    return b"".join(messages)
+
+
+async def measure(handle, data: bytes) -> float:
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    start = time.perf_counter()
+    writer.write(data)
+    await reader.readexactly(QUERIES * 4)
+    elapsed = time.perf_counter() - start
+    writer.close()
+    server.close()
+    await server.wait_closed()
+    return (INSERTS + QUERIES) / elapsed
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    data = session(random.Random(3))
+    before = asyncio.run(measure(per_message, data))
+    after = asyncio.run(measure(price.handle, data))
+    print(f"{'per message':>12} {before:>12,.0f} messages/s")
+    print(f"{'batched':>12} {after:>12,.0f} messages/s ({after / before:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""CPU per line of the mob in the middle address rewrite.
+
+Run with ``python -m benchmarks.mob_in_the_middle`` from the python directory.
+The lines look like budget chat traffic, one in `ADDRESS_EVERY` of them
+carries a Boguscoin address. The str based rewrite it replaced is measured
+awaited from a coroutine, the way ``forward`` called it.
+"""
+import asyncio
+import random
+import re
+import time
+from typing import List
+
+from protohackers.m0005_mob_in_the_middle.mob import replace
+
+LINES = 200_000
+ADDRESS_EVERY = 10
+NAMES = ["alice", "bob", "carol", "dave", "mallory"]
+CHATTER = [
+    "Hi everyone, how is it going?",
+    "Has anyone got some Boguscoin to spare for a pizza?",
+    "* The room contains: alice, bob, carol",
+    "I will pay you back tomorrow, promise.",
+    "ok",
+]
+
+old_pattern = re.compile(r"(?:(?<=\s)|(?<=^))(7[a-zA-Z0-9]{25,36})(?:(?=\s)|(?=$))")
+
+
+async def old_replace(data: bytes) -> bytes:
+    message = data.decode(encoding="ascii")
+    matches = re.findall(old_pattern, message)
+    for match in matches:
+        message = message.replace(match, "7YWHMfk9JZe0LM0g1ZauHuiSxhI")
+    return message.encode(encoding="ascii")
+
+
+def chat_lines() -> List[bytes]:
+    rng = random.Random(0)
+    alphanumeric = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+    lines = []
+    for i in range(LINES):
+        message = rng.choice(CHATTER)
+        if i % ADDRESS_EVERY == 0:
+            length = rng.randint(25, 34)
+            address = "7" + "".join(rng.choice(alphanumeric) for _ in range(length))
+            message = f"Send it to {address} please"
+        lines.append(bytes(f"[{rng.choice(NAMES)}] {message}\n", encoding="ascii"))
+    return lines
+
+
+async def measure_old(lines: List[bytes]) -> float:
+    start = time.process_time()
+    for line in lines:
+        await old_replace(line)
+    return (time.process_time() - start) / len(lines)
+
+
+def measure_new(lines: List[bytes]) -> float:
+    start = time.process_time()
+    for line in lines:
+        replace(line)
+    return (time.process_time() - start) / len(lines)
+
+
+def main():
+    lines = chat_lines()
+    old = asyncio.run(measure_old(lines))
+    new = measure_new(lines)
+    print(f"{'str, awaited':>14} {old * 1e9:>6.0f}ns CPU/line")
+    print(f"{'bytes re.sub':>14} {new * 1e9:>6.0f}ns CPU/line {old / new:.2f}x faster")
+
+
+if __name__ == "__main__":
+    main()
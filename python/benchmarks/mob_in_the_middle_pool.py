@@ -0,0 +1,78 @@
+"""Session setup latency of the mob in the middle with an upstream pool.
+
+Run with ``python -m benchmarks.mob_in_the_middle_pool`` from the python
+directory. Proxy, clients and a stand-in upstream share this process. The
+upstream waits `LATENCY` before its greeting, standing in for the round trips
+to the real chat server. Setup is the time from a client connecting to the
+proxy until it reads the greeting, for `SESSIONS` sessions arriving every
+`ARRIVAL` seconds.
+"""
+import asyncio
+import functools
+import logging
+import statistics
+import time
+
+from protohackers.m0005_mob_in_the_middle.mob import local_handle
+from protohackers.m0005_mob_in_the_middle.pool import UpstreamPool
+from protohackers.m0005_mob_in_the_middle.stats import Stats
+
+LATENCY = 0.02
+SESSIONS = 200
+ARRIVAL = 0.005
+POOL_SIZES = (0, 2, 8)
+
+
+async def upstream(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    await asyncio.sleep(LATENCY)
+    writer.write(b"Welcome to budgetchat! What shall I call you?\n")
+    await reader.read()
+    writer.close()
+
+
+async def session(port: int) -> float:
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    await reader.readline()
+    elapsed = time.perf_counter() - start
+    writer.close()
+    return elapsed
+
+
+async def measure(size: int):
+    server = await asyncio.start_server(upstream, "127.0.0.1", 0)
+    pool = UpstreamPool("127.0.0.1", server.sockets[0].getsockname()[1], size)
+    pool.start()
+    await asyncio.sleep(LATENCY * 2)
+    proxy = await asyncio.start_server(
+        functools.partial(local_handle, pool=pool, stats=Stats()), "127.0.0.1", 0
+    )
+    port = proxy.sockets[0].getsockname()[1]
+    sessions = []
+    for _ in range(SESSIONS):
+        sessions.append(asyncio.create_task(session(port)))
+        await asyncio.sleep(ARRIVAL)
+    setups = sorted(await asyncio.gather(*sessions))
+    metrics = pool.metrics()
+    pool.close()
+    proxy.close()
+    server.close()
+    return setups, metrics
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    for size in POOL_SIZES:
+        setups, metrics = asyncio.run(measure(size))
+        hits = metrics["hits_total"] / (metrics["hits_total"] + metrics["misses_total"])
+        print(
+            f"pool {size:>2}"
+            f" {statistics.median(setups) * 1000:>6.2f}ms median"
+            f" {setups[int(len(setups) * 0.99)] * 1000:>6.2f}ms p99 setup"
+            f" {hits:>4.0%} hits"
+            f" {metrics['connect_ms_mean']:>5.2f}ms mean connect"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""Throughput and memory of the mob in the middle relays.
+
+Run with ``python -m benchmarks.mob_in_the_middle_relay`` from the python
+directory. The proxy and a stand-in upstream each run in their own process
+without traffic logging or asyncio debug mode. Throughput sends `TOTAL` bytes
+of chat lines, one in `ADDRESS_EVERY` with an address, or of lines of
+`LONG_LINE` bytes, through the proxy to an upstream counting them. Memory
+opens `CONNECTIONS` sessions that each send a `LONG_LINE` line to an upstream
+that never reads, and divides the growth of the proxy's RSS between them.
+Servers are spawned rather than forked so they start without the pages of
+this process.
+"""
+import asyncio
+import functools
+import logging
+import multiprocessing
+import time
+from multiprocessing.connection import Connection
+
+from protohackers.m0005_mob_in_the_middle.mob import local_handle
+from protohackers.m0005_mob_in_the_middle.pool import UpstreamPool
+from protohackers.m0005_mob_in_the_middle.relay import ClientLeg
+from protohackers.m0005_mob_in_the_middle.stats import Stats
+
+TOTAL = 20_000_000
+ADDRESS_EVERY = 10
+LONG_LINE = 4_000_000
+CONNECTIONS = 50
+METHODS = ("streams", "protocol")
+
+spawn = multiprocessing.get_context("spawn")
+
+
+def serve_upstream(stall: bool, ready: Connection, results: Connection) -> None:
+    async def handle(reader, writer):
+        writer.write(b"Welcome to budgetchat! What shall I call you?\n")
+        if stall:
+            await asyncio.sleep(3600)
+        received = 0
+        while data := await reader.read(262144):
+            received += len(data)
+        results.send(received)
+        writer.close()
+
+    async def serve():
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        ready.send(server.sockets[0].getsockname()[1])
+        await server.serve_forever()
+
+    logging.disable(logging.CRITICAL)
+    asyncio.run(serve())
+
+
+def serve_proxy(method: str, upstream: int, ready: Connection) -> None:
+    async def serve():
+        pool = UpstreamPool("127.0.0.1", upstream, size=0)
+        stats = Stats()
+        if method == "protocol":
+            loop = asyncio.get_running_loop()
+            server = await loop.create_server(
+                lambda: ClientLeg(pool, stats), "127.0.0.1", 0
+            )
+        else:
+            server = await asyncio.start_server(
+                functools.partial(local_handle, pool=pool, stats=stats),
+                "127.0.0.1",
+                0,
+            )
+        ready.send(server.sockets[0].getsockname()[1])
+        await server.serve_forever()
+
+    logging.disable(logging.CRITICAL)
+    asyncio.run(serve())
+
+
+def rss(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    raise RuntimeError("No VmRSS")
+
+
+def start(method: str, stall: bool):
+    receiver, sender = spawn.Pipe(duplex=False)
+    results, result_sender = spawn.Pipe(duplex=False)
+    upstream = spawn.Process(
+        target=serve_upstream, args=(stall, sender, result_sender)
+    )
+    upstream.start()
+    proxy = spawn.Process(
+        target=serve_proxy, args=(method, receiver.recv(), sender)
+    )
+    proxy.start()
+    return receiver.recv(), results, (upstream, proxy)
+
+
+def stop(processes) -> None:
+    for process in processes:
+        process.terminate()
+        process.join()
+
+
+def chat(total: int) -> bytes:
+    lines = []
+    size = 0
+    while size < total:
+        if len(lines) % ADDRESS_EVERY == 0:
+            line = b"[alice] Send it to 7F1u3wSD5RbOHQmupo9nx4TnhQ please\n"
+        else:
+            line = b"[bob] Has anyone got some Boguscoin to spare for a pizza?\n"
+        lines.append(line)
+        size += len(line)
+    return b"".join(lines)
+
+
+def long_lines(total: int) -> bytes:
+    line = b"x" * (LONG_LINE - 1) + b"\n"
+    return line * (total // LONG_LINE)
+
+
+def throughput(method: str, data: bytes) -> float:
+    async def send(port: int):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        await reader.readline()
+        for offset in range(0, len(data), 65536):
+            writer.write(data[offset : offset + 65536])
+            await writer.drain()
+        writer.write_eof()
+
+    port, results, processes = start(method, stall=False)
+    begin = time.perf_counter()
+    asyncio.run(send(port))
+    received = results.recv()
+    elapsed = time.perf_counter() - begin
+    stop(processes)
+    assert received >= len(data) * 0.99  # nosec
+    return len(data) / elapsed / 1e6
+
+
+def memory(method: str) -> float:
+    async def sessions(port: int, proxy: int) -> int:
+        clients = []
+        for _ in range(CONNECTIONS):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            await reader.readline()
+            clients.append(writer)
+        before = rss(proxy)
+        for writer in clients:
+            writer.write(b"x" * LONG_LINE)
+        await asyncio.sleep(2)
+        grown = rss(proxy) - before
+        for writer in clients:
+            writer.transport.abort()
+        return grown
+
+    port, _, processes = start(method, stall=True)
+    grown = asyncio.run(sessions(port, processes[1].pid))
+    stop(processes)
+    return grown / CONNECTIONS / 1024
+
+
+def main():
+    for method in METHODS:
+        print(
+            f"{method:>9}"
+            f" {throughput(method, chat(TOTAL)):>6.1f}MB/s chat"
+            f" {throughput(method, long_lines(TOTAL)):>6.1f}MB/s long lines"
+            f" {memory(method):>7.0f}KiB RSS/stalled session"
+        )
+
+
+if __name__ == "__main__":
+    main()
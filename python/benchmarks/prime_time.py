@@ -0,0 +1,48 @@
+"""Per-request cost of primality checks as the digit count grows.
+
+Run with ``python -m benchmarks.prime_time`` from the python directory.
+"""
+import math
+import random
+import timeit
+
+from protohackers.m0001_prime_time.primality import is_prime
+
+# Trial division takes minutes past this many digits
+TRIAL_DIVISION_DIGITS = 12
+
+
+def trial_division(num: int) -> bool:
+    if num < 2:
+        return False
+    for i in range(2, int(math.sqrt(num)) + 1):
+        if (num % i) == 0:
+            return False
+    return True
+
+
+def random_prime(digits: int, rng: random.Random) -> int:
+    while True:
+        num = rng.randrange(10 ** (digits - 1), 10**digits) | 1
+        if is_prime(num):
+            return num
+
+
+def per_call(func, num: int, number: int) -> float:
+    return min(timeit.repeat(lambda: func(num), number=number, repeat=3)) / number
+
+
+def main():
+    rng = random.Random(8)
+    print(f"{'digits':>6} {'engine (us)':>12} {'trial division (us)':>20}")
+    for digits in (4, 8, 12, 16, 20, 40, 80, 160, 320):
+        prime = random_prime(digits, rng)
+        engine = per_call(is_prime, prime, 200) * 1e6
+        trial = "-"
+        if digits <= TRIAL_DIVISION_DIGITS:
+            trial = f"{per_call(trial_division, prime, 1) * 1e6:.1f}"
+        print(f"{digits:>6} {engine:>12.1f} {trial:>20}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Packets per second of the unusual database program servers.
+
+Run with ``python -m benchmarks.unusual_database_program`` from the python
+directory. Each server runs in its own process without traffic logging or
+asyncio debug mode. The client sends windows of `WINDOW` requests, half
+inserts and half retrieves, and waits for the retrieve replies of a window
+before sending the next one. Server CPU is read from ``/proc`` and counts the
+server process only.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import socket
+import time
+from multiprocessing.connection import Connection
+from typing import Tuple
+
+from protohackers.m0004_unusual_database_program.engine import UdpEngine, bind
+from protohackers.m0004_unusual_database_program.kv import KvServerProtocol
+from protohackers.m0004_unusual_database_program.store import KvStore
+
+REQUESTS = 200_000
+WINDOW = 64
+KEYS = 1000
+
+
+def serve_protocol(ready: Connection) -> None:
+    async def serve():
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: KvServerProtocol(KvStore()), local_addr=("127.0.0.1", 0)
+        )
+        ready.send(transport.get_extra_info("sockname"))
+        await asyncio.sleep(3600)
+
+    logging.disable(logging.CRITICAL)
+    asyncio.run(serve())
+
+
+def serve_engine(ready: Connection) -> None:
+    logging.disable(logging.CRITICAL)
+    engine = UdpEngine(KvStore(), bind(("127.0.0.1", 0)))
+    ready.send(engine.sock.getsockname())
+    engine.serve_forever()
+
+
+def cpu_time(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as stat:
+        fields = stat.read().rpartition(")")[2].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def measure(serve) -> Tuple[float, float]:
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    server = multiprocessing.Process(target=serve, args=(sender,), daemon=True)
+    server.start()
+    address = receiver.recv()
+    client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    client.settimeout(0.2)
+    window = [
+        b"key%d=value %d" % (i % KEYS, i) if i % 2 else b"key%d" % (i % KEYS)
+        for i in range(WINDOW)
+    ]
+    cpu = cpu_time(server.pid)
+    start = time.perf_counter()
+    for _ in range(REQUESTS // WINDOW):
+        for request in window:
+            client.sendto(request, address)
+        try:
+            for _ in range(WINDOW // 2):
+                client.recv(1000)
+        except socket.timeout:
+            pass  # Lost datagrams
+    elapsed = time.perf_counter() - start
+    cpu = cpu_time(server.pid) - cpu
+    server.terminate()
+    server.join()
+    packets = REQUESTS // WINDOW * WINDOW
+    return packets / elapsed, cpu / packets
+
+
+def main():
+    servers = (("KvServerProtocol", serve_protocol), ("UdpEngine", serve_engine))
+    for name, serve in servers:
+        rate, cpu = measure(serve)
+        print(
+            f"{name:>18} {rate:>10,.0f} packets/s"
+            f" {cpu * 1e6:>6.2f}us server CPU/packet"
+        )
+
+
+if __name__ == "__main__":
+    main()
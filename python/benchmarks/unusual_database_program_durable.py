@@ -0,0 +1,62 @@
+"""Insert throughput and startup time of the durable unusual database store.
+
+Run with ``python -m benchmarks.unusual_database_program_durable`` from the
+python directory. Inserts go through ``handle`` in this process, without the
+network, so the cost of persistence is not hidden behind the socket. The
+durable insert rate includes closing the store, which commits the inserts
+still waiting. Startup loads a snapshot of `SNAPSHOT_KEYS` keys and a log tail
+of `TAIL` inserts.
+"""
+import os
+import tempfile
+import time
+
+from protohackers.m0004_unusual_database_program.durable import DurableStore
+from protohackers.m0004_unusual_database_program.store import KvStore
+
+INSERTS = 500_000
+KEYS = 10_000
+SNAPSHOT_KEYS = 1_000_000
+TAIL = 100_000
+
+
+def insert_rate(store: KvStore) -> float:
+    requests = [b"key%d=value %d" % (i % KEYS, i) for i in range(INSERTS)]
+    start = time.perf_counter()
+    for request in requests:
+        store.handle(request)
+    store.close()
+    return INSERTS / (time.perf_counter() - start)
+
+
+def startup_time(directory: str) -> float:
+    store = DurableStore(directory, snapshot_records=SNAPSHOT_KEYS)
+    for i in range(SNAPSHOT_KEYS):
+        store.insert(b"key%d" % i, b"value %d" % i)
+    store.snapshot()
+    for i in range(TAIL):
+        store.insert(b"key%d" % i, b"new value %d" % i)
+    store.close()
+    start = time.perf_counter()
+    store = DurableStore(directory)
+    elapsed = time.perf_counter() - start
+    assert len(store.data) == SNAPSHOT_KEYS + 1  # nosec
+    store.close()
+    return elapsed
+
+
+def main():
+    memory = insert_rate(KvStore())
+    with tempfile.TemporaryDirectory() as directory:
+        durable = insert_rate(DurableStore(os.path.join(directory, "rate")))
+        startup = startup_time(os.path.join(directory, "startup"))
+    print(f"{'in memory':>10} {memory:>10,.0f} inserts/s")
+    print(f"{'durable':>10} {durable:>10,.0f} inserts/s {memory / durable:.2f}x slower")
+    print(
+        f"{'startup':>10} {startup * 1000:>10,.0f}ms"
+        f" for {SNAPSHOT_KEYS:,} keys and {TAIL:,} log records"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""CPU per datagram of the unusual database store request handling.
+
+Run with ``python -m benchmarks.unusual_database_program_handle`` from the
+python directory. Requests go straight to ``KvStore.handle`` as ``bytes``, the
+way ``KvServerProtocol`` receives them, and as ``memoryview`` slices of a
+receive buffer, the way ``UdpEngine`` receives them. One request in `INSERT_EVERY`
+is an insert, the rest retrieve a few hot keys.
+"""
+import time
+from typing import List, Union
+
+from protohackers.m0004_unusual_database_program.store import KvStore
+
+REQUESTS = 1_000_000
+KEYS = 100
+INSERT_EVERY = 10
+
+
+def requests() -> List[bytes]:
+    return [
+        b"key%d=value %d" % (i % KEYS, i)
+        if i % INSERT_EVERY == 0
+        else b"key%d" % (i % KEYS)
+        for i in range(REQUESTS)
+    ]
+
+
+def measure(datagrams: List[Union[bytes, memoryview]]) -> float:
+    store = KvStore()
+    handle = store.handle
+    start = time.process_time()
+    for datagram in datagrams:
+        handle(datagram)
+    return (time.process_time() - start) / len(datagrams)
+
+
+def main():
+    datagrams = requests()
+    buffer = memoryview(bytearray(b"".join(datagrams)))
+    views, offset = [], 0
+    for datagram in datagrams:
+        views.append(buffer[offset : offset + len(datagram)])
+        offset += len(datagram)
+    for name, inputs in (("bytes", datagrams), ("memoryview", views)):
+        print(f"{name:>10} {measure(inputs) * 1e9:>6.0f}ns CPU/datagram")
+
+
+if __name__ == "__main__":
+    main()
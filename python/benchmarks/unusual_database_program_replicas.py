@@ -0,0 +1,132 @@
+"""Read throughput of the unusual database program as replicas are added.
+
+Run with ``python -m benchmarks.unusual_database_program_replicas`` from the
+python directory. The primary and each replica run in their own process
+without traffic logging or asyncio debug mode, with one reader process per
+server sending windows of `WINDOW` retrieves for `DURATION` seconds. A writer
+process sends `INSERT_RATE` inserts per second to the primary meanwhile. Reads
+only scale with as many cores as servers and clients together.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import socket
+import tempfile
+import time
+from multiprocessing.connection import Connection
+from typing import Tuple
+
+from protohackers.m0004_unusual_database_program.kv import KvServerProtocol
+from protohackers.m0004_unusual_database_program.replica import (
+    PrimaryStore,
+    ReplicaStore,
+)
+
+MAX_REPLICAS = 3
+DURATION = 3.0
+WINDOW = 64
+KEYS = 1000
+INSERT_RATE = 1000
+
+
+async def listen(store) -> Tuple[str, int]:
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(
+        lambda: KvServerProtocol(store), local_addr=("127.0.0.1", 0)
+    )
+    return transport.get_extra_info("sockname")
+
+
+def serve_primary(path: str, ready: Connection) -> None:
+    async def serve():
+        store = PrimaryStore()
+        for i in range(KEYS):
+            store.insert(b"key%d" % i, b"value %d" % i)
+        await asyncio.start_unix_server(store.replicate, path)
+        asyncio.create_task(store.send_heartbeats())
+        ready.send(await listen(store))
+        await asyncio.sleep(3600)
+
+    logging.disable(logging.CRITICAL)
+    asyncio.run(serve())
+
+
+def serve_replica(path: str, ready: Connection) -> None:
+    async def serve():
+        store = ReplicaStore()
+        follower = asyncio.create_task(store.follow(path))
+        while store.sequence < KEYS:
+            await asyncio.sleep(0.01)
+        ready.send(await listen(store))
+        await follower
+
+    logging.disable(logging.CRITICAL)
+    asyncio.run(serve())
+
+
+def read(address: Tuple[str, int], results: Connection) -> None:
+    client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    client.settimeout(0.2)
+    window = [b"key%d" % (i % KEYS) for i in range(WINDOW)]
+    replies = 0
+    stop = time.perf_counter() + DURATION
+    while time.perf_counter() < stop:
+        for request in window:
+            client.sendto(request, address)
+        try:
+            for _ in window:
+                client.recv(1000)
+                replies += 1
+        except socket.timeout:
+            pass  # Lost datagrams
+    results.send(replies)
+
+
+def write(address: Tuple[str, int]) -> None:
+    client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    i = 0
+    while True:
+        client.sendto(b"key%d=value %d" % (i % KEYS, i), address)
+        i += 1
+        time.sleep(1 / INSERT_RATE)
+
+
+def measure(replicas: int, directory: str) -> float:
+    path = os.path.join(directory, f"primary{replicas}.sock")
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    servers = [multiprocessing.Process(target=serve_primary, args=(path, sender))]
+    servers[0].start()
+    addresses = [receiver.recv()]
+    for _ in range(replicas):
+        servers.append(
+            multiprocessing.Process(target=serve_replica, args=(path, sender))
+        )
+        servers[-1].start()
+        addresses.append(receiver.recv())
+    writer = multiprocessing.Process(target=write, args=(addresses[0],))
+    readers = [
+        multiprocessing.Process(target=read, args=(address, sender))
+        for address in addresses
+    ]
+    writer.start()
+    for reader in readers:
+        reader.start()
+    replies = sum(receiver.recv() for _ in readers)
+    for process in (*readers, writer, *servers):
+        process.terminate()
+        process.join()
+    return replies / DURATION
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        base = None
+        for replicas in range(MAX_REPLICAS + 1):
+            rate = measure(replicas, directory)
+            base = base or rate
+            print(f"{replicas} replicas {rate:>10,.0f} reads/s {rate / base:>5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Scaling and consistency of the shared unusual database store over workers.
+
+Run with ``python -m benchmarks.unusual_database_program_shared`` from the
+python directory. For 1 up to `MAX_WORKERS` worker processes, `CLIENTS` client
+processes each insert their own key, wait for the insert to be acknowledged by
+a retrieve on the same socket, then retrieve the key from `READERS` other
+sockets, which the kernel spreads over the workers. Stale counts the replies
+missing the acknowledged insert and should stay 0. Scaling needs as many
+cores as workers and clients together.
+"""
+import logging
+import multiprocessing
+import os
+import socket
+import time
+from multiprocessing.connection import Connection
+from typing import Tuple
+
+from protohackers.m0004_unusual_database_program.engine import UdpEngine, bind
+from protohackers.m0004_unusual_database_program.shared import SharedStore
+
+MAX_WORKERS = max(2, os.cpu_count() or 1)
+CLIENTS = 4
+READERS = 3
+ROUNDS = 2000
+
+
+def serve(engine: UdpEngine) -> None:
+    logging.disable(logging.CRITICAL)
+    engine.serve_forever()
+
+
+def client(address: Tuple[str, int], key: bytes, results: Connection) -> None:
+    writer = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    readers = [socket.socket(socket.AF_INET, socket.SOCK_DGRAM) for _ in range(READERS)]
+    stale = lost = 0
+    for sock in (writer, *readers):
+        sock.settimeout(0.2)
+    for i in range(ROUNDS):
+        expected = b"%s=%d" % (key, i)
+        try:
+            writer.sendto(expected, address)
+            writer.sendto(key, address)
+            if writer.recv(1000) != expected:
+                lost += 1  # The insert never arrived, nothing to check
+                continue
+            for reader in readers:
+                reader.sendto(key, address)
+                stale += reader.recv(1000) != expected
+        except socket.timeout:
+            lost += 1
+    results.send((stale, lost))
+
+
+def measure(workers: int) -> Tuple[float, int, int]:
+    store = SharedStore()
+    sockets = [bind(("127.0.0.1", 0))]
+    address = sockets[0].getsockname()
+    sockets += [bind(address) for _ in range(workers - 1)]
+    servers = [
+        multiprocessing.Process(target=serve, args=(UdpEngine(store, sock),))
+        for sock in sockets
+    ]
+    for server in servers:
+        server.start()
+    for sock in sockets:
+        sock.close()
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    clients = [
+        multiprocessing.Process(target=client, args=(address, b"key%d" % i, sender))
+        for i in range(CLIENTS)
+    ]
+    start = time.perf_counter()
+    for process in clients:
+        process.start()
+    results = [receiver.recv() for _ in clients]
+    elapsed = time.perf_counter() - start
+    for process in clients:
+        process.join()
+    for server in servers:
+        server.terminate()
+        server.join()
+    store.close()
+    requests = CLIENTS * ROUNDS * (2 + READERS)
+    return requests / elapsed, sum(r[0] for r in results), sum(r[1] for r in results)
+
+
+def main():
+    base = None
+    for workers in range(1, MAX_WORKERS + 1):
+        rate, stale, lost = measure(workers)
+        base = base or rate
+        print(
+            f"{workers:>2} workers {rate:>10,.0f} requests/s {rate / base:>5.2f}x"
+            f" {stale} stale {lost} lost"
+        )
+
+
+if __name__ == "__main__":
+    main()
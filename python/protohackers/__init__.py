@@ -1,4 +1,3 @@
-import logging
 from typing import Any, Dict
 
 
@@ -15,7 +14,7 @@ logging_config: Dict[str, Any] = {
     "filters": {},
     "handlers": {
         "console": {
-            "class": logging.StreamHandler,
+            "class": "logging.StreamHandler",
             "formatter": "simple",
             "level": "DEBUG",
             "filters": [],
@@ -0,0 +1,189 @@
+"""Line framing shared by the line based servers.
+
+Received data is kept in one reusable ``bytearray``, complete lines are handed
+out as ``memoryview`` slices of it and consumed bytes are compacted away
+before more data is added.
+"""
+import asyncio
+import socket
+from typing import Iterator, Optional, Tuple
+
+BUFFER = 65536
+MAX_LINE = 65536
+OVERFLOW_POLICIES = ("error", "split")
+
+
+class LineTooLongError(Exception):
+    """Line exceeds the maximum line length."""
+
+
+class LineFramer:
+    """Split a byte stream into newline delimited lines."""
+
+    def __init__(
+        self,
+        max_line: Optional[int] = MAX_LINE,
+        overflow: str = "error",
+        size: int = BUFFER,
+    ) -> None:
+        """Initialize an empty framer.
+
+        Parameters
+        ----------
+        max_line : int, optional
+            Maximum length of a line without the newline, None for no limit,
+            by default 65536
+        overflow : str, optional
+            What to do with a longer line, "error" raises LineTooLongError and
+            "split" hands it out in pieces of `max_line` bytes,
+            by default "error"
+        size : int, optional
+            Initial size of the buffer, by default 65536
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy, '{overflow}'")
+        self.max_line = max_line
+        self.overflow = overflow
+        self._buffer = bytearray(size)
+        self._start = 0  # First byte not handed out yet
+        self._scan = 0  # First byte not searched for a newline yet
+        self._end = 0  # End of received data
+
+    def __len__(self) -> int:
+        """Get the number of buffered bytes not handed out yet."""
+        return self._end - self._start
+
+    def feed(self, data: bytes) -> None:
+        """Add received data to the buffer.
+
+        Parameters
+        ----------
+        data : bytes
+            Received data
+        """
+        self._reserve(len(data))
+        self._buffer[self._end : self._end + len(data)] = data
+        self._end += len(data)
+
+    def recv_into(self, sock: socket.socket, size: int = BUFFER) -> int:
+        """Receive from a socket straight into the buffer.
+
+        Parameters
+        ----------
+        sock : socket.socket
+            Socket to receive from
+        size : int, optional
+            Maximum number of bytes to receive, by default 65536
+
+        Returns
+        -------
+        int
+            Number of bytes received, 0 at end of stream
+        """
+        self._reserve(size)
+        with memoryview(self._buffer) as view:
+            received = sock.recv_into(view[self._end : self._end + size])
+        self._end += received
+        return received
+
+    def lines(self) -> Iterator[memoryview]:
+        """Iterate over complete lines without the newline.
+
+        Each line is a view into the buffer that is released when the next line
+        is requested, copy it with ``bytes()`` to keep it.
+
+        Yields
+        ------
+        Iterator[memoryview]
+            Complete lines
+        """
+        with memoryview(self._buffer) as view:
+            while span := self._next_span():
+                start, end, _ = span
+                with view[start:end] as line:
+                    yield line
+
+    def next_line(self, keepends: bool = False) -> Optional[bytes]:
+        """Get a copy of the next complete line.
+
+        Parameters
+        ----------
+        keepends : bool, optional
+            Keep the newline, by default False
+
+        Returns
+        -------
+        Optional[bytes]
+            Next line or None if there is no complete line buffered
+        """
+        if not (span := self._next_span()):
+            return None
+        start, end, consumed = span
+        return bytes(self._buffer[start : consumed if keepends else end])
+
+    def flush(self) -> bytes:
+        """Get and drop the buffered bytes of an incomplete line."""
+        rest = bytes(self._buffer[self._start : self._end])
+        self._start = self._scan = self._end
+        return rest
+
+    def _next_span(self) -> Optional[Tuple[int, int, int]]:
+        # Start and end of the next line and where the line after it starts
+        start = self._start
+        end = self._buffer.find(b"\n", self._scan, self._end)
+        self._scan = self._end if end == -1 else end
+        length = (self._end if end == -1 else end) - start
+        if self.max_line is not None and length > self.max_line:
+            if self.overflow == "error":
+                raise LineTooLongError(f"Line longer than {self.max_line} bytes")
+            self._start += self.max_line
+            return start, self._start, self._start
+        if end == -1:
+            return None
+        self._start = self._scan = end + 1
+        return start, end, end + 1
+
+    def _reserve(self, size: int) -> None:
+        # Make room for `size` more bytes, moving pending data to the front
+        if self._start:
+            pending = self._end - self._start
+            self._buffer[:pending] = self._buffer[self._start : self._end]
+            self._scan -= self._start
+            self._start, self._end = 0, pending
+        if len(self._buffer) - self._end < size:
+            self._buffer.extend(bytes(max(size, len(self._buffer))))
+
+
+async def readline(
+    reader: asyncio.StreamReader,
+    framer: LineFramer,
+    keepends: bool = False,
+    size: int = BUFFER,
+) -> bytes:
+    """Read the next line from a stream through a framer.
+
+    Like ``StreamReader.readline`` an incomplete line is returned at the end of
+    the stream and b"" after that.
+
+    Parameters
+    ----------
+    reader : asyncio.StreamReader
+        Stream to read from
+    framer : LineFramer
+        Framer holding the data read from the stream so far
+    keepends : bool, optional
+        Keep the newline, by default False
+    size : int, optional
+        Maximum number of bytes to read at once, by default 65536
+
+    Returns
+    -------
+    bytes
+        Next line
+    """
+    while (line := framer.next_line(keepends)) is None:
+        data = await reader.read(size)
+        if not data:
+            return framer.flush()
+        framer.feed(data)
+    return line
@@ -0,0 +1,94 @@
+"""Logging setup shared by the servers.
+
+Records are put on a queue by the event loop or handler threads and
+formatted and written by a listener thread, so slow output never blocks
+serving. Per-message logs go to a separate traffic logger per server that can
+be turned off entirely.
+"""
+import asyncio
+import atexit
+import logging
+import logging.config
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Callable, Dict
+
+from protohackers import logging_config
+
+TRAFFIC = "protohackers.traffic"
+
+
+class _QueueHandler(QueueHandler):
+    """Queue handler that leaves formatting to the listener thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def get_logger(server: str) -> logging.Logger:
+    """Get the logger of a server."""
+    return logging.getLogger(f"protohackers.{server}")
+
+
+def get_traffic_logger(server: str) -> logging.Logger:
+    """Get the logger for the per-message traffic of a server."""
+    return logging.getLogger(f"{TRAFFIC}.{server}")
+
+
+def setup_logging(traffic: bool = True) -> QueueListener:
+    """Configure logging from `logging_config` behind a queue.
+
+    Parameters
+    ----------
+    traffic : bool, optional
+        Log per-message traffic, by default True
+
+    Returns
+    -------
+    QueueListener
+        Started listener writing to the configured handlers, stopped at exit
+    """
+    logging.config.dictConfig(logging_config)
+    loggers = [logging.getLogger(), logging.getLogger("protohackers")]
+    handlers = list(dict.fromkeys(h for logger in loggers for h in logger.handlers))
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    for logger in loggers:
+        logger.handlers = [queue_handler]
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    if not traffic:
+        logging.getLogger(TRAFFIC).setLevel(logging.CRITICAL + 1)
+    return listener
+
+
+async def report(
+    logger: logging.Logger, metrics: Callable[[], Dict[str, float]], interval: float
+) -> None:
+    """Log metrics every interval, counters ending with ``_total`` as rates.
+
+    Parameters
+    ----------
+    logger : logging.Logger
+        Logger to write to
+    metrics : Callable[[], Dict[str, float]]
+        Get the current metrics
+    interval : float
+        Seconds between reports
+    """
+    last = metrics()
+    while True:
+        await asyncio.sleep(interval)
+        current = metrics()
+        logger.info(
+            "%s",
+            " ".join(
+                f"{name[:-6]}/s={(value - last[name]) / interval:.0f}"
+                if name.endswith("_total")
+                else f"{name}={value:g}"
+                for name, value in current.items()
+            ),
+        )
+        last = current
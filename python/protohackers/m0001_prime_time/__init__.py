@@ -1,10 +1,93 @@
+import argparse
+import resource
 import sys
-from protohackers.m0001_prime_time.is_prime import run
+import time
+from typing import Optional
+from protohackers.m0001_prime_time.cache import POLICIES, PrimeCache
+from protohackers.m0001_prime_time.is_prime import run as run_socketserver
+from protohackers.m0001_prime_time.offload import DEFAULT_THRESHOLD, Offloader
+from protohackers.m0001_prime_time.prime_asyncio import run as run_asyncio
+from protohackers.m0001_prime_time.protocol import Checker
+from protohackers.m0001_prime_time.sieve import Sieve
+
+
+def load_sieve(path: str, limit: int) -> Optional[Sieve]:
+    if not limit:
+        return None
+    start = time.perf_counter()
+    sieve = Sieve.load(path, limit)
+    elapsed = time.perf_counter() - start
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"sieve below {limit} ready in {elapsed:.3f}s, max RSS {rss} KiB")
+    return sieve
 
 
 def main():
     try:
-        run()
+        parser = argparse.ArgumentParser()
+        parser.add_argument(
+            "-m",
+            "--method",
+            type=str,
+            choices=["asyncio", "socketserver"],
+            default="socketserver",
+            help="select which server to use (default socketserver)",
+        )
+        parser.add_argument(
+            "--cache-size",
+            type=int,
+            default=65536,
+            help="number of cached primality results, 0 disables (default 65536)",
+        )
+        parser.add_argument(
+            "--cache-policy",
+            type=str,
+            choices=POLICIES,
+            default="lru",
+            help="cache eviction policy (default lru)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="processes for expensive checks, 0 disables (default CPU count)",
+        )
+        parser.add_argument(
+            "--offload-bits",
+            type=int,
+            default=DEFAULT_THRESHOLD,
+            help=f"offload numbers longer than this (default {DEFAULT_THRESHOLD})",
+        )
+        parser.add_argument(
+            "--sieve-limit",
+            type=int,
+            default=0,
+            help="look up numbers below this in a precomputed sieve (default off)",
+        )
+        parser.add_argument(
+            "--sieve-file",
+            type=str,
+            default="prime_sieve.bin",
+            help="file the sieve is saved to and mapped from (default prime_sieve.bin)",
+        )
+        parser.add_argument(
+            "--no-traffic-log",
+            action="store_false",
+            dest="log_traffic",
+            help="do not log every request",
+        )
+        args = parser.parse_args()
+
+        checker = Checker(
+            cache=PrimeCache(args.cache_size, args.cache_policy),
+            offloader=Offloader(args.workers, args.offload_bits),
+            sieve=load_sieve(args.sieve_file, args.sieve_limit),
+        )
+        match args.method:
+            case "asyncio":
+                run_asyncio(checker, args.log_traffic)
+            case "socketserver":
+                run_socketserver(checker, args.log_traffic)
     except KeyboardInterrupt:
         print("Exited by user...")
         sys.exit(1)
@@ -0,0 +1,113 @@
+"""Bounded cache of primality results shared by all handlers of a server."""
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Callable, Dict
+
+POLICIES = ("lru", "fifo")
+
+
+@dataclass
+class CacheStats:
+    """Counters for sizing the cache."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    coalesced: int = 0
+    size: int = 0
+
+
+class PrimeCache:
+    """Thread safe cache of primality results with single-flight computation.
+
+    Concurrent lookups of a number that is not cached yet wait for the one
+    in-flight computation instead of repeating it.
+    """
+
+    def __init__(self, max_size: int = 65536, policy: str = "lru") -> None:
+        """Initialize an empty cache.
+
+        Parameters
+        ----------
+        max_size : int, optional
+            Maximum number of cached results, 0 disables storing results,
+            by default 65536
+        policy : str, optional
+            Eviction policy, "lru" evicts the least recently used result and
+            "fifo" the oldest inserted result, by default "lru"
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown eviction policy, '{policy}'")
+        if max_size < 0:
+            raise ValueError(f"Invalid cache size, '{max_size}'")
+        self.max_size = max_size
+        self.policy = policy
+        self._results: OrderedDict[int, bool] = OrderedDict()
+        self._pending: Dict[int, Future] = {}
+        self._lock = threading.Lock()
+        self._stats = CacheStats()
+
+    @property
+    def stats(self) -> CacheStats:
+        """Snapshot of the hit, miss, eviction and coalesced counters."""
+        with self._lock:
+            return CacheStats(
+                hits=self._stats.hits,
+                misses=self._stats.misses,
+                evictions=self._stats.evictions,
+                coalesced=self._stats.coalesced,
+                size=len(self._results),
+            )
+
+    def get_or_compute(self, num: int, compute: Callable[[int], bool]) -> bool:
+        """Get the cached result for `num` or compute it.
+
+        Parameters
+        ----------
+        num : int
+            Number to look up
+        compute : Callable[[int], bool]
+            Primality check to run on a miss
+
+        Returns
+        -------
+        bool
+            True if `num` is prime
+        """
+        with self._lock:
+            if (result := self._results.get(num)) is not None:
+                self._stats.hits += 1
+                if self.policy == "lru":
+                    self._results.move_to_end(num)
+                return result
+            if (pending := self._pending.get(num)) is not None:
+                self._stats.coalesced += 1
+            else:
+                self._stats.misses += 1
+                future: Future = Future()
+                self._pending[num] = future
+        if pending is not None:
+            return pending.result()
+
+        try:
+            result = compute(num)
+        except BaseException as error:
+            with self._lock:
+                del self._pending[num]
+            future.set_exception(error)
+            raise
+        with self._lock:
+            del self._pending[num]
+            self._store(num, result)
+        future.set_result(result)
+        return result
+
+    def _store(self, num: int, result: bool) -> None:
+        if not self.max_size:
+            return
+        self._results[num] = result
+        while len(self._results) > self.max_size:
+            self._results.popitem(last=False)
+            self._stats.evictions += 1
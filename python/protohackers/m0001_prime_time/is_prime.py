@@ -1,85 +1,54 @@
-import json
-import math
 import socket
 import threading
 import socketserver
 
-BUFFER = 8192
+from protohackers.framing import LineFramer, LineTooLongError
+from protohackers.log import get_logger, setup_logging
+from protohackers.m0001_prime_time import protocol
+from protohackers.m0001_prime_time.cache import PrimeCache
+from protohackers.m0001_prime_time.offload import Offloader
+from protohackers.m0001_prime_time.protocol import Checker, MalformedRequestError
 
+BUFFER = 8192
+MAX_LINE = 1 << 20
+BACKLOG = 1024
 
-class MalformedRequestError(Exception):
-    pass
+logger = get_logger("prime_time")
 
 
 class ThreadedTCPRequestHandler(socketserver.BaseRequestHandler):
     request: socket.socket
+    server: "ThreadedTCPServer"
 
     def handle(self) -> None:
-        data, start = b"", 0
-        while True:
-            # Receive data from client
-            recv = self.request.recv(BUFFER)
-            if not recv:
-                break
-            data += recv
-
-            start = self.split(data, start)
-            if start == -1:
+        framer = LineFramer(max_line=MAX_LINE)
+        while framer.recv_into(self.request, BUFFER):
+            if not self.split(framer):
                 break
 
-    def split(self, data: bytes, start: int) -> int:
-        end = data.find(b"\n", start)
-        while end != -1:
-            try:
-                response = self.process(data[start:end])
-                self.request.sendall(response)
-            except MalformedRequestError:
-                self.request.sendall(b"{}")
-                return -1
-            start = end + 1
-            end = data.find(b"\n", start)
-        return start
-
-    def process(self, data: bytes) -> bytes:
-        obj = self.get_json(data)
-        if self.is_prime(self.get_number(obj)):
-            return b'{"method":"isPrime","prime":true}\n'
-        return b'{"method":"isPrime","prime":false}\n'
-
-    @staticmethod
-    def get_json(data: bytes) -> dict:
+    def split(self, framer: LineFramer) -> bool:
         try:
-            return json.loads(data.decode("utf-8"))
-        except json.JSONDecodeError as error:
-            raise MalformedRequestError from error
-
-    @staticmethod
-    def get_number(data: dict) -> int | float:
-        if data.get("method") == "isPrime":
-            print("correct method")
-            number = data.get("number")
-            if isinstance(number, (int, float)) and not isinstance(number, bool):
-                return number
-        raise MalformedRequestError
-
-    @staticmethod
-    def is_prime(num: int | float) -> bool:
-        if isinstance(num, float):
-            return False
-        if num < 2:
+            for line in framer.lines():
+                response = self.process(line)
+                self.request.sendall(response)
+        except (MalformedRequestError, LineTooLongError):
+            self.request.sendall(protocol.MALFORMED)
             return False
-        for i in range(2, int(math.sqrt(num)) + 1):
-            if (num % i) == 0:
-                return False
         return True
 
+    def process(self, data: bytes | memoryview) -> bytes:
+        number = protocol.parse(data)
+        return protocol.respond(self.server.checker.is_prime(number))
+
 
 class ThreadedTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
-    pass
+    request_queue_size = BACKLOG
+    checker: Checker
 
 
-def serve():
+def serve(checker: Checker):
     server = ThreadedTCPServer(("0.0.0.0", 10008), ThreadedTCPRequestHandler)  # nosec
+    server.checker = checker
     with server:
         server_thread = threading.Thread(target=server.serve_forever)
         server_thread.daemon = True  # noqa
@@ -90,10 +59,15 @@ def serve():
         server_thread.join()
 
 
-def run():
-    print("Running prime time")
-    serve()
+def run(checker: Checker, log_traffic: bool = True):
+    setup_logging(log_traffic)
+    print("Running prime time (socketserver)")
+    try:
+        serve(checker)
+    finally:
+        checker.close()
+        logger.info("Cache: %s", checker.cache.stats)
 
 
 if __name__ == "__main__":
-    run()
+    run(Checker(PrimeCache(), Offloader()))
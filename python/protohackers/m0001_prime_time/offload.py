@@ -0,0 +1,62 @@
+"""Route expensive primality checks to a process pool.
+
+Checks are pure Python CPU work holding the GIL, so large numbers are sent
+to worker processes while cheap ones are answered inline.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from protohackers.m0001_prime_time import primality
+
+DEFAULT_THRESHOLD = 256
+
+
+class Offloader:
+    """Primality checks that run in a process pool above a size threshold."""
+
+    def __init__(
+        self, workers: Optional[int] = None, threshold: int = DEFAULT_THRESHOLD
+    ) -> None:
+        """Initialize an offloader, worker processes are started on first use.
+
+        Parameters
+        ----------
+        workers : int, optional
+            Number of worker processes, 0 checks every number inline,
+            by default one per CPU
+        threshold : int, optional
+            Numbers longer than this many bits are offloaded, by default 256
+        """
+        if workers is not None and workers < 0:
+            raise ValueError(f"Invalid number of workers, '{workers}'")
+        self.threshold = threshold
+        self._pool: Optional[ProcessPoolExecutor] = None
+        if workers != 0:
+            self._pool = ProcessPoolExecutor(max_workers=workers)
+
+    def is_expensive(self, num: int) -> bool:
+        """Check if `num` should be offloaded to the pool."""
+        return self._pool is not None and num.bit_length() > self.threshold
+
+    def is_prime(self, num: int) -> bool:
+        """Check if `num` is prime, blocking until a worker answers if offloaded.
+
+        Parameters
+        ----------
+        num : int
+            Number to check
+
+        Returns
+        -------
+        bool
+            True if `num` is prime
+        """
+        if self._pool is None or not self.is_expensive(num):
+            return primality.is_prime(num)
+        return self._pool.submit(primality.is_prime, num).result()
+
+    def close(self) -> None:
+        """Shut down the pool."""
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
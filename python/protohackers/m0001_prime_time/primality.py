@@ -0,0 +1,184 @@
+"""Primality testing that picks its method by the size of the number.
+
+Small numbers are settled by trial division against a table of small primes,
+numbers below 2**64 by Miller-Rabin with a deterministic set of bases and
+anything larger by the strong Baillie-PSW test.
+"""
+from math import isqrt
+from typing import Tuple
+
+SMALL_PRIME_LIMIT = 1000
+MILLER_RABIN_LIMIT = 2**64
+
+# Prime bases for which Miller-Rabin is deterministic below each bound
+MILLER_RABIN_BASES = (
+    (3215031751, (2, 3, 5, 7)),
+    (2152302898747, (2, 3, 5, 7, 11)),
+    (3474749660383, (2, 3, 5, 7, 11, 13)),
+    (341550071728321, (2, 3, 5, 7, 11, 13, 17)),
+    (3825123056546413051, (2, 3, 5, 7, 11, 13, 17, 19, 23)),
+    (MILLER_RABIN_LIMIT, (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)),
+)
+
+
+def _small_primes(limit: int) -> Tuple[int, ...]:
+    sieve = bytearray([1]) * limit
+    sieve[0:2] = b"\x00\x00"
+    for i in range(2, isqrt(limit - 1) + 1):
+        if sieve[i]:
+            sieve[i * i :: i] = bytes(len(range(i * i, limit, i)))
+    return tuple(i for i, flag in enumerate(sieve) if flag)
+
+
+SMALL_PRIMES = _small_primes(SMALL_PRIME_LIMIT)
+_SMALL_PRIME_SET = frozenset(SMALL_PRIMES)
+
+
+def is_prime(num: int) -> bool:
+    """Check if a number is prime.
+
+    Parameters
+    ----------
+    num : int
+        Number to check
+
+    Returns
+    -------
+    bool
+        True if `num` is prime
+    """
+    if num < SMALL_PRIME_LIMIT:
+        return num in _SMALL_PRIME_SET
+    for prime in SMALL_PRIMES:
+        if num % prime == 0:
+            return False
+    if num < SMALL_PRIME_LIMIT * SMALL_PRIME_LIMIT:
+        return True
+    for limit, bases in MILLER_RABIN_BASES:
+        if num < limit:
+            return all(strong_probable_prime(num, base) for base in bases)
+    return baillie_psw(num)
+
+
+def strong_probable_prime(num: int, base: int) -> bool:
+    """Miller-Rabin round, check if an odd `num` is a strong probable prime.
+
+    Parameters
+    ----------
+    num : int
+        Odd number greater than `base`
+    base : int
+        Witness to test with
+
+    Returns
+    -------
+    bool
+        False if `base` proves `num` composite
+    """
+    odd, shift = num - 1, 0
+    while not odd & 1:
+        odd >>= 1
+        shift += 1
+    x = pow(base, odd, num)
+    if x in (1, num - 1):
+        return True
+    for _ in range(shift - 1):
+        x = x * x % num
+        if x == num - 1:
+            return True
+    return False
+
+
+def baillie_psw(num: int) -> bool:
+    """Strong Baillie-PSW test for an odd `num` without small factors.
+
+    No composite number passing this test is known.
+
+    Parameters
+    ----------
+    num : int
+        Odd number to check
+
+    Returns
+    -------
+    bool
+        True if `num` is a probable prime
+    """
+    if not strong_probable_prime(num, 2):
+        return False
+    if isqrt(num) ** 2 == num:
+        return False
+    return strong_lucas_probable_prime(num)
+
+
+def _jacobi(a: int, n: int) -> int:
+    a %= n
+    result = 1
+    while a:
+        while not a & 1:
+            a >>= 1
+            if n & 7 in (3, 5):
+                result = -result
+        a, n = n, a
+        if a & 3 == 3 and n & 3 == 3:
+            result = -result
+        a %= n
+    return result if n == 1 else 0
+
+
+def _selfridge(num: int) -> int:
+    # First D in 5, -7, 9, -11, ... with Jacobi symbol (D/num) == -1
+    d = 5
+    while True:
+        jacobi = _jacobi(d, num)
+        if jacobi == -1:
+            return d
+        if jacobi == 0 and abs(d) != num:
+            return 0
+        d = -d - 2 if d > 0 else -d + 2
+
+
+def strong_lucas_probable_prime(num: int) -> bool:
+    """Strong Lucas test with Selfridge parameters for an odd non-square `num`.
+
+    Parameters
+    ----------
+    num : int
+        Odd number to check, not a perfect square
+
+    Returns
+    -------
+    bool
+        False if `num` is proven composite
+    """
+    d = _selfridge(num)
+    if d == 0:
+        return False
+    p, q = 1, (1 - d) // 4
+
+    odd, shift = num + 1, 0
+    while not odd & 1:
+        odd >>= 1
+        shift += 1
+
+    # Compute U_odd, V_odd and Q^odd with a left-to-right binary ladder
+    u, v, qk = 1, p, q % num
+    inverse_two = (num + 1) // 2
+    for bit in bin(odd)[3:]:
+        u, v = u * v % num, (v * v - 2 * qk) % num
+        qk = qk * qk % num
+        if bit == "1":
+            u, v = (
+                (p * u + v) * inverse_two % num,
+                (d * u + p * v) * inverse_two % num,
+            )
+            qk = qk * q % num
+
+    if u == 0 or v == 0:
+        return True
+    for _ in range(shift - 1):
+        v = (v * v - 2 * qk) % num
+        if v == 0:
+            return True
+        qk = qk * qk % num
+    return False
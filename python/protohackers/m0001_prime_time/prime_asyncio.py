@@ -0,0 +1,104 @@
+import asyncio
+from typing import Dict, Iterable, List, Tuple
+
+from protohackers.framing import LineFramer, LineTooLongError
+from protohackers.log import get_logger, setup_logging
+from protohackers.m0001_prime_time import protocol
+from protohackers.m0001_prime_time.cache import PrimeCache
+from protohackers.m0001_prime_time.offload import Offloader
+from protohackers.m0001_prime_time.protocol import Checker, MalformedRequestError
+
+BUFFER = 65536
+MAX_LINE = 1 << 20
+BACKLOG = 1024
+
+logger = get_logger("prime_time")
+
+
+async def process(
+    lines: Iterable[bytes | memoryview], checker: Checker
+) -> Tuple[bytes, bool]:
+    """Answer a batch of request lines in order.
+
+    Every line is parsed before the first await, so the lines may be views
+    that are only valid until the next line is requested. Cheap numbers are
+    checked inline, expensive ones wait on the process pool from the default
+    executor so the event loop keeps serving other clients.
+
+    Parameters
+    ----------
+    lines : Iterable[bytes | memoryview]
+        Complete request lines without the newline
+    checker : Checker
+        Shared primality checks
+
+    Returns
+    -------
+    Tuple[bytes, bool]
+        Responses joined into one buffer and whether a malformed request
+        ended the batch
+    """
+    loop = asyncio.get_running_loop()
+    responses: List[bytes] = []
+    offloaded: Dict[int, asyncio.Future] = {}
+    malformed = False
+    try:
+        for line in lines:
+            number = protocol.parse(line)
+            if checker.is_expensive(number):
+                offloaded[len(responses)] = loop.run_in_executor(
+                    None, checker.is_prime, number
+                )
+                responses.append(b"")
+            else:
+                responses.append(protocol.respond(checker.is_prime(number)))
+    except (MalformedRequestError, LineTooLongError):
+        malformed = True
+    for i, future in offloaded.items():
+        responses[i] = protocol.respond(await future)
+    if malformed:
+        responses.append(protocol.MALFORMED)
+    return b"".join(responses), malformed
+
+
+async def handle(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    checker: Checker,
+):
+    framer = LineFramer(max_line=MAX_LINE)
+    while data := await reader.read(BUFFER):
+        framer.feed(data)
+        response, malformed = await process(framer.lines(), checker)
+        if response:
+            writer.write(response)
+        await writer.drain()
+        if malformed:
+            break
+    writer.close()
+    await writer.wait_closed()
+
+
+async def serve(checker: Checker):
+    server = await asyncio.start_server(
+        lambda reader, writer: handle(reader, writer, checker),
+        "0.0.0.0",  # nosec
+        10008,
+        backlog=BACKLOG,
+    )
+    async with server:
+        await server.serve_forever()
+
+
+def run(checker: Checker, log_traffic: bool = True):
+    setup_logging(log_traffic)
+    print("Running prime time (asyncio)")
+    try:
+        asyncio.run(serve(checker))
+    finally:
+        checker.close()
+        logger.info("Cache: %s", checker.cache.stats)
+
+
+if __name__ == "__main__":
+    run(Checker(PrimeCache(), Offloader()))
@@ -0,0 +1,76 @@
+"""Request parsing and responses shared by the prime time servers."""
+import json
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+from protohackers.log import get_traffic_logger
+from protohackers.m0001_prime_time.cache import PrimeCache
+from protohackers.m0001_prime_time.offload import Offloader
+from protohackers.m0001_prime_time.sieve import Sieve
+
+PRIME = b'{"method":"isPrime","prime":true}\n'
+NOT_PRIME = b'{"method":"isPrime","prime":false}\n'
+MALFORMED = b"{}"
+
+traffic = get_traffic_logger("prime_time")
+
+
+class MalformedRequestError(Exception):
+    pass
+
+
+def get_json(data: bytes | memoryview) -> dict:
+    try:
+        obj = json.loads(str(data, "utf-8"))
+    except (json.JSONDecodeError, UnicodeDecodeError) as error:
+        raise MalformedRequestError from error
+    if not isinstance(obj, dict):
+        raise MalformedRequestError
+    return obj
+
+
+def get_number(data: dict) -> int | float:
+    if data.get("method") == "isPrime":
+        number = data.get("number")
+        if isinstance(number, (int, float)) and not isinstance(number, bool):
+            return number
+    raise MalformedRequestError
+
+
+def parse(data: bytes | memoryview) -> int | float:
+    if traffic.isEnabledFor(logging.DEBUG):
+        traffic.debug("Request: %r", bytes(data))
+    return get_number(get_json(data))
+
+
+@dataclass
+class Checker:
+    """Primality checks shared by all handlers of a server.
+
+    Numbers below the sieve limit are looked up in the sieve, anything else
+    goes through the cache and is computed inline or in the process pool.
+    """
+
+    cache: PrimeCache
+    offloader: Offloader
+    sieve: Optional[Sieve] = None
+
+    def is_prime(self, num: int | float) -> bool:
+        if isinstance(num, float):
+            return False
+        if self.sieve is not None and num < self.sieve.limit:
+            return self.sieve.is_prime(num)
+        return self.cache.get_or_compute(num, self.offloader.is_prime)
+
+    def is_expensive(self, num: int | float) -> bool:
+        return isinstance(num, int) and self.offloader.is_expensive(num)
+
+    def close(self) -> None:
+        self.offloader.close()
+        if self.sieve is not None:
+            self.sieve.close()
+
+
+def respond(prime: bool) -> bytes:
+    return PRIME if prime else NOT_PRIME
@@ -0,0 +1,156 @@
+"""Precomputed bitset of the odd primes below a limit.
+
+The sieve is generated once, saved to a file and memory-mapped on later
+startups so a restart only pays for the pages that are actually looked up.
+"""
+import mmap
+import os
+import struct
+from math import isqrt
+from typing import List, Optional
+
+MAGIC = b"PHSIEVE1"
+HEADER = struct.Struct("<8sQ")
+SEGMENT = 1 << 23  # Odd numbers sieved at a time, a multiple of 8
+
+
+def _base_primes(limit: int) -> List[int]:
+    # Odd primes up to and including `limit`
+    flags = bytearray([1]) * (limit + 1)
+    for i in range(3, isqrt(limit) + 1, 2):
+        if flags[i]:
+            flags[i * i :: 2 * i] = bytes(len(range(i * i, limit + 1, 2 * i)))
+    return [i for i in range(3, limit + 1, 2) if flags[i]]
+
+
+def _pack(flags: bytearray) -> bytes:
+    # Pack one 0/1 byte per odd number into bits, bit i of the result is flags[i]
+    packed = 0
+    for bit in range(8):
+        packed |= int.from_bytes(flags[bit::8], "little") << bit
+    return packed.to_bytes(len(flags) // 8, "little")
+
+
+def generate(limit: int) -> bytes:
+    """Sieve the odd numbers below `limit` into a bitset.
+
+    Bit i is set if 2 * i + 1 is prime.
+
+    Parameters
+    ----------
+    limit : int
+        Upper bound of the sieve
+
+    Returns
+    -------
+    bytes
+        Bitset of odd primes
+    """
+    count = -(-(limit // 2) // 8) * 8
+    primes = _base_primes(isqrt(limit))
+    bits = bytearray()
+    for low in range(0, count, SEGMENT):
+        size = min(SEGMENT, count - low)
+        flags = bytearray([1]) * size
+        for prime in primes:
+            # Index of the first odd multiple of `prime` worth crossing out
+            first = max(prime * prime, (2 * low + 1 + prime - 1) // prime * prime)
+            if not first & 1:
+                first += prime
+            start = (first - 1) // 2 - low
+            if start < size:
+                flags[start::prime] = bytes(len(range(start, size, prime)))
+        if low == 0:
+            flags[0] = 0  # 1 is not prime
+        bits += _pack(flags)
+    # Clear the numbers at and above the limit padded in by the last byte
+    for i in range(limit // 2, count):
+        bits[i >> 3] &= ~(1 << (i & 7)) & 0xFF
+    return bytes(bits)
+
+
+class Sieve:
+    """Constant time primality lookups for numbers below a limit."""
+
+    def __init__(self, limit: int, bits: bytes | mmap.mmap, offset: int = 0) -> None:
+        """Initialize a sieve from a bitset.
+
+        Parameters
+        ----------
+        limit : int
+            Upper bound of the sieve
+        bits : bytes | mmap.mmap
+            Bitset of odd primes as made by `generate`
+        offset : int, optional
+            Position of the bitset in `bits`, by default 0
+        """
+        self.limit = limit
+        self._bits = bits
+        self._offset = offset
+
+    def is_prime(self, num: int) -> bool:
+        """Check if a number below the limit is prime."""
+        if num < 3 or not num & 1:
+            return num == 2
+        index = num >> 1
+        return bool(self._bits[self._offset + (index >> 3)] >> (index & 7) & 1)
+
+    def close(self) -> None:
+        """Unmap the sieve file if the sieve was loaded from one."""
+        if isinstance(self._bits, mmap.mmap):
+            self._bits.close()
+
+    @classmethod
+    def load(cls, path: str, limit: int) -> "Sieve":
+        """Memory-map a saved sieve, generating and saving it if it is missing.
+
+        Parameters
+        ----------
+        path : str
+            Sieve file
+        limit : int
+            Upper bound of the sieve, a file with another limit is regenerated
+
+        Returns
+        -------
+        Sieve
+            Loaded sieve
+        """
+        if (sieve := cls._map(path, limit)) is not None:
+            return sieve
+        save(path, limit, generate(limit))
+        if (sieve := cls._map(path, limit)) is None:
+            raise OSError(f"Failed to load sieve, '{path}'")
+        return sieve
+
+    @classmethod
+    def _map(cls, path: str, limit: int) -> Optional["Sieve"]:
+        try:
+            with open(path, "rb") as file:
+                bits = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            return None
+        size = HEADER.size + -(-(limit // 2) // 8)
+        if len(bits) != size or HEADER.unpack_from(bits) != (MAGIC, limit):
+            bits.close()
+            return None
+        return cls(limit, bits, HEADER.size)
+
+
+def save(path: str, limit: int, bits: bytes) -> None:
+    """Write a sieve file, replacing any existing file atomically.
+
+    Parameters
+    ----------
+    path : str
+        Sieve file
+    limit : int
+        Upper bound of the sieve
+    bits : bytes
+        Bitset of odd primes as made by `generate`
+    """
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(HEADER.pack(MAGIC, limit))
+        file.write(bits)
+    os.replace(temporary, path)
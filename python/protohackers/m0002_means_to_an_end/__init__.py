@@ -1,10 +1,28 @@
+import argparse
 import sys
-from protohackers.m0002_means_to_an_end.price import run
+from protohackers.m0002_means_to_an_end.price import STORES, run
 
 
 def main():
     try:
-        run()
+        parser = argparse.ArgumentParser()
+        parser.add_argument(
+            "-s",
+            "--store",
+            type=str,
+            choices=list(STORES),
+            default="indexed",
+            help="select how session prices are stored (default indexed)",
+        )
+        parser.add_argument(
+            "--no-traffic-log",
+            action="store_false",
+            dest="log_traffic",
+            help="do not log every message",
+        )
+        args = parser.parse_args()
+
+        run(args.store, args.log_traffic)
     except KeyboardInterrupt:
         print("Exited by user...")
         sys.exit(1)
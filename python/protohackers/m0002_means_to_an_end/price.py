@@ -1,13 +1,27 @@
 import asyncio
 import logging
-import logging.config
-from typing import Dict
+import struct
+from typing import Callable, Dict, List
+
+from protohackers.log import get_logger, get_traffic_logger, setup_logging
+from protohackers.m0002_means_to_an_end.store import (
+    CompactPriceStore,
+    DuplicateTimestampError,
+    Prices,
+    PriceStore,
+)
 
 LENGTH = 9
+BUFFER = LENGTH * 8192
+MESSAGE = struct.Struct(">cii")
+ANSWER = struct.Struct(">i")
+STORES: Dict[str, Callable[[], Prices]] = {
+    "indexed": PriceStore,
+    "compact": CompactPriceStore,
+}
 
-# create logger
-logging.config.fileConfig("../logging.conf")
-logger = logging.getLogger("price")
+logger = get_logger("means_to_an_end")
+traffic = get_traffic_logger("means_to_an_end")
 
 
 class UndefinedBehaviour(Exception):
@@ -16,70 +30,87 @@ class UndefinedBehaviour(Exception):
         super().__init__(message)
 
 
-async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
-    prices: Dict[int, int] = {}
-    data = bytearray(9)
+async def handle(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    store: Callable[[], Prices] = PriceStore,
+):
+    prices = store()
+    answers: List[bytes] = []
+    pending = b""
     try:
-        while data := await reader.readexactly(LENGTH):
-            logger.debug(f"Processing: {data}")
-            match data[0]:
-                case 73:  # I
-                    prices = await insert(data[1:], prices)
-                case 81:  # Q
-                    price = await query(data[1:], prices)
-                    logger.debug(f"Sending: {price}")
-                    writer.write(price)
-                    await writer.drain()
-                case _:
-                    raise UndefinedBehaviour(f"Invalid type, '{data[0]}'")
-    except UndefinedBehaviour:
-        writer.write(b"Undefined behaviour")
-        await writer.drain()
-    except asyncio.IncompleteReadError:
+        while chunk := await reader.read(BUFFER):
+            data = pending + chunk if pending else chunk
+            whole = len(data) - len(data) % LENGTH
+            pending = data[whole:]
+            with memoryview(data) as view:
+                process(view[:whole], prices, answers)
+            if answers:
+                writer.write(b"".join(answers))
+                answers.clear()
+                await writer.drain()
         writer.write(b"Incomplete message")
         await writer.drain()
+    except UndefinedBehaviour:
+        answers.append(b"Undefined behaviour")
+        writer.write(b"".join(answers))
+        await writer.drain()
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("Session used %d bytes for %d prices", prices.nbytes(), len(prices))
     writer.close()
     await writer.wait_closed()
 
 
-async def insert(data: bytearray, prices: Dict[int, int]) -> Dict[int, int]:
-    time = int.from_bytes(data[:4], "big", signed=True)
-    price = int.from_bytes(data[4:], "big", signed=True)
-    logger.info(f"Inserting: '{time}: {price}'")
-    if time in prices.keys():
-        raise UndefinedBehaviour(f"Existing timestamp, '{time}', '{prices.keys()}'")
-    prices[time] = price
-    return prices
-
-
-async def query(input: bytearray, prices: dict) -> bytes:
-    min_time = int.from_bytes(input[:4], "big", signed=True)
-    max_time = int.from_bytes(input[4:], "big", signed=True)
-
+def process(data: memoryview, prices: Prices, answers: List[bytes]) -> None:
+    """Decode and apply every whole message in a chunk.
+
+    Parameters
+    ----------
+    data : memoryview
+        Whole 9 byte messages
+    prices : Prices
+        Prices of the session
+    answers : List[bytes]
+        Query answers are appended here, including those before a message
+        that raises UndefinedBehaviour
+    """
+    traffic.debug("Processing: %d messages", len(data) // LENGTH)
+    verbose = traffic.isEnabledFor(logging.INFO)
+    insert = prices.insert
+    for kind, first, second in MESSAGE.iter_unpack(data):
+        if kind == b"I":
+            if verbose:
+                traffic.info("Inserting: '%d: %d'", first, second)
+            try:
+                insert(first, second)
+            except DuplicateTimestampError as error:
+                raise UndefinedBehaviour(str(error)) from error
+        elif kind == b"Q":
+            answers.append(query(first, second, prices))
+        else:
+            raise UndefinedBehaviour(f"Invalid type, '{kind[0]}'")
+
+
+def query(min_time: int, max_time: int, prices: Prices) -> bytes:
     if min_time > max_time:
-        logger.debug(f"Min > Max: '{min_time}' < '{max_time}'")
+        traffic.debug("Min > Max: '%d' < '%d'", min_time, max_time)
         return bytes(4)
-    logger.info(f"Querying: '{min_time}' to '{max_time}'")
+    traffic.info("Querying: '%d' to '%d'", min_time, max_time)
+    return ANSWER.pack(prices.mean(min_time, max_time))
 
-    keys = list(filter(lambda x: x >= min_time and x <= max_time, prices.keys()))
-    if not keys:
-        logger.debug(f"No matching keys: '{min_time}' to '{max_time}'")
-        return bytes(4)
 
-    return int(sum([prices[key] for key in keys]) / len(keys)).to_bytes(
-        4, "big", signed=True
+async def serve(store: Callable[[], Prices]):
+    server = await asyncio.start_server(
+        lambda reader, writer: handle(reader, writer, store), "0.0.0.0", 10007  # nosec
     )
-
-
-async def serve():
-    server = await asyncio.start_server(handle, "0.0.0.0", 10007)  # nosec
     async with server:
         await server.serve_forever()
 
 
-def run():
-    print("Running means to an end")
-    asyncio.run(serve(), debug=True)
+def run(store: str = "indexed", log_traffic: bool = True):
+    setup_logging(log_traffic)
+    print(f"Running means to an end ({store} store)")
+    asyncio.run(serve(STORES[store]), debug=True)
 
 
 if __name__ == "__main__":
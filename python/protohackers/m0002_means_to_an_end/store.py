@@ -0,0 +1,319 @@
+"""Ordered price storage with fast range queries."""
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from typing import Dict, List, Optional, Set, Tuple
+
+BLOCK = 512
+COMPACT_BLOCK = 64
+
+
+class DuplicateTimestampError(ValueError):
+    """A price was already inserted for the timestamp."""
+
+
+class PriceStore:
+    """Prices of a session ordered by timestamp.
+
+    Timestamps are kept in a list of sorted blocks so out of order inserts
+    only move the entries of one block. A Fenwick tree over the blocks holds
+    their sums and counts, and each block lazily builds prefix sums.
+
+    Inserts only mark their block as changed and both catch up on the next
+    query. Queries with no inserts since the last one take O(log n) steps.
+    The first query after inserts also applies each changed block to the
+    tree in O(log n), or rebuilds the tree in O(n / BLOCK) after a split or
+    when more blocks changed. It rebuilds the prefix sums of the blocks it
+    lands in in O(BLOCK). That work is amortised over the inserts that
+    caused it.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty store."""
+        self._maxes: List[int] = []
+        self._times: List[List[int]] = []
+        self._prices: List[List[int]] = []
+        self._prefix: List[Optional[List[int]]] = []
+        self._sums: List[int] = []
+        # Fenwick tree and the block sums and counts it was last updated with
+        self._tree_sum: List[int] = [0]
+        self._tree_count: List[int] = [0]
+        self._known_sums: List[int] = []
+        self._known_counts: List[int] = []
+        # Blocks changed since the tree was updated, None if it must be rebuilt
+        self._stale: Optional[Set[int]] = set()
+        self._len = 0
+
+    def __len__(self) -> int:
+        """Get the number of stored prices."""
+        return self._len
+
+    def insert(self, time: int, price: int) -> None:
+        """Insert the price at a timestamp.
+
+        Parameters
+        ----------
+        time : int
+            Timestamp
+        price : int
+            Price
+
+        Raises
+        ------
+        DuplicateTimestampError
+            A price already exists for the timestamp
+        """
+        if not self._times or time > self._maxes[-1]:
+            # Appending in timestamp order is the common case
+            if not self._times:
+                self._new_block()
+            block = len(self._times) - 1
+            times = self._times[block]
+            times.append(time)
+            self._prices[block].append(price)
+            self._maxes[block] = time
+        else:
+            block = bisect_left(self._maxes, time)
+            times = self._times[block]
+            i = bisect_left(times, time)
+            if times[i] == time:
+                raise DuplicateTimestampError(f"Existing timestamp, '{time}'")
+            times.insert(i, time)
+            self._prices[block].insert(i, price)
+        self._prefix[block] = None
+        self._sums[block] += price
+        self._len += 1
+
+        if len(times) > 2 * BLOCK:
+            self._split(block)
+        elif self._stale is not None:
+            self._stale.add(block)
+
+    def mean(self, min_time: int, max_time: int) -> int:
+        """Get the mean price between two timestamps, inclusive.
+
+        Parameters
+        ----------
+        min_time : int
+            First timestamp
+        max_time : int
+            Last timestamp
+
+        Returns
+        -------
+        int
+            Mean price truncated to an integer, 0 if there are no prices
+        """
+        if min_time > max_time:
+            return 0
+        self._update_tree()
+        high_sum, high_count = self._below(max_time + 1)
+        low_sum, low_count = self._below(min_time)
+        count = high_count - low_count
+        if not count:
+            return 0
+        return int((high_sum - low_sum) / count)
+
+    def _below(self, time: int) -> Tuple[int, int]:
+        # Sum and count of the prices before a timestamp
+        block = bisect_left(self._maxes, time)
+        total, count = 0, 0
+        i = block
+        while i:
+            total += self._tree_sum[i]
+            count += self._tree_count[i]
+            i &= i - 1
+        if block < len(self._times):
+            index = bisect_left(self._times[block], time)
+            total += self._block_prefix(block)[index]
+            count += index
+        return total, count
+
+    def _block_prefix(self, block: int) -> List[int]:
+        if (prefix := self._prefix[block]) is None:
+            prefix = self._prefix[block] = list(
+                accumulate(self._prices[block], initial=0)
+            )
+        return prefix
+
+    def _new_block(self) -> None:
+        self._maxes.append(0)
+        self._times.append([])
+        self._prices.append([])
+        self._prefix.append(None)
+        self._sums.append(0)
+        self._stale = None
+
+    def _split(self, block: int) -> None:
+        times, prices = self._times[block], self._prices[block]
+        self._times[block : block + 1] = [times[:BLOCK], times[BLOCK:]]
+        self._prices[block : block + 1] = [prices[:BLOCK], prices[BLOCK:]]
+        self._maxes[block : block + 1] = [times[BLOCK - 1], times[-1]]
+        self._prefix[block : block + 1] = [None, None]
+        self._sums[block : block + 1] = [sum(prices[:BLOCK]), sum(prices[BLOCK:])]
+        self._stale = None
+
+    def _update_tree(self) -> None:
+        # Bring the Fenwick tree up to date with the blocks, applying the
+        # changed blocks one by one unless rebuilding it is cheaper
+        size = len(self._tree_sum)
+        if self._stale is None or len(self._stale) * size.bit_length() > size:
+            self._rebuild_tree()
+            return
+        for block in self._stale:
+            total = self._sums[block] - self._known_sums[block]
+            count = len(self._times[block]) - self._known_counts[block]
+            self._known_sums[block] = self._sums[block]
+            self._known_counts[block] = len(self._times[block])
+            i = block + 1
+            while i < size:
+                self._tree_sum[i] += total
+                self._tree_count[i] += count
+                i += i & -i
+        self._stale.clear()
+
+    def _rebuild_tree(self) -> None:
+        # Build the Fenwick tree over the block sums and counts in linear time
+        self._known_sums = self._sums.copy()
+        self._known_counts = [len(times) for times in self._times]
+        self._tree_sum = [0] + self._known_sums
+        self._tree_count = [0] + self._known_counts
+        for i in range(1, len(self._tree_sum)):
+            parent = i + (i & -i)
+            if parent < len(self._tree_sum):
+                self._tree_sum[parent] += self._tree_sum[i]
+                self._tree_count[parent] += self._tree_count[i]
+        self._stale = set()
+
+    def nbytes(self) -> int:
+        """Estimate the memory used by the stored prices."""
+        size = sum(map(sys.getsizeof, (self._maxes, self._sums, self._prefix)))
+        size += sys.getsizeof(self._times) + sys.getsizeof(self._prices)
+        for times, prices, prefix in zip(self._times, self._prices, self._prefix):
+            for column in (times, prices, prefix or []):
+                size += sys.getsizeof(column) + sum(map(sys.getsizeof, column))
+        return size
+
+
+class CompactPriceStore:
+    """Prices of a session in sorted 32 bit columns.
+
+    Timestamps and prices are kept in two ``array('i')`` columns with sums of
+    every `COMPACT_BLOCK` prices, about 8 bytes per price. New prices go to a
+    small unsorted tail that is merged into the columns once it grows past the
+    square root of the stored prices, or right away when appended in
+    timestamp order.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty store."""
+        self._times = array("i")
+        self._prices = array("i")
+        # Sum of the prices before each block of COMPACT_BLOCK prices
+        self._block_sums = array("q", [0])
+        self._tail: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        """Get the number of stored prices."""
+        return len(self._times) + len(self._tail)
+
+    def insert(self, time: int, price: int) -> None:
+        """Insert the price at a timestamp.
+
+        Parameters
+        ----------
+        time : int
+            Timestamp
+        price : int
+            Price
+
+        Raises
+        ------
+        DuplicateTimestampError
+            A price already exists for the timestamp
+        """
+        if not self._tail and (not self._times or time > self._times[-1]):
+            self._times.append(time)
+            self._prices.append(price)
+            self._update_block_sums(len(self._times) - 1)
+            return
+        i = bisect_left(self._times, time)
+        if i < len(self._times) and self._times[i] == time or time in self._tail:
+            raise DuplicateTimestampError(f"Existing timestamp, '{time}'")
+        self._tail[time] = price
+        if len(self._tail) * len(self._tail) > len(self._times):
+            self._merge()
+
+    def mean(self, min_time: int, max_time: int) -> int:
+        """Get the mean price between two timestamps, inclusive.
+
+        Parameters
+        ----------
+        min_time : int
+            First timestamp
+        max_time : int
+            Last timestamp
+
+        Returns
+        -------
+        int
+            Mean price truncated to an integer, 0 if there are no prices
+        """
+        if min_time > max_time:
+            return 0
+        low = bisect_left(self._times, min_time)
+        high = bisect_right(self._times, max_time)
+        total = self._sum_before(high) - self._sum_before(low)
+        count = high - low
+        for time, price in self._tail.items():
+            if min_time <= time <= max_time:
+                total += price
+                count += 1
+        if not count:
+            return 0
+        return int(total / count)
+
+    def nbytes(self) -> int:
+        """Estimate the memory used by the stored prices."""
+        size = sum(map(sys.getsizeof, (self._times, self._prices, self._block_sums)))
+        size += sys.getsizeof(self._tail)
+        for time, price in self._tail.items():
+            size += sys.getsizeof(time) + sys.getsizeof(price)
+        return size
+
+    def _sum_before(self, index: int) -> int:
+        block = index // COMPACT_BLOCK
+        start = block * COMPACT_BLOCK
+        return self._block_sums[block] + sum(self._prices[start:index])
+
+    def _merge(self) -> None:
+        # Merge the sorted tail into the columns with slice copies
+        times, prices = array("i"), array("i")
+        first, position = len(self._times), 0
+        for time, price in sorted(self._tail.items()):
+            i = bisect_left(self._times, time, position)
+            first = min(first, i)
+            times.extend(self._times[position:i])
+            prices.extend(self._prices[position:i])
+            times.append(time)
+            prices.append(price)
+            position = i
+        times.extend(self._times[position:])
+        prices.extend(self._prices[position:])
+        self._times, self._prices = times, prices
+        self._tail.clear()
+        self._update_block_sums(first)
+
+    def _update_block_sums(self, changed: int) -> None:
+        # Recompute the block sums after the first changed index
+        block = changed // COMPACT_BLOCK + 1
+        del self._block_sums[block:]
+        start = (block - 1) * COMPACT_BLOCK
+        while start + COMPACT_BLOCK <= len(self._prices):
+            total = sum(self._prices[start : start + COMPACT_BLOCK])
+            self._block_sums.append(self._block_sums[-1] + total)
+            start += COMPACT_BLOCK
+
+
+Prices = PriceStore | CompactPriceStore
@@ -1,10 +1,76 @@
+import argparse
 import sys
-from protohackers.m0003_budget_chat.chat import run
+from protohackers.m0003_budget_chat import shard
+from protohackers.m0003_budget_chat.chat import (
+    BATCH_BYTES,
+    QUEUE_SIZE,
+    SLOW_POLICIES,
+    Chat,
+    run,
+)
 
 
 def main():
     try:
-        run()
+        parser = argparse.ArgumentParser()
+        parser.add_argument(
+            "-w",
+            "--workers",
+            type=int,
+            default=1,
+            help="processes sharing the port, more than 1 relays through a hub"
+            " (default 1)",
+        )
+        parser.add_argument(
+            "--queue-size",
+            type=int,
+            default=QUEUE_SIZE,
+            help=f"messages queued per client (default {QUEUE_SIZE})",
+        )
+        parser.add_argument(
+            "--slow-policy",
+            type=str,
+            choices=SLOW_POLICIES,
+            default="disconnect",
+            help="what to do when a client's queue is full (default disconnect)",
+        )
+        parser.add_argument(
+            "--flush-window",
+            type=float,
+            default=0,
+            help="milliseconds to gather messages to a client into one write"
+            " (default 0, off)",
+        )
+        parser.add_argument(
+            "--batch-bytes",
+            type=int,
+            default=BATCH_BYTES,
+            help=f"most bytes written to a client at once (default {BATCH_BYTES})",
+        )
+        parser.add_argument(
+            "--no-traffic-log",
+            action="store_false",
+            dest="log_traffic",
+            help="do not log every message",
+        )
+        parser.add_argument(
+            "--log-recipients",
+            action="store_true",
+            help="log every message once per recipient instead of once",
+        )
+        args = parser.parse_args()
+
+        options = (
+            args.queue_size,
+            args.slow_policy,
+            args.log_recipients,
+            args.flush_window / 1000,
+            args.batch_bytes,
+        )
+        if args.workers > 1:
+            shard.run(args.workers, shard.ShardedChat(*options), args.log_traffic)
+        else:
+            run(Chat(*options), args.log_traffic)
     except KeyboardInterrupt:
         print("Exited by user...")
         sys.exit(1)
@@ -1,16 +1,19 @@
 import asyncio
-import logging
-import logging.config
 import re
-from typing import Optional, Set
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set
 from uuid import uuid4
 
-from protohackers import logging_config
+from protohackers.framing import LineFramer, LineTooLongError, readline
+from protohackers.log import get_logger, get_traffic_logger, setup_logging
 
-# create logger
-logging.config.dictConfig(logging_config)
-# logging.config.fileConfig("../logging.conf")
-logger = logging.getLogger("protohackers")
+logger = get_logger("budget_chat")
+traffic = get_traffic_logger("budget_chat")
+
+QUEUE_SIZE = 1024
+BATCH_BYTES = 65536
+CLOSE_TIMEOUT = 5.0
+SLOW_POLICIES = ("disconnect", "drop-oldest", "drop-newest")
 
 
 class UndefinedBehaviour(Exception):
@@ -19,41 +22,174 @@ class UndefinedBehaviour(Exception):
         super().__init__(message)
 
 
+class Roster:
+    """Names in the room with the presence line kept encoded."""
+
+    presence = b"* The room contains: "
+
+    def __init__(self) -> None:
+        self._names: Set[str] = set()
+        # Names in the room, each followed by a comma, after a leading comma
+        self._encoded = bytearray(b",")
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._names
+
+    def add(self, name: str) -> None:
+        self._names.add(name)
+        self._encoded += bytes(name, encoding="ascii") + b","
+
+    def remove(self, name: str) -> None:
+        self._names.remove(name)
+        entry = bytes(f",{name},", encoding="ascii")
+        start = self._encoded.find(entry) + 1
+        del self._encoded[start : start + len(entry) - 1]
+
+    def get_presence(self) -> bytes:
+        return self.presence + self._encoded[1:-1] + b"\n"
+
+
 class Chat:
     class Session:
         reader: asyncio.StreamReader
         writer: asyncio.StreamWriter
+        framer: LineFramer
         name: str
         uuid: str
+        outbox: Deque[bytes]
+        queue_size: int
+        policy: str
+        log_recipients: bool
+        flush_window: float
+        batch_bytes: int
 
         @classmethod
         async def create(
-            cls, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, uuid: str
+            cls,
+            reader: asyncio.StreamReader,
+            writer: asyncio.StreamWriter,
+            uuid: str,
+            queue_size: int = QUEUE_SIZE,
+            policy: str = "disconnect",
+            log_recipients: bool = False,
+            flush_window: float = 0,
+            batch_bytes: int = BATCH_BYTES,
         ):
             self = cls()
             self.reader = reader
             self.writer = writer
+            self.framer = LineFramer()
             self.name = ""
             self.uuid = uuid
+            self.outbox = deque()
+            self.queue_size = queue_size
+            self.policy = policy
+            self.log_recipients = log_recipients
+            self.flush_window = flush_window
+            self.batch_bytes = batch_bytes
+            self._queued = 0  # Bytes in the outbox
+            self._ready = asyncio.Event()
+            self._full = asyncio.Event()
+            self._closing = False
+            self._writer_task = asyncio.create_task(self._write())
             return self
 
-        async def send(self, message: str, name: Optional[str] = None) -> None:
-            if name and name == self.name:
+        def send(self, message: bytes, name: Optional[str] = None) -> None:
+            """Queue a message for the writer task without waiting for it."""
+            if name and name == self.name or self._closing:
                 return
-            self.writer.write(bytes(message, encoding="ascii"))
-            logger.info(f"{self.uuid} --> {self.name}: {message!r}")
-            await self.writer.drain()
+            if len(self.outbox) >= self.queue_size:
+                logger.debug("%s === Outbox full, %s", self.uuid, self.policy)
+                if self.policy == "drop-newest":
+                    return
+                if self.policy == "disconnect":
+                    self.abort()
+                    return
+                self._queued -= len(self.outbox.popleft())
+            self.outbox.append(message)
+            self._queued += len(message)
+            self._ready.set()
+            if self._queued >= self.batch_bytes:
+                self._full.set()
 
-        async def recv(self) -> str:
-            message = await self.reader.readline()
-            logger.info(f"{self.uuid} <-- {self.name}: {message!r}")
-            return message.decode(encoding="ascii").rstrip("\r\n")
+        async def _write(self) -> None:
+            # Write queued messages until the session is closed
+            try:
+                while True:
+                    await self._ready.wait()
+                    self._ready.clear()
+                    if self.flush_window and not self._closing:
+                        await self._wait_for_batch()
+                    while self.outbox:
+                        batch = self._take()
+                        self.writer.writelines(batch)
+                        if self.log_recipients:
+                            for message in batch:
+                                traffic.info(
+                                    "%s --> %s: %r", self.uuid, self.name, message
+                                )
+                        await self.writer.drain()
+                    if self._closing:
+                        return
+            except ConnectionError:
+                self._closing = True
+                self.outbox.clear()
 
-        def __eq__(self, value) -> bool:
-            return self.name == value
+        async def _wait_for_batch(self) -> None:
+            # Let more messages queue up for the flush window or until a full
+            # batch is queued
+            if self._queued < self.batch_bytes:
+                loop = asyncio.get_running_loop()
+                timer = loop.call_later(self.flush_window, self._full.set)
+                try:
+                    await self._full.wait()
+                finally:
+                    timer.cancel()
+            self._full.clear()
 
-        def __hash__(self) -> int:
-            return hash(self.name)
+        def _take(self) -> List[bytes]:
+            # Oldest queued message, and when batching the ones after it that
+            # fit in a batch
+            batch = [self.outbox.popleft()]
+            size = len(batch[0])
+            if self.flush_window:
+                while self.outbox and size + len(self.outbox[0]) <= self.batch_bytes:
+                    batch.append(self.outbox.popleft())
+                    size += len(batch[-1])
+            self._queued -= size
+            return batch
+
+        async def close(self, timeout: float = CLOSE_TIMEOUT) -> None:
+            """Write the queued messages and stop the writer task.
+
+            A client that does not read them within `timeout` seconds is
+            dropped with them.
+            """
+            self._closing = True
+            self._ready.set()
+            self._full.set()
+            try:
+                await asyncio.wait_for(self._writer_task, timeout)
+            except asyncio.TimeoutError:
+                logger.debug("%s === Not reading, dropped", self.uuid)
+                self.abort()
+
+        def abort(self) -> None:
+            """Drop the queued messages and the connection."""
+            self._closing = True
+            self.outbox.clear()
+            self._queued = 0
+            self._ready.set()
+            self._full.set()
+            self.writer.transport.abort()
+
+        async def recv(self) -> str:
+            try:
+                message = await readline(self.reader, self.framer)
+            except LineTooLongError as error:
+                raise UndefinedBehaviour(f"{self.uuid} sent {error}") from error
+            traffic.info("%s <-- %s: %r", self.uuid, self.name, message)
+            return message.decode(encoding="ascii").rstrip("\r\n")
 
         def __str__(self) -> str:
             return self.name
@@ -61,78 +197,132 @@ class Chat:
         def __repr__(self) -> str:
             return self.name
 
-    hello = "Welcome to budgetchat! What shall I call you?\n"
-    presence = "* The room contains: {}\n"
+    hello = b"Welcome to budgetchat! What shall I call you?\n"
     user_join = "* {} has entered the room\n"
     user_leave = "* {} has left the room\n"
     message = "[{}] {}\n"
-    sessions: Set[Session]
+    sessions: Dict[str, Session]
 
-    def __init__(self) -> None:
-        self.sessions = set()
+    def __init__(
+        self,
+        queue_size: int = QUEUE_SIZE,
+        policy: str = "disconnect",
+        log_recipients: bool = False,
+        flush_window: float = 0,
+        batch_bytes: int = BATCH_BYTES,
+    ):
+        """Initialize an empty room.
+
+        Parameters
+        ----------
+        queue_size : int, optional
+            Messages queued per session before `policy` applies, by default 1024
+        policy : str, optional
+            What to do when a session's queue is full, "disconnect" drops the
+            session, "drop-oldest" and "drop-newest" drop a message,
+            by default "disconnect"
+        log_recipients : bool, optional
+            Log every message written to every session instead of once per
+            broadcast, by default False
+        flush_window : float, optional
+            Seconds a session waits for more messages to write them at once,
+            0 writes every message on its own, by default 0
+        batch_bytes : int, optional
+            Most bytes written at once, a session stops waiting for more
+            messages once this many are queued, by default 65536
+        """
+        if policy not in SLOW_POLICIES:
+            raise ValueError(f"Unknown slow consumer policy, '{policy}'")
+        self.sessions = {}
+        self.roster = Roster()
         self.name_pattern = re.compile(r"^[a-zA-Z0-9]+", re.ASCII)
+        self.queue_size = queue_size
+        self.policy = policy
+        self.log_recipients = log_recipients
+        self.flush_window = flush_window
+        self.batch_bytes = batch_bytes
 
-    async def join(self, session: Session) -> str:
-        await session.send(self.hello)
+    async def join(self, session: Session) -> None:
+        session.send(self.hello)
         message = await session.recv()
-        if name := await self.validate_name(message):
-            users: str = await self.get_users()
-            await session.send(self.presence.format(users))
-            return name
-        raise UndefinedBehaviour("User failed to join")
+        # Nothing is awaited between checking and adding the name, so two
+        # sessions can not join with the same name
+        if (name := self.validate_name(message)) is None:
+            raise UndefinedBehaviour("User failed to join")
+        session.send(self.roster.get_presence())
+        session.name = name
+        self.sessions[name] = session
+        self.roster.add(name)
+
+    def leave(self, session: Session) -> None:
+        del self.sessions[session.name]
+        self.roster.remove(session.name)
 
     async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        uuid = uuid4().hex
+        logger.debug("%s === New session", uuid)
+        session = await self.Session.create(
+            reader,
+            writer,
+            uuid,
+            self.queue_size,
+            self.policy,
+            self.log_recipients,
+            self.flush_window,
+            self.batch_bytes,
+        )
         try:
-            uuid = uuid4().hex
-            logger.debug(f"{uuid} === New session")
-            session = await self.Session.create(reader, writer, uuid)
-            session.name = await self.join(session)
-            await self.send(self.user_join, session.name)
-            self.sessions.add(session)
-
-            while message := await session.recv():
-                await self.send(self.message, session.name, message, name=session.name)
-
-            logger.debug(f"{session.uuid} === Terminating session")
-            self.sessions.remove(session)
-            await self.send(self.user_leave, session.name)
+            await self.join(session)
+            try:
+                self.send(self.user_join, session.name, name=session.name)
+                while message := await session.recv():
+                    self.send(self.message, session.name, message, name=session.name)
+            finally:
+                logger.debug("%s === Terminating session", session.uuid)
+                self.leave(session)
+                self.send(self.user_leave, session.name)
 
         except UndefinedBehaviour:
-            writer.write(b"Undefined behaviour")
-            await writer.drain()
-        writer.close()
-        await writer.wait_closed()
+            session.send(b"Undefined behaviour")
+        finally:
+            # Stop the writer task however the session ended
+            await session.close()
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
 
-    async def send(self, template: str, *args, name: Optional[str] = None):
-        message = template.format(*args)
-        for session in self.sessions:
-            await session.send(message, name)
+    def send(self, template: str, *args, name: Optional[str] = None):
+        self.deliver(bytes(template.format(*args), encoding="ascii"), name)
 
-    async def get_users(self) -> str:
-        users = [f"{session}" for session in self.sessions]
-        return ",".join(users)
+    def deliver(self, message: bytes, name: Optional[str] = None) -> None:
+        # Queue the same encoded buffer for every session but the sender's
+        for session in self.sessions.values():
+            session.send(message, name)
+        traffic.info("%s --> %d sessions: %r", name, len(self.sessions), message)
 
-    async def validate_name(self, name: str) -> Optional[str]:
+    def validate_name(self, name: str) -> Optional[str]:
         if len(name) >= 32:
             return None
-        if name in self.sessions:
+        if name in self.roster:
             return None
         if not self.name_pattern.match(name):
             return None
         return name
 
 
-async def serve():
-    chat = Chat()
+async def serve(chat: Chat):
     server = await asyncio.start_server(chat.handle, "0.0.0.0", 10007)  # nosec
     async with server:
         await server.serve_forever()
 
 
-def run():
+def run(chat: Chat, log_traffic: bool = True):
+    setup_logging(log_traffic)
     print("Running budget chat")
-    asyncio.run(serve(), debug=True)
+    asyncio.run(serve(chat), debug=True)
 
 
 if __name__ == "__main__":
-    run()
+    run(Chat())
@@ -0,0 +1,219 @@
+"""Budget chat sharded over worker processes sharing one port.
+
+Every worker accepts clients on the same port with ``SO_REUSEPORT`` and keeps
+only its own sessions. The room's roster and the order of its messages are
+kept by a hub in the parent process that workers talk to over a Unix socket.
+Workers publish joins, leaves and broadcasts to the hub, which relays every
+broadcast to all workers in one order, so every client sees the same roster
+and message order as with a single process.
+
+Hub protocol, one event per line:
+
+- ``J <uuid> <name>`` worker asks to join a session under a name
+- ``A <uuid> <presence line>`` hub accepts the name, sent to the asking worker
+- ``R <uuid>`` hub rejects the name, sent to the asking worker
+- ``L <name>`` worker removes a session from the roster
+- ``B <name> <message>`` broadcast to every session except `name`, which may
+  be empty, relayed by the hub to all workers
+"""
+import asyncio
+import multiprocessing
+import os
+import socket
+import tempfile
+from typing import Dict, Optional, Set, Tuple
+
+from protohackers.framing import LineFramer, readline
+from protohackers.log import get_logger, setup_logging
+from protohackers.m0003_budget_chat.chat import Chat, Roster, UndefinedBehaviour
+
+HIGH_WATER = 1 << 20
+
+logger = get_logger("budget_chat")
+
+
+class Hub:
+    """Roster of the room and sequencer of the events of all workers."""
+
+    def __init__(self) -> None:
+        self.roster = Roster()
+        # Workers and the names of the sessions they joined
+        self.workers: Dict[asyncio.StreamWriter, Set[str]] = {}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        names: Set[str] = set()
+        self.workers[writer] = names
+        framer = LineFramer(max_line=None)
+        try:
+            while line := await readline(reader, framer, keepends=True):
+                self.dispatch(line, writer, names)
+                # Only a worker far behind holds up the events of this one
+                for worker in list(self.workers):
+                    if worker.transport.get_write_buffer_size() > HIGH_WATER:
+                        try:
+                            await worker.drain()
+                        except ConnectionError:
+                            pass  # Cleaned up by the handler of that worker
+        except ConnectionError:
+            pass
+        finally:
+            # Sessions of a lost worker leave the room
+            del self.workers[writer]
+            for name in names:
+                self.roster.remove(name)
+                leave = bytes(Chat.user_leave.format(name), encoding="ascii")
+                self.publish(b"B  " + leave)
+            writer.close()
+
+    def dispatch(
+        self, line: bytes, writer: asyncio.StreamWriter, names: Set[str]
+    ) -> None:
+        """Apply one event of a worker."""
+        kind, _, rest = line.partition(b" ")
+        if kind == b"B":
+            self.publish(line)
+        elif kind == b"J":
+            uuid, _, encoded = rest.rstrip(b"\n").partition(b" ")
+            name = encoded.decode(encoding="ascii")
+            if name in self.roster:
+                writer.write(b"R " + uuid + b"\n")
+                return
+            writer.write(b"A " + uuid + b" " + self.roster.get_presence())
+            self.roster.add(name)
+            names.add(name)
+        elif kind == b"L":
+            name = rest.rstrip(b"\n").decode(encoding="ascii")
+            self.roster.remove(name)
+            names.discard(name)
+
+    def publish(self, line: bytes) -> None:
+        for worker in self.workers:
+            worker.write(line)
+
+
+class ShardedChat(Chat):
+    """Room of one worker, with the roster and message order kept by the hub."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._bus: Optional[asyncio.StreamWriter] = None
+        # Sessions waiting for the hub to answer their join
+        self._joining: Dict[bytes, Tuple[Chat.Session, str, asyncio.Future]] = {}
+
+    async def connect(self, path: str) -> asyncio.Task:
+        """Connect to the hub.
+
+        Parameters
+        ----------
+        path : str
+            Unix socket of the hub
+
+        Returns
+        -------
+        asyncio.Task
+            Task relaying hub events to the sessions, done when the hub is lost
+        """
+        reader, self._bus = await asyncio.open_unix_connection(path)
+        return asyncio.create_task(self._receive(reader))
+
+    async def join(self, session: Chat.Session) -> None:
+        session.send(self.hello)
+        message = await session.recv()
+        if (name := self.validate_name(message)) is None:
+            raise UndefinedBehaviour("User failed to join")
+        uuid = bytes(session.uuid, encoding="ascii")
+        joined = asyncio.get_running_loop().create_future()
+        self._joining[uuid] = (session, name, joined)
+        self.publish(b"J " + uuid + b" " + bytes(name, encoding="ascii") + b"\n")
+        if not await joined:
+            raise UndefinedBehaviour("User failed to join")
+
+    def validate_name(self, name: str) -> Optional[str]:
+        # Hub events end the name at the first space, so only names that are
+        # alphanumeric throughout are relayed intact
+        if not self.name_pattern.fullmatch(name):
+            return None
+        return super().validate_name(name)
+
+    def leave(self, session: Chat.Session) -> None:
+        del self.sessions[session.name]
+        self.publish(b"L " + bytes(session.name, encoding="ascii") + b"\n")
+
+    def send(self, template: str, *args, name: Optional[str] = None):
+        message = bytes(template.format(*args), encoding="ascii")
+        self.publish(b"B " + bytes(name or "", encoding="ascii") + b" " + message)
+
+    def publish(self, event: bytes) -> None:
+        if self._bus is None:
+            raise ConnectionError("Not connected to the hub")
+        self._bus.write(event)
+
+    async def _receive(self, reader: asyncio.StreamReader) -> None:
+        framer = LineFramer(max_line=None)
+        while line := await readline(reader, framer, keepends=True):
+            kind, _, rest = line.partition(b" ")
+            if kind == b"B":
+                name, _, message = rest.partition(b" ")
+                self.deliver(message, name.decode(encoding="ascii") or None)
+            elif kind == b"A":
+                uuid, _, presence = rest.partition(b" ")
+                session, name, joined = self._joining.pop(uuid)
+                # Join before relaying the next event so none is missed
+                session.send(presence)
+                session.name = name
+                self.sessions[name] = session
+                joined.set_result(True)
+            elif kind == b"R":
+                _, _, joined = self._joining.pop(rest.rstrip(b"\n"))
+                joined.set_result(False)
+        logger.error("Lost connection to the hub")
+
+
+async def serve_worker(path: str, chat: ShardedChat) -> None:
+    bus = await chat.connect(path)
+    server = await asyncio.start_server(
+        chat.handle, "0.0.0.0", 10007, reuse_port=True  # nosec
+    )
+    async with server:
+        await bus
+
+
+def run_worker(path: str, chat: ShardedChat, log_traffic: bool) -> None:
+    setup_logging(log_traffic)
+    try:
+        asyncio.run(serve_worker(path, chat), debug=True)
+    except KeyboardInterrupt:
+        pass
+
+
+async def serve_hub(sock: socket.socket) -> None:
+    hub = Hub()
+    server = await asyncio.start_unix_server(hub.handle, sock=sock)
+    async with server:
+        await server.serve_forever()
+
+
+def run(workers: int, chat: ShardedChat, log_traffic: bool = True):
+    print(f"Running budget chat on {workers} workers")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "hub.sock")
+        # Listen before starting the workers so they can connect right away
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(path)
+        sock.listen()
+        processes = [
+            multiprocessing.Process(
+                target=run_worker,
+                args=(path, chat, log_traffic),
+                daemon=True,
+            )
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        setup_logging(log_traffic)
+        try:
+            asyncio.run(serve_hub(sock), debug=True)
+        finally:
+            for process in processes:
+                process.terminate()
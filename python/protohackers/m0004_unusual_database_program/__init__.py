@@ -1,10 +1,140 @@
+import argparse
 import sys
-from protohackers.m0004_unusual_database_program.kv import run
+from protohackers.m0004_unusual_database_program.durable import (
+    COMMIT_INTERVAL,
+    COMMIT_RECORDS,
+    SNAPSHOT_RECORDS,
+    DurableStore,
+)
+from protohackers.m0004_unusual_database_program.engine import run as run_engine
+from protohackers.m0004_unusual_database_program.kv import run as run_asyncio
+from protohackers.m0004_unusual_database_program.replica import (
+    MAX_LAG,
+    METRICS_INTERVAL,
+    PrimaryStore,
+)
+from protohackers.m0004_unusual_database_program.replica import run as run_replicated
+from protohackers.m0004_unusual_database_program.shared import CAPACITY, SharedStore
+from protohackers.m0004_unusual_database_program.shared import run as run_shared
+from protohackers.m0004_unusual_database_program.store import KvStore
 
 
 def main():
     try:
-        run()
+        parser = argparse.ArgumentParser()
+        parser.add_argument(
+            "-m",
+            "--method",
+            type=str,
+            choices=["asyncio", "engine", "shared"],
+            default="asyncio",
+            help="select which server to use (default asyncio)",
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=1,
+            help="engine threads, each on its own socket (default 1)",
+        )
+        parser.add_argument(
+            "-w",
+            "--workers",
+            type=int,
+            default=1,
+            help="shared worker processes, each on its own socket (default 1)",
+        )
+        parser.add_argument(
+            "--capacity",
+            type=int,
+            default=CAPACITY,
+            help=f"slots of the shared table, a power of two (default {CAPACITY})",
+        )
+        parser.add_argument(
+            "--replicas",
+            type=int,
+            default=0,
+            help="read replicas on the ports after 10007, asyncio only (default 0)",
+        )
+        parser.add_argument(
+            "--max-lag-ms",
+            type=float,
+            default=MAX_LAG * 1000,
+            help="most milliseconds a replica answers behind the primary"
+            f" (default {MAX_LAG * 1000:g})",
+        )
+        parser.add_argument(
+            "--metrics-interval",
+            type=float,
+            default=METRICS_INTERVAL,
+            help=f"seconds between replication metrics (default {METRICS_INTERVAL:g})",
+        )
+        parser.add_argument(
+            "--data-dir",
+            type=str,
+            default=None,
+            help="persist the store to this directory (default in memory only)",
+        )
+        parser.add_argument(
+            "--commit-ms",
+            type=float,
+            default=COMMIT_INTERVAL * 1000,
+            help="most milliseconds between syncs of the log"
+            f" (default {COMMIT_INTERVAL * 1000:g})",
+        )
+        parser.add_argument(
+            "--commit-records",
+            type=int,
+            default=COMMIT_RECORDS,
+            help=f"inserts that start a sync early (default {COMMIT_RECORDS})",
+        )
+        parser.add_argument(
+            "--snapshot-records",
+            type=int,
+            default=SNAPSHOT_RECORDS,
+            help=f"inserts in a log that start a snapshot (default {SNAPSHOT_RECORDS})",
+        )
+        parser.add_argument(
+            "--no-traffic-log",
+            action="store_false",
+            dest="log_traffic",
+            help="do not log every request",
+        )
+        args = parser.parse_args()
+
+        if args.method == "shared" and args.data_dir:
+            parser.error("the shared method does not persist, drop --data-dir")
+        if args.replicas and (args.method != "asyncio" or args.data_dir):
+            parser.error("replicas need the asyncio method without --data-dir")
+        if args.method == "shared":
+            store: KvStore = SharedStore(args.capacity)
+        elif args.replicas:
+            store = PrimaryStore()
+        elif args.data_dir:
+            store = DurableStore(
+                args.data_dir,
+                args.commit_ms / 1000,
+                args.commit_records,
+                args.snapshot_records,
+            )
+        else:
+            store = KvStore()
+        try:
+            if isinstance(store, PrimaryStore):
+                run_replicated(
+                    store,
+                    args.replicas,
+                    args.max_lag_ms / 1000,
+                    args.metrics_interval,
+                    args.log_traffic,
+                )
+            elif isinstance(store, SharedStore):
+                run_shared(store, args.workers, args.log_traffic)
+            elif args.method == "engine":
+                run_engine(store, args.threads, args.log_traffic)
+            else:
+                run_asyncio(store, args.log_traffic)
+        finally:
+            store.close()
     except KeyboardInterrupt:
         print("Exited by user...")
         sys.exit(1)
@@ -0,0 +1,231 @@
+"""Key-value store persisted to an append-only log and snapshots.
+
+Inserts are applied in memory and appended to a buffer that a committer
+thread writes to the current log and fsyncs at least every `commit_interval`
+seconds, or sooner once `commit_records` inserts are waiting (group commit).
+Inserts are not acknowledged in this protocol, so a crash loses at most the
+inserts of the last interval.
+
+Once the log holds `snapshot_records` inserts, the committer starts a new log
+and writes every key to a snapshot, after which the older logs are deleted.
+Startup memory-maps the snapshot and replays the logs written after it,
+cutting off a torn record at the end of the last log.
+
+Snapshots and logs hold records of a `RECORD` header followed by the key and
+the value. The header is the CRC32 of key and value and their
+lengths.
+"""
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Dict, List, Tuple
+
+from protohackers.m0004_unusual_database_program.store import VERSION, KvStore
+
+MAGIC = b"PHKVSNP1"
+SNAPSHOT = struct.Struct("<8sQQ")  # Magic, first log generation, record count
+RECORD = struct.Struct("<III")  # CRC32, key length, value length
+COMMIT_INTERVAL = 0.01
+COMMIT_RECORDS = 1024
+SNAPSHOT_RECORDS = 1 << 20
+
+
+def encode(key: bytes, value: bytes) -> bytes:
+    """Encode an insert as a log or snapshot record."""
+    crc = zlib.crc32(value, zlib.crc32(key))
+    return RECORD.pack(crc, len(key), len(value)) + key + value
+
+
+def decode(
+    buffer: bytes | mmap.mmap, data: Dict[bytes, bytes], offset: int = 0
+) -> Tuple[int, int]:
+    """Apply the records of a buffer to a dict, up to the first incomplete one.
+
+    Parameters
+    ----------
+    buffer : bytes | mmap.mmap
+        Records
+    data : Dict[bytes, bytes]
+        Keys and values to update
+    offset : int, optional
+        Position of the first record, by default 0
+
+    Returns
+    -------
+    Tuple[int, int]
+        Number of records applied and the position after the last of them
+    """
+    count, end = 0, len(buffer)
+    while offset + RECORD.size <= end:
+        crc, key_length, value_length = RECORD.unpack_from(buffer, offset)
+        start = offset + RECORD.size
+        stop = start + key_length + value_length
+        if stop > end:
+            break
+        key = buffer[start : start + key_length]
+        value = buffer[start + key_length : stop]
+        if zlib.crc32(value, zlib.crc32(key)) != crc:
+            break
+        data[key] = value
+        count, offset = count + 1, stop
+    return count, offset
+
+
+class DurableStore(KvStore):
+    """Key-value store surviving restarts."""
+
+    def __init__(
+        self,
+        directory: str,
+        commit_interval: float = COMMIT_INTERVAL,
+        commit_records: int = COMMIT_RECORDS,
+        snapshot_records: int = SNAPSHOT_RECORDS,
+    ) -> None:
+        """Load the store saved in a directory and start committing to it.
+
+        Parameters
+        ----------
+        directory : str
+            Directory of the snapshot and logs, created if missing
+        commit_interval : float, optional
+            Most seconds between writing and syncing inserts, by default 0.01
+        commit_records : int, optional
+            Inserts waiting that start a commit early, by default 1024
+        snapshot_records : int, optional
+            Inserts in a log that start a snapshot, by default 1048576
+        """
+        super().__init__()
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.commit_interval = commit_interval
+        self.commit_records = commit_records
+        self.snapshot_records = snapshot_records
+        self._lock = threading.Lock()  # Guards the data and pending inserts
+        self._io_lock = threading.Lock()  # Guards the log file
+        self._pending = bytearray()
+        self._pending_records = 0
+        self._generation, self._log_records = self._load()
+        self._log = open(self._log_path(self._generation), "ab")
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._committer = threading.Thread(target=self._commit_loop, daemon=True)
+        self._committer.start()
+
+    def insert(self, key: bytes, value: bytes) -> None:
+        if key == b"version":
+            return
+        record = encode(key, value)
+        with self._lock:
+            self.data[key] = value
+            self._responses[key] = key + b"=" + value
+            self._pending += record
+            self._pending_records += 1
+            if self._pending_records >= self.commit_records:
+                self._wake.set()
+
+    def commit(self) -> None:
+        """Write and sync the waiting inserts to the log."""
+        with self._io_lock:
+            with self._lock:
+                pending, records = self._pending, self._pending_records
+                self._pending, self._pending_records = bytearray(), 0
+            if pending:
+                self._log.write(pending)
+                self._log.flush()
+                os.fsync(self._log.fileno())
+                self._log_records += records
+
+    def snapshot(self) -> None:
+        """Write every key to a snapshot and delete the logs it replaces."""
+        with self._io_lock:
+            with self._lock:
+                pending, records = self._pending, self._pending_records
+                self._pending, self._pending_records = bytearray(), 0
+                data = self.data.copy()
+            self._log.write(pending)
+            self._log.close()
+            self._generation += 1
+            self._log = open(self._log_path(self._generation), "ab")
+            self._log_records = 0
+        # Inserts after the copy go to the new log, which the snapshot keeps
+        path = os.path.join(self.directory, "snapshot")
+        with open(f"{path}.tmp", "wb") as file:
+            del data[b"version"]
+            file.write(SNAPSHOT.pack(MAGIC, self._generation, len(data)))
+            for key, value in data.items():
+                file.write(encode(key, value))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(f"{path}.tmp", path)
+        self._sync_directory()
+        for generation in self._generations():
+            if generation < self._generation:
+                os.remove(self._log_path(generation))
+
+    def close(self) -> None:
+        """Stop the committer and commit the waiting inserts."""
+        self._stop.set()
+        self._wake.set()
+        self._committer.join()
+        self.commit()
+        self._log.close()
+
+    def _commit_loop(self) -> None:
+        while not self._stop.is_set():
+            started = time.monotonic()
+            self.commit()
+            if self._log_records >= self.snapshot_records:
+                self.snapshot()
+            self._wake.wait(max(0.0, self.commit_interval - time.monotonic() + started))
+            self._wake.clear()
+
+    def _load(self) -> Tuple[int, int]:
+        # Load the snapshot and replay the logs after it, returning the
+        # generation of the last log and its number of records
+        first = self._load_snapshot()
+        generations = [g for g in self._generations() if g >= first] or [first]
+        records = 0
+        for generation in generations:
+            path = self._log_path(generation)
+            if not os.path.exists(path):
+                continue
+            with open(path, "rb") as file:
+                log = file.read()
+            records, end = decode(log, self.data)
+            if end < len(log):
+                # Torn write at the end of the log
+                os.truncate(path, end)
+        self.data[b"version"] = VERSION
+        return generations[-1], records
+
+    def _load_snapshot(self) -> int:
+        # Load the snapshot and return the generation of the first log after it
+        path = os.path.join(self.directory, "snapshot")
+        try:
+            file = open(path, "rb")
+        except FileNotFoundError:
+            return 0
+        with file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as snapshot:
+            magic, generation, count = SNAPSHOT.unpack_from(snapshot)
+            if magic != MAGIC:
+                raise ValueError(f"Not a snapshot, '{path}'")
+            if decode(snapshot, self.data, SNAPSHOT.size)[0] != count:
+                raise ValueError(f"Corrupt snapshot, '{path}'")
+        return generation
+
+    def _generations(self) -> List[int]:
+        names = os.listdir(self.directory)
+        return sorted(int(name[4:]) for name in names if name.startswith("log."))
+
+    def _log_path(self, generation: int) -> str:
+        return os.path.join(self.directory, f"log.{generation}")
+
+    def _sync_directory(self) -> None:
+        descriptor = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(descriptor)
+        finally:
+            os.close(descriptor)
@@ -0,0 +1,125 @@
+"""Batched UDP engine for the unusual database program.
+
+Each engine drains its non-blocking socket in batches into preallocated
+buffers with ``recvfrom_into`` and sends the replies of a batch together,
+without an event loop callback per datagram. Several engines on their own
+``SO_REUSEPORT`` sockets share one store from separate threads.
+"""
+import logging
+import selectors
+import socket
+import threading
+from typing import List, Tuple
+
+from protohackers.log import get_traffic_logger, setup_logging
+from protohackers.m0004_unusual_database_program.store import KvStore
+
+BATCH = 64
+DATAGRAM = 1000  # Requests must be shorter than this
+
+traffic = get_traffic_logger("unusual_database_program")
+
+
+def bind(address: Tuple[str, int]) -> socket.socket:
+    """Bind a non-blocking UDP socket that other sockets can share the port of.
+
+    Parameters
+    ----------
+    address : Tuple[str, int]
+        Host and port
+
+    Returns
+    -------
+    socket.socket
+        Bound socket
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.setblocking(False)
+    sock.bind(address)
+    return sock
+
+
+class UdpEngine:
+    """Serve a store on a UDP socket in batches."""
+
+    def __init__(self, store: KvStore, sock: socket.socket, batch: int = BATCH):
+        """Initialize an engine.
+
+        Parameters
+        ----------
+        store : KvStore
+            Store answering the requests
+        sock : socket.socket
+            Bound non-blocking socket
+        batch : int, optional
+            Most datagrams received before sending replies, by default 64
+        """
+        self.store = store
+        self.sock = sock
+        self._buffers = [memoryview(bytearray(DATAGRAM)) for _ in range(batch)]
+        self._stop = threading.Event()
+
+    def poll(self) -> int:
+        """Receive and answer the datagrams waiting on the socket, one batch.
+
+        Returns
+        -------
+        int
+            Number of datagrams received
+        """
+        replies: List[Tuple[bytes, Tuple[str, int]]] = []
+        verbose = traffic.isEnabledFor(logging.DEBUG)
+        received = 0
+        for buffer in self._buffers:
+            try:
+                size, address = self.sock.recvfrom_into(buffer)
+            except BlockingIOError:
+                break
+            received += 1
+            if size == DATAGRAM:
+                continue  # Too long, and possibly truncated
+            if verbose:
+                traffic.debug("%s: %r", address, bytes(buffer[:size]))
+            reply = self.store.handle(buffer[:size])
+            if reply is not None:
+                replies.append((reply, address))
+        for reply, address in replies:
+            try:
+                self.sock.sendto(reply, address)
+            except BlockingIOError:
+                pass  # Dropped like any other lost datagram
+        return received
+
+    def serve_forever(self) -> None:
+        """Answer datagrams until `stop` is called."""
+        with selectors.DefaultSelector() as selector:
+            selector.register(self.sock, selectors.EVENT_READ)
+            while not self._stop.is_set():
+                if selector.select(timeout=0.5):
+                    while self.poll() == len(self._buffers):
+                        pass
+
+    def stop(self) -> None:
+        """Make `serve_forever` return."""
+        self._stop.set()
+
+
+def run(store: KvStore, threads: int = 1, log_traffic: bool = True):
+    setup_logging(log_traffic)
+    print(f"Running unusual database program on {threads} threads")
+    engines = [
+        UdpEngine(store, bind(("0.0.0.0", 10007))) for _ in range(threads)  # nosec
+    ]
+    workers = [
+        threading.Thread(target=engine.serve_forever, daemon=True)
+        for engine in engines
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    finally:
+        for engine in engines:
+            engine.stop()
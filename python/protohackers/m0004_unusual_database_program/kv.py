@@ -1,36 +1,35 @@
 import asyncio
+import logging
 from asyncio.transports import DatagramTransport
 
+from protohackers.log import get_traffic_logger, setup_logging
+from protohackers.m0004_unusual_database_program.store import KvStore
+
+traffic = get_traffic_logger("unusual_database_program")
+
 
 class KvServerProtocol:
-    def __init__(self) -> None:
-        self.store = {"version": "Mez's Key-Value Store 0.1.0"}
+    def __init__(self, store: KvStore) -> None:
+        self.store = store
         self.transport: DatagramTransport
 
     def connection_made(self, transport: DatagramTransport):
         self.transport = transport
 
     def datagram_received(self, data: bytes, addr):
-        message = data.decode()
-        command = message.split("=", 1)
-        if len(command) == 1:
-            key = command[0]
-            value = self.store.get(key, "")
-            response = f"{key}={value}"
-            self.transport.sendto(response.encode(encoding="ascii"), addr)
-        elif len(command) == 2:
-            key, value = command[0], command[1]
-            if key == "version":
-                return
-            self.store[key] = value
-
-
-async def serve():
+        if traffic.isEnabledFor(logging.DEBUG):
+            traffic.debug("%s: %r", addr, data)
+        response = self.store.handle(data)
+        if response is not None:
+            self.transport.sendto(response, addr)
+
+
+async def serve(store: KvStore):
     loop = asyncio.get_running_loop()
     print("Starting UDP server")
 
     transport, _ = await loop.create_datagram_endpoint(
-        lambda: KvServerProtocol(), local_addr=("0.0.0.0", 10007)  # nosec
+        lambda: KvServerProtocol(store), local_addr=("0.0.0.0", 10007)  # nosec
     )
 
     try:
@@ -39,10 +38,11 @@ async def serve():
         transport.close()
 
 
-def run():
+def run(store: KvStore, log_traffic: bool = True):
+    setup_logging(log_traffic)
     print("Running unusual database program")
-    asyncio.run(serve(), debug=True)
+    asyncio.run(serve(store), debug=True)
 
 
 if __name__ == "__main__":
-    run()
+    run(KvStore())
@@ -0,0 +1,286 @@
+"""Unusual database program with read replicas.
+
+The primary serves inserts and retrieves like the single server, and streams
+every insert over a Unix socket to replica processes that serve retrieves on
+their own ports. A replica joining later first receives every key.
+
+Replication frames start with `FRAME`: a kind, the sequence number of the
+last insert, the primary's wall clock and the key and value lengths. Kind
+``I`` is followed by the key and value of an insert. Kind ``H`` is a
+heartbeat sent every `heartbeat` seconds, which the replica answers with the
+sequence it applied as an `ACK`.
+
+Lag is bounded on both ends. The primary drops a replica once more than
+`max_buffer` bytes of frames wait to be sent to it. A replica only answers
+retrieves while the last frame it applied was sent less than `max_lag`
+seconds ago, going by the clock of the host they share, so its answers are
+never older than that.
+"""
+import asyncio
+import multiprocessing
+import os
+import socket
+import struct
+import tempfile
+import time
+from typing import Dict, Optional
+
+from protohackers.log import get_logger, report, setup_logging
+from protohackers.m0004_unusual_database_program.kv import KvServerProtocol
+from protohackers.m0004_unusual_database_program.store import KvStore
+
+FRAME = struct.Struct("<cQdHH")  # Kind, sequence, time, key and value lengths
+ACK = struct.Struct("<Q")  # Sequence applied by a replica
+HEARTBEAT = 0.01
+MAX_LAG = 0.5
+MAX_BUFFER = 1 << 22
+METRICS_INTERVAL = 10.0
+RECONNECT = 1.0
+
+logger = get_logger("unusual_database_program")
+
+
+class PrimaryStore(KvStore):
+    """Store streaming its inserts to replicas."""
+
+    def __init__(self, heartbeat: float = HEARTBEAT, max_buffer: int = MAX_BUFFER):
+        """Initialize a store without replicas.
+
+        Parameters
+        ----------
+        heartbeat : float, optional
+            Seconds between heartbeats, by default 0.01
+        max_buffer : int, optional
+            Most bytes waiting to be sent to a replica before it is dropped,
+            by default 4 MiB
+        """
+        super().__init__()
+        self.heartbeat = heartbeat
+        self.max_buffer = max_buffer
+        self.sequence = 0
+        # Replicas and the last sequence they acknowledged, None while syncing
+        self.replicas: Dict[asyncio.StreamWriter, Optional[int]] = {}
+
+    def insert(self, key: bytes, value: bytes) -> None:
+        if key == b"version":
+            return
+        super().insert(key, value)
+        self.sequence += 1
+        if self.replicas:
+            header = FRAME.pack(b"I", self.sequence, time.time(), len(key), len(value))
+            frame = header + key + value
+            for writer in list(self.replicas):
+                self._send(writer, frame)
+
+    async def replicate(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Stream the keys and then the inserts to one replica until it leaves."""
+        now = time.time()
+        for key, value in self.data.items():
+            if key != b"version":
+                header = FRAME.pack(b"I", self.sequence, now, len(key), len(value))
+                writer.write(header + key + value)
+        self.replicas[writer] = None
+        logger.info("Replica joined at sequence %d", self.sequence)
+        try:
+            while True:
+                (sequence,) = ACK.unpack(await reader.readexactly(ACK.size))
+                if writer not in self.replicas:
+                    break  # Dropped for lagging, a late ack must not revive it
+                self.replicas[writer] = sequence
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.replicas.pop(writer, None)
+            writer.close()
+            logger.info("Replica left")
+
+    async def send_heartbeats(self) -> None:
+        """Send a heartbeat to every replica every `heartbeat` seconds."""
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            frame = FRAME.pack(b"H", self.sequence, time.time(), 0, 0)
+            for writer in list(self.replicas):
+                self._send(writer, frame)
+
+    def metrics(self) -> Dict[str, float]:
+        """Get the replication metrics, counters end with ``_total``."""
+        acked = [a for a in self.replicas.values() if a is not None]
+        return {
+            "inserts_total": self.sequence,
+            "replicas": len(self.replicas),
+            "syncing": len(self.replicas) - len(acked),
+            "lag_records_max": max((self.sequence - a for a in acked), default=0),
+        }
+
+    def _send(self, writer: asyncio.StreamWriter, frame: bytes) -> None:
+        # A syncing replica has every key waiting and is not dropped for it
+        lagging = writer.transport.get_write_buffer_size() > self.max_buffer
+        if lagging and self.replicas[writer] is not None:
+            logger.warning("Dropped a replica %d inserts behind", self._lag(writer))
+            del self.replicas[writer]
+            writer.transport.abort()
+            return
+        writer.write(frame)
+
+    def _lag(self, writer: asyncio.StreamWriter) -> int:
+        return self.sequence - (self.replicas[writer] or 0)
+
+
+class ReplicaStore(KvStore):
+    """Read-only store following a primary."""
+
+    def __init__(self, max_lag: float = MAX_LAG) -> None:
+        """Initialize a store that has not heard from the primary yet.
+
+        Parameters
+        ----------
+        max_lag : float, optional
+            Most seconds since the last applied frame was sent that retrieves
+            are answered, by default 0.5
+        """
+        super().__init__()
+        self.max_lag = max_lag
+        self.sequence = 0
+        self.sent = 0.0  # Primary time of the last applied frame
+        self.applied = 0
+        self.retrieves = 0
+        self.refused = 0
+
+    def lag(self) -> float:
+        """Seconds since the primary sent the last applied frame."""
+        return time.time() - self.sent
+
+    def handle(self, request: bytes | memoryview) -> Optional[bytes]:
+        request = bytes(request)
+        if b"=" in request:
+            return None  # Inserts go to the primary
+        if self.lag() > self.max_lag:
+            self.refused += 1
+            return None  # Too stale, lost like any datagram for the client
+        self.retrieves += 1
+        return super().handle(request)
+
+    async def follow(self, path: str) -> None:
+        """Apply the frames of the primary until it is lost.
+
+        Parameters
+        ----------
+        path : str
+            Unix socket of the primary
+        """
+        reader, writer = await asyncio.open_unix_connection(path)
+        try:
+            while True:
+                header = await reader.readexactly(FRAME.size)
+                kind, sequence, sent, key_length, value_length = FRAME.unpack(header)
+                if kind == b"I":
+                    record = await reader.readexactly(key_length + value_length)
+                    self.insert(record[:key_length], record[key_length:])
+                    self.applied += 1
+                else:
+                    writer.write(ACK.pack(sequence))
+                self.sequence, self.sent = sequence, sent
+        except (asyncio.IncompleteReadError, ConnectionError):
+            logger.error("Lost connection to the primary")
+        finally:
+            writer.close()
+
+    def metrics(self) -> Dict[str, float]:
+        """Get the replication metrics, counters end with ``_total``."""
+        return {
+            "sequence": self.sequence,
+            "lag_seconds": self.lag(),
+            "applied_total": self.applied,
+            "retrieves_total": self.retrieves,
+            "refused_total": self.refused,
+        }
+
+
+async def serve_primary(
+    store: PrimaryStore, sock: socket.socket, metrics_interval: float
+) -> None:
+    loop = asyncio.get_running_loop()
+    server = await asyncio.start_unix_server(store.replicate, sock=sock)
+    transport, _ = await loop.create_datagram_endpoint(
+        lambda: KvServerProtocol(store), local_addr=("0.0.0.0", 10007)  # nosec
+    )
+    tasks = [
+        asyncio.create_task(store.send_heartbeats()),
+        asyncio.create_task(report(logger, store.metrics, metrics_interval)),
+    ]
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        for task in tasks:
+            task.cancel()
+        transport.close()
+
+
+async def serve_replica(
+    store: ReplicaStore, path: str, port: int, metrics_interval: float
+) -> None:
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(
+        lambda: KvServerProtocol(store), local_addr=("0.0.0.0", port)  # nosec
+    )
+    metrics = asyncio.create_task(report(logger, store.metrics, metrics_interval))
+    try:
+        while True:
+            # A dropped replica syncs again from the start
+            try:
+                await store.follow(path)
+            except OSError as error:
+                logger.error("Could not connect to the primary: %s", error)
+            await asyncio.sleep(RECONNECT)
+    finally:
+        metrics.cancel()
+        transport.close()
+
+
+def run_replica(
+    store: ReplicaStore,
+    path: str,
+    port: int,
+    metrics_interval: float,
+    log_traffic: bool,
+) -> None:
+    setup_logging(log_traffic)
+    try:
+        asyncio.run(serve_replica(store, path, port, metrics_interval), debug=True)
+    except KeyboardInterrupt:
+        pass
+
+
+def run(
+    store: PrimaryStore,
+    replicas: int,
+    max_lag: float = MAX_LAG,
+    metrics_interval: float = METRICS_INTERVAL,
+    log_traffic: bool = True,
+):
+    print(f"Running unusual database program with {replicas} replicas")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "primary.sock")
+        # Listen before starting the replicas so they can connect right away
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(path)
+        sock.listen()
+        processes = [
+            multiprocessing.Process(
+                target=run_replica,
+                args=(ReplicaStore(max_lag), path, port, metrics_interval, log_traffic),
+                daemon=True,
+            )
+            for port in range(10008, 10008 + replicas)
+        ]
+        for process in processes:
+            process.start()
+        setup_logging(log_traffic)
+        try:
+            asyncio.run(serve_primary(store, sock, metrics_interval), debug=True)
+        finally:
+            for process in processes:
+                process.terminate()
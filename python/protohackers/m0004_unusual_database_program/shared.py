@@ -0,0 +1,225 @@
+"""Unusual database program on worker processes sharing one table.
+
+Each worker runs a `UdpEngine` on its own ``SO_REUSEPORT`` socket. The keys
+and values live in a `SharedTable`, an open-addressing hash table in
+``multiprocessing.shared_memory``, so an insert applied by one worker is seen
+by the next retrieve on any worker.
+
+Writers take one lock shared by all workers. Readers take no lock, each slot
+has a sequence number that is odd while the slot is written, and a reader
+retries when the number is odd or changed while it read the slot (a seqlock).
+This relies on stores being seen by other processes in the order they were
+made, as on x86. A table sent to a worker started without fork is attached by
+the name of its block.
+"""
+import multiprocessing
+import os
+import struct
+import zlib
+from multiprocessing import shared_memory
+from multiprocessing.context import BaseContext
+from typing import Any, Dict, Optional
+
+from protohackers.log import get_logger, setup_logging
+from protohackers.m0004_unusual_database_program.engine import UdpEngine, bind
+from protohackers.m0004_unusual_database_program.store import VERSION, KvStore
+
+HEADER = struct.Struct("<Q")  # Number of keys
+SLOT = struct.Struct("<QHH")  # Sequence, key length, value length
+SLOT_SIZE = 1024  # Holds any request shorter than a datagram
+CAPACITY = 1 << 16
+MAX_LOAD = 0.75
+
+logger = get_logger("unusual_database_program")
+
+
+class SharedTable:
+    """Hash table of keys and values in shared memory.
+
+    Keys are never removed. A slot with sequence number 0 has never been
+    written, the probe for a key stops at the first one.
+    """
+
+    def __init__(
+        self, capacity: int = CAPACITY, context: Optional[BaseContext] = None
+    ) -> None:
+        """Create the table in a new shared memory block.
+
+        Parameters
+        ----------
+        capacity : int, optional
+            Number of slots, a power of two, by default 65536
+        context : BaseContext, optional
+            Context the workers are started in, by default the default one
+
+        Raises
+        ------
+        ValueError
+            Capacity is not a power of two
+        """
+        if capacity <= 0 or capacity & (capacity - 1):
+            raise ValueError(f"Capacity must be a power of two, got {capacity}")
+        self.capacity = capacity
+        self._mask = capacity - 1
+        self._memory = shared_memory.SharedMemory(
+            create=True, size=HEADER.size + capacity * SLOT_SIZE
+        )
+        self._buffer = self._memory.buf
+        self._lock = (context or multiprocessing.get_context()).Lock()
+        self._owner = os.getpid()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Workers started without fork attach to the block by its name
+        state = self.__dict__.copy()
+        del state["_memory"], state["_buffer"]
+        state["name"] = self._memory.name
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self._memory = shared_memory.SharedMemory(name=state.pop("name"))
+        self._buffer = self._memory.buf
+        self.__dict__.update(state)
+
+    def __len__(self) -> int:
+        return HEADER.unpack_from(self._buffer)[0]
+
+    def get(self, key: bytes) -> Optional[bytes]:
+        """Read the value of a key.
+
+        Parameters
+        ----------
+        key : bytes
+            Key
+
+        Returns
+        -------
+        Optional[bytes]
+            Value, None if the key has never been written
+        """
+        buffer = self._buffer
+        index = zlib.crc32(key) & self._mask
+        while True:
+            offset = HEADER.size + index * SLOT_SIZE
+            start = offset + SLOT.size
+            while True:
+                sequence, key_length, value_length = SLOT.unpack_from(buffer, offset)
+                if sequence == 0:
+                    return None
+                if sequence & 1:
+                    os.sched_yield()  # Let the writer finish on a busy core
+                    continue
+                found = buffer[start : start + key_length] == key
+                if found:
+                    stop = start + key_length + value_length
+                    value = bytes(buffer[start + key_length : stop])
+                if SLOT.unpack_from(buffer, offset)[0] == sequence:
+                    break
+            if found:
+                return value
+            index = (index + 1) & self._mask
+
+    def put(self, key: bytes, value: bytes) -> bool:
+        """Write the value of a key.
+
+        Parameters
+        ----------
+        key : bytes
+            Key
+        value : bytes
+            Value
+
+        Returns
+        -------
+        bool
+            False if the key is new and the table is full
+
+        Raises
+        ------
+        ValueError
+            Key and value do not fit in a slot
+        """
+        if SLOT.size + len(key) + len(value) > SLOT_SIZE:
+            raise ValueError(f"Key and value longer than {SLOT_SIZE - SLOT.size}")
+        buffer = self._buffer
+        index = zlib.crc32(key) & self._mask
+        with self._lock:
+            while True:
+                offset = HEADER.size + index * SLOT_SIZE
+                start = offset + SLOT.size
+                sequence, key_length, _ = SLOT.unpack_from(buffer, offset)
+                if sequence == 0:
+                    count = len(self)
+                    if count >= self.capacity * MAX_LOAD:
+                        return False
+                    HEADER.pack_into(buffer, 0, count + 1)
+                    break
+                if buffer[start : start + key_length] == key:
+                    break
+                index = (index + 1) & self._mask
+            SLOT.pack_into(buffer, offset, sequence + 1, len(key), len(value))
+            buffer[start : start + len(key) + len(value)] = key + value
+            SLOT.pack_into(buffer, offset, sequence + 2, len(key), len(value))
+        return True
+
+    def close(self) -> None:
+        """Unmap the table, and free it in the process that created it."""
+        del self._buffer
+        self._memory.close()
+        if os.getpid() == self._owner:
+            self._memory.unlink()
+
+
+class SharedStore(KvStore):
+    """Key-value store kept in a `SharedTable` shared with forked workers.
+
+    Responses are not cached, a cache in one worker would not see the inserts
+    of the others.
+    """
+
+    def __init__(self, capacity: int = CAPACITY) -> None:
+        """Create the table holding only the version.
+
+        Parameters
+        ----------
+        capacity : int, optional
+            Number of slots, a power of two, by default 65536
+        """
+        self.table = SharedTable(capacity)
+        self.table.put(b"version", VERSION)
+
+    def handle(self, request: bytes | memoryview) -> Optional[bytes]:
+        key, sep, value = bytes(request).partition(b"=")
+        if sep:
+            self.insert(key, value)
+            return None
+        return key + b"=" + (self.table.get(key) or b"")
+
+    def insert(self, key: bytes, value: bytes) -> None:
+        if key != b"version" and not self.table.put(key, value):
+            logger.warning("Table full, dropped insert of %r", key)
+
+    def close(self) -> None:
+        self.table.close()
+
+
+def serve_worker(store: SharedStore, log_traffic: bool) -> None:
+    setup_logging(log_traffic)
+    engine = UdpEngine(store, bind(("0.0.0.0", 10007)))  # nosec
+    try:
+        engine.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+def run(store: SharedStore, workers: int, log_traffic: bool = True):
+    print(f"Running unusual database program on {workers} workers")
+    processes = [
+        multiprocessing.Process(
+            target=serve_worker, args=(store, log_traffic), daemon=True
+        )
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
@@ -0,0 +1,59 @@
+"""Key-value store answering unusual database program requests."""
+from typing import Dict, Optional
+
+VERSION = b"Mez's Key-Value Store 0.1.0"
+
+
+class KvStore:
+    """Keys and values of the database and the request handling for them.
+
+    Keys and values are kept as the bytes they arrived as. Each key also has
+    its response datagram cached, replaced on insert. Replacing instead of
+    dropping it keeps engine threads from caching a response built from a
+    value read before a concurrent insert.
+    """
+
+    def __init__(self) -> None:
+        """Initialize a store holding only the version."""
+        self.data: Dict[bytes, bytes] = {b"version": VERSION}
+        self._responses: Dict[bytes, bytes] = {}
+
+    def handle(self, request: bytes | memoryview) -> Optional[bytes]:
+        """Apply one request datagram.
+
+        A request with an "=" inserts the value after the first "=" at the key
+        before it, any other request retrieves the key.
+
+        Parameters
+        ----------
+        request : bytes | memoryview
+            Request datagram
+
+        Returns
+        -------
+        Optional[bytes]
+            Response datagram for a retrieve, None for an insert
+        """
+        request = bytes(request)
+        # A retrieve request is its key, so a cached response is found before
+        # parsing, no key holds an "=" to be mistaken for an insert
+        response = self._responses.get(request)
+        if response is not None:
+            return response
+        key, sep, value = request.partition(b"=")
+        if sep:
+            self.insert(key, value)
+            return None
+        value = self.data.get(key)
+        if value is None:
+            return key + b"="  # Not cached, missing keys would grow the cache
+        return self._responses.setdefault(key, key + b"=" + value)
+
+    def insert(self, key: bytes, value: bytes) -> None:
+        """Set the value of a key, the version can not be changed."""
+        if key != b"version":
+            self.data[key] = value
+            self._responses[key] = key + b"=" + value
+
+    def close(self) -> None:
+        """Release what the store holds, nothing for a store in memory."""
@@ -1,10 +1,62 @@
+import argparse
 import sys
 from protohackers.m0005_mob_in_the_middle.mob import run
+from protohackers.m0005_mob_in_the_middle.pool import POOL_SIZE, UPSTREAM, UpstreamPool
+from protohackers.m0005_mob_in_the_middle.stats import STATS_PORT
 
 
 def main():
     try:
-        run()
+        parser = argparse.ArgumentParser()
+        parser.add_argument(
+            "-m",
+            "--method",
+            type=str,
+            choices=["protocol", "streams"],
+            default="protocol",
+            help="relay on protocols streaming any line length or on streams"
+            " reading whole lines (default protocol)",
+        )
+        parser.add_argument(
+            "--upstream",
+            type=str,
+            default=f"{UPSTREAM[0]}:{UPSTREAM[1]}",
+            help=f"chat server to relay to (default {UPSTREAM[0]}:{UPSTREAM[1]})",
+        )
+        parser.add_argument(
+            "--pool-size",
+            type=int,
+            default=POOL_SIZE,
+            help="upstream connections kept ready, 0 connects per session"
+            f" (default {POOL_SIZE})",
+        )
+        parser.add_argument(
+            "--metrics-interval",
+            type=float,
+            default=60.0,
+            help="seconds between pool metrics (default 60)",
+        )
+        parser.add_argument(
+            "--stats-port",
+            type=int,
+            default=STATS_PORT,
+            help=f"local port serving traffic counters as JSON (default {STATS_PORT})",
+        )
+        parser.add_argument(
+            "--no-traffic-log",
+            action="store_false",
+            dest="log_traffic",
+            help="do not log every line",
+        )
+        args = parser.parse_args()
+
+        host, _, port = args.upstream.rpartition(":")
+        if not host or not port.isdigit():
+            parser.error(f"upstream must be host:port, got '{args.upstream}'")
+        pool = UpstreamPool(host, int(port), args.pool_size)
+        run(
+            pool, args.metrics_interval, args.method, args.stats_port, args.log_traffic
+        )
     except KeyboardInterrupt:
         print("Exited by user...")
         sys.exit(1)
@@ -1,79 +1,145 @@
 import asyncio
-import re
+import functools
+import logging
+import time
 from contextlib import closing
-from typing import Tuple
 
-StreamPair = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
-
-ADDRESS = "7YWHMfk9JZe0LM0g1ZauHuiSxhI"
-pattern = re.compile(r"(?:(?<=\s)|(?<=^))(7[a-zA-Z0-9]{25,36})(?:(?=\s)|(?=$))")
-
-
-async def replace(data: bytes) -> bytes:
-    message = data.decode(encoding="ascii")
-    matches = re.findall(pattern, message)
-    for match in matches:
-        message = message.replace(match, ADDRESS)
-    return message.encode(encoding="ascii")
-
-
-async def forward(stream: StreamPair, event: asyncio.Event, name: str):
+from protohackers.framing import LineFramer, readline
+from protohackers.log import get_logger, get_traffic_logger, report, setup_logging
+from protohackers.m0005_mob_in_the_middle.pool import StreamPair, UpstreamPool
+from protohackers.m0005_mob_in_the_middle.relay import ClientLeg
+from protohackers.m0005_mob_in_the_middle.rewrite import ADDRESS, Rewriter, pattern
+from protohackers.m0005_mob_in_the_middle.stats import (
+    STATS_PORT,
+    Direction,
+    Session,
+    Stats,
+)
+
+logger = get_logger("mob_in_the_middle")
+traffic = get_traffic_logger("mob_in_the_middle")
+
+
+async def forward(
+    stream: StreamPair, event: asyncio.Event, name: str, direction: Direction
+):
     reader, writer = stream
+    framer = LineFramer(overflow="split")
+    # Pieces of a line longer than the framer's limit share one rewriter
+    rewriter = Rewriter()
+    continued = False
+    _, high = writer.transport.get_write_buffer_limits()
     while not event.is_set():
-        data = await reader.readline()
-        print(f"{name} [read]: {data!r}")
+        data = await readline(reader, framer, keepends=True)
+        read = time.perf_counter()
+        verbose = traffic.isEnabledFor(logging.DEBUG)
+        if verbose:
+            traffic.debug("%s [read]: %r", name, data)
         if data == b"":
+            writer.write(rewriter.flush())
             writer.close()
             event.set()
             break
-        data = await replace(data)
-        print(f"{name} [write]: {data!r}")
-        writer.write(data)
-        await writer.drain()
-
-
-async def relay(local: StreamPair, remote: StreamPair):
+        complete = data[-1:] == b"\n"
+        if continued or not complete:
+            rewrites = rewriter.rewrites
+            rewritten = rewriter.feed(data)
+            rewrites = rewriter.rewrites - rewrites
+        else:
+            rewritten, rewrites = pattern.subn(ADDRESS, data)
+        continued = not complete
+        if verbose:
+            traffic.debug("%s [write]: %r", name, rewritten)
+        writer.write(rewritten)
+        if writer.transport.get_write_buffer_size() > high:
+            direction.pause()
+            await writer.drain()
+            direction.resume()
+        direction.record_line(data, rewrites, read)
+
+
+async def relay(local: StreamPair, remote: StreamPair, session: Session):
     local_reader, local_writer = local
     remote_reader, remote_writer = remote
 
     close_event = asyncio.Event()
-    print("relay")
-    print(close_event.is_set())
+    logger.debug("Relaying")
     await asyncio.gather(
-        forward((local_reader, remote_writer), close_event, "local"),
-        forward((remote_reader, local_writer), close_event, "remote"),
+        forward((local_reader, remote_writer), close_event, "local", session.up),
+        forward((remote_reader, local_writer), close_event, "remote", session.down),
     )
 
 
-async def remote_handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
-    remote_reader, remote_writer = await asyncio.open_connection(
-        "chat.protohackers.com", 16963
-    )
+async def remote_handle(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    pool: UpstreamPool,
+    session: Session,
+):
+    start = time.perf_counter()
+    remote_reader, remote_writer = (await pool.acquire()).streams()
+    session.connect = time.perf_counter() - start
     with closing(remote_writer):
-        print("remote")
-        await relay((reader, writer), (remote_reader, remote_writer))
+        logger.debug("Connected to remote")
+        await relay((reader, writer), (remote_reader, remote_writer), session)
 
 
-async def local_handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+async def local_handle(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    pool: UpstreamPool,
+    stats: Stats,
+):
     async def session():
-        with closing(writer):
-            print("new connection")
-            await remote_handle(reader, writer)
+        counters = stats.open()
+        try:
+            with closing(writer):
+                logger.debug("New connection")
+                await remote_handle(reader, writer, pool, counters)
+        finally:
+            stats.close(counters)
 
     asyncio.create_task(session())
 
 
-async def serve():
-    server = await asyncio.start_server(local_handle, "0.0.0.0", 65535)  # nosec
-
-    async with server:
-        await server.serve_forever()
-
-
-def run():
-    print("Running mob in the middle")
-    asyncio.run(serve(), debug=True)
+async def serve(
+    pool: UpstreamPool, metrics_interval: float, method: str, stats_port: int
+):
+    stats = Stats()
+    pool.start()
+    metrics = asyncio.create_task(report(logger, pool.metrics, metrics_interval))
+    if method == "protocol":
+        loop = asyncio.get_running_loop()
+        server = await loop.create_server(
+            lambda: ClientLeg(pool, stats), "0.0.0.0", 65535  # nosec
+        )
+    else:
+        server = await asyncio.start_server(
+            functools.partial(local_handle, pool=pool, stats=stats),
+            "0.0.0.0",  # nosec
+            65535,
+        )
+    endpoint = await asyncio.start_server(stats.handle, "127.0.0.1", stats_port)
+
+    try:
+        async with server, endpoint:
+            await server.serve_forever()
+    finally:
+        metrics.cancel()
+        pool.close()
+
+
+def run(
+    pool: UpstreamPool,
+    metrics_interval: float = 60.0,
+    method: str = "protocol",
+    stats_port: int = STATS_PORT,
+    log_traffic: bool = True,
+):
+    setup_logging(log_traffic)
+    print(f"Running mob in the middle for {pool.host}:{pool.port}")
+    asyncio.run(serve(pool, metrics_interval, method, stats_port), debug=True)
 
 
 if __name__ == "__main__":
-    run()
+    run(UpstreamPool())
@@ -0,0 +1,202 @@
+"""Pool of connections to the upstream chat server made ahead of sessions.
+
+A background task keeps `size` idle connections open, so a new session takes
+one that is already established instead of waiting for its own connect. An
+idle `Connection` keeps what the upstream sends, like its greeting, until a
+session takes it over with its own protocol or as streams.
+Idle connections older than `max_idle` seconds or closed by the upstream are
+replaced, and a session connects by itself when none is left.
+"""
+import asyncio
+import collections
+import time
+from typing import Deque, Dict, Optional, Tuple
+
+from protohackers.log import get_logger
+
+StreamPair = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+UPSTREAM = ("chat.protohackers.com", 16963)
+POOL_SIZE = 8
+MAX_IDLE = 60.0
+MAX_PENDING = 65536
+RETRY = 1.0
+
+logger = get_logger("mob_in_the_middle")
+
+
+class Connection(asyncio.Protocol):
+    """Upstream connection keeping what it receives until it is taken over."""
+
+    def __init__(self) -> None:
+        self.transport: asyncio.Transport
+        self.pending = bytearray()
+        self.eof = False
+        self.closed = False
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport  # type: ignore[assignment]
+
+    def data_received(self, data: bytes) -> None:
+        self.pending += data
+        if len(self.pending) >= MAX_PENDING:
+            self.transport.pause_reading()
+
+    def eof_received(self) -> bool:
+        self.eof = True
+        return True  # Closed by the protocol taking over
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self.closed = True
+
+    def is_open(self) -> bool:
+        """Check that the upstream has not closed the connection."""
+        return not (self.eof or self.closed or self.transport.is_closing())
+
+    def take(self, protocol: asyncio.Protocol) -> None:
+        """Hand the connection and what it received so far to another protocol.
+
+        Parameters
+        ----------
+        protocol : asyncio.Protocol
+            Protocol receiving from the connection from now on
+        """
+        self.transport.set_protocol(protocol)
+        protocol.connection_made(self.transport)
+        if self.pending:
+            protocol.data_received(bytes(self.pending))
+            self.pending.clear()
+        if self.eof and not protocol.eof_received():
+            self.transport.close()
+        self.transport.resume_reading()
+
+    def streams(self) -> StreamPair:
+        """Take the connection over as a reader and writer.
+
+        Returns
+        -------
+        StreamPair
+            Reader and writer of the connection
+        """
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(loop=loop)
+        protocol = asyncio.StreamReaderProtocol(reader, loop=loop)
+        self.take(protocol)
+        return reader, asyncio.StreamWriter(self.transport, protocol, reader, loop)
+
+
+class UpstreamPool:
+    """Upstream connections established ahead of the sessions taking them."""
+
+    def __init__(
+        self,
+        host: str = UPSTREAM[0],
+        port: int = UPSTREAM[1],
+        size: int = POOL_SIZE,
+        max_idle: float = MAX_IDLE,
+    ) -> None:
+        """Initialize an empty pool, filled once started.
+
+        Parameters
+        ----------
+        host : str, optional
+            Upstream host, by default chat.protohackers.com
+        port : int, optional
+            Upstream port, by default 16963
+        size : int, optional
+            Idle connections to keep, 0 connects for every session, by default 8
+        max_idle : float, optional
+            Seconds an idle connection is kept, by default 60
+        """
+        self.host = host
+        self.port = port
+        self.size = size
+        self.max_idle = max_idle
+        self.hits = 0
+        self.misses = 0
+        self.connects = 0
+        self.connect_seconds = 0.0
+        self.connect_seconds_max = 0.0
+        self._idle: Deque[Tuple[Connection, float]] = collections.deque()
+        self._wanted = asyncio.Event()
+        self._filler: Optional[asyncio.Task] = None
+        self._recycle: Optional[asyncio.TimerHandle] = None
+
+    def start(self) -> None:
+        """Start filling the pool in the background."""
+        if self.size:
+            self._wanted.set()
+            self._filler = asyncio.create_task(self._fill())
+
+    def close(self) -> None:
+        """Stop filling the pool and close the idle connections."""
+        if self._filler is not None:
+            self._filler.cancel()
+        if self._recycle is not None:
+            self._recycle.cancel()
+        while self._idle:
+            connection, _ = self._idle.popleft()
+            connection.transport.close()
+
+    async def acquire(self) -> Connection:
+        """Take an idle connection, or connect when there is none.
+
+        Returns
+        -------
+        Connection
+            Upstream connection, owned by the caller until taken over
+        """
+        expired = time.monotonic() - self.max_idle
+        while self._idle:
+            connection, created = self._idle.popleft()
+            self._wanted.set()
+            if created > expired and connection.is_open():
+                self.hits += 1
+                return connection
+            connection.transport.close()
+        self.misses += 1
+        return await self._connect()
+
+    def metrics(self) -> Dict[str, float]:
+        """Get the pool metrics, counters end with ``_total``."""
+        return {
+            "idle": len(self._idle),
+            "hits_total": self.hits,
+            "misses_total": self.misses,
+            "connects_total": self.connects,
+            "connect_ms_mean": self.connect_seconds / (self.connects or 1) * 1000,
+            "connect_ms_max": self.connect_seconds_max * 1000,
+        }
+
+    async def _connect(self) -> Connection:
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        _, connection = await loop.create_connection(Connection, self.host, self.port)
+        elapsed = time.perf_counter() - start
+        self.connects += 1
+        self.connect_seconds += elapsed
+        self.connect_seconds_max = max(self.connect_seconds_max, elapsed)
+        return connection
+
+    async def _fill(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._wanted.wait()
+            self._wanted.clear()
+            expired = time.monotonic() - self.max_idle
+            while self._idle and self._idle[0][1] <= expired:
+                connection, _ = self._idle.popleft()
+                connection.transport.close()
+            while len(self._idle) < self.size:
+                try:
+                    connection = await self._connect()
+                except OSError as error:
+                    logger.error("Could not connect to the upstream: %s", error)
+                    await asyncio.sleep(RETRY)
+                    continue
+                self._idle.append((connection, time.monotonic()))
+            if self._recycle is not None:
+                self._recycle.cancel()
+            # Replace the oldest connection once it expires
+            delay = self._idle[0][1] + self.max_idle - time.monotonic()
+            self._recycle = loop.call_later(delay, self._wanted.set)
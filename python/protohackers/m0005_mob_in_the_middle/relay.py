@@ -0,0 +1,120 @@
+"""Mob in the middle relay on protocols and transports with bounded memory.
+
+Each direction of a session is a `Leg`, a protocol that rewrites what its
+connection receives as it arrives with a `Rewriter` and writes it to the
+other connection, without waiting for the end of a line. When a connection's
+write buffer passes `HIGH_WATER`, the other connection stops reading until it
+drains, so a session holds at most about that much plus one read per
+direction, however long its lines are. Each leg counts its direction in the
+`Session` of the client.
+"""
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from protohackers.log import get_logger, get_traffic_logger
+from protohackers.m0005_mob_in_the_middle.pool import UpstreamPool
+from protohackers.m0005_mob_in_the_middle.rewrite import Rewriter
+from protohackers.m0005_mob_in_the_middle.stats import Direction, Stats
+
+HIGH_WATER = 65536
+
+logger = get_logger("mob_in_the_middle")
+traffic = get_traffic_logger("mob_in_the_middle")
+
+
+class Leg(asyncio.Protocol):
+    """One direction of a session, from its connection to the peer's."""
+
+    def __init__(self, name: str, direction: Direction) -> None:
+        self.name = name
+        self.direction = direction
+        self.transport: asyncio.Transport
+        self.peer: Optional[Leg] = None
+        self.rewriter = Rewriter()
+
+    def pair(self, peer: "Leg") -> None:
+        """Relay between this leg and another."""
+        self.peer, peer.peer = peer, self
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport  # type: ignore[assignment]
+        self.transport.set_write_buffer_limits(high=HIGH_WATER)
+
+    def data_received(self, data: bytes) -> None:
+        assert self.peer is not None  # nosec
+        read = time.perf_counter()
+        if traffic.isEnabledFor(logging.DEBUG):
+            traffic.debug("%s [read]: %r", self.name, data)
+        rewrites = self.rewriter.rewrites
+        rewritten = self.rewriter.feed(data)
+        if rewritten:
+            self.peer.transport.write(rewritten)
+        self.direction.record(data, self.rewriter.rewrites - rewrites, read)
+
+    def eof_received(self) -> bool:
+        assert self.peer is not None  # nosec
+        rewrites = self.rewriter.rewrites
+        self.peer.transport.write(self.rewriter.flush())
+        self.direction.rewrites += self.rewriter.rewrites - rewrites
+        # Either side leaving ends the session, after what is buffered is sent
+        self.peer.transport.close()
+        return False
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        if self.peer is not None:
+            self.peer.transport.close()
+
+    def pause_writing(self) -> None:
+        if self.peer is not None:
+            self.peer.transport.pause_reading()
+            self.peer.direction.pause()
+
+    def resume_writing(self) -> None:
+        if self.peer is not None:
+            self.peer.transport.resume_reading()
+            self.peer.direction.resume()
+
+
+class ClientLeg(Leg):
+    """Leg from a client, connecting its session upstream when accepted."""
+
+    def __init__(self, pool: UpstreamPool, stats: Stats) -> None:
+        self.session = stats.open()
+        super().__init__("local", self.session.up)
+        self.pool = pool
+        self.stats = stats
+        self._connecting: Optional[asyncio.Task] = None
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        super().connection_made(transport)
+        logger.debug("New connection")
+        # Nothing is read until there is an upstream to write it to
+        self.transport.pause_reading()
+        self._connecting = asyncio.create_task(self._connect())
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        super().connection_lost(exc)
+        self.stats.close(self.session)
+        if self._connecting is not None:
+            self._connecting.cancel()
+
+    async def _connect(self) -> None:
+        start = time.perf_counter()
+        try:
+            connection = await self.pool.acquire()
+        except OSError as error:
+            logger.error("Could not connect to the upstream: %s", error)
+            self.transport.close()
+            return
+        self.session.connect = time.perf_counter() - start
+        if self.transport.is_closing():
+            connection.transport.close()
+            return
+        logger.debug("Connected to remote")
+        remote = Leg("remote", self.session.down)
+        self.pair(remote)
+        connection.take(remote)
+        self.transport.resume_reading()
+
@@ -0,0 +1,79 @@
+"""Rewriting of Boguscoin addresses to ours.
+
+`replace` rewrites a whole line. A `Rewriter` rewrites a stream in chunks
+split anywhere, holding back only the start of a word that may still turn out
+to be an address, at most `MAX_ADDRESS` bytes.
+"""
+import re
+
+ADDRESS = b"7YWHMfk9JZe0LM0g1ZauHuiSxhI"
+MAX_ADDRESS = 37
+WHITESPACE = [bytes([c]) for c in b" \t\n\r\x0b\x0c"]  # The bytes \s matches
+
+# A Boguscoin address is a whole word, between whitespace or the line ends
+pattern = re.compile(rb"(?<!\S)7[a-zA-Z0-9]{25,36}(?!\S)")
+word = re.compile(rb"\S*")
+address_start = re.compile(rb"7[a-zA-Z0-9]{0,36}")
+address = re.compile(rb"7[a-zA-Z0-9]{25,36}")
+
+
+def replace(data: bytes) -> bytes:
+    """Rewrite every Boguscoin address in a line to ours, in one pass."""
+    return pattern.sub(ADDRESS, data)
+
+
+class Rewriter:
+    """Rewrite Boguscoin addresses in a stream split into arbitrary chunks.
+
+    A chunk is rewritten up to its last whitespace with `pattern`, which sees
+    every word there whole. The word at the end of the chunk is held back
+    while it may still become an address, and passed on otherwise, skipping
+    the rest of it in the next chunks.
+    """
+
+    def __init__(self) -> None:
+        self._held = b""  # Start of a word that may be an address
+        self._skip = False  # The current word is not an address
+        self.rewrites = 0
+
+    def feed(self, data: bytes) -> bytes:
+        """Rewrite the next chunk of the stream.
+
+        Parameters
+        ----------
+        data : bytes
+            Next chunk
+
+        Returns
+        -------
+        bytes
+            Rewritten stream up to what is held back
+        """
+        head = b""
+        if self._skip:
+            end = word.match(data).end()  # type: ignore[union-attr]
+            if end == len(data):
+                return data
+            self._skip = False
+            head, data = data[:end], data[end:]
+        data, self._held = self._held + data, b""
+        last = max(map(data.rfind, WHITESPACE))
+        body, tail = data[: last + 1], data[last + 1 :]
+        if body:
+            body, rewrites = pattern.subn(ADDRESS, body)
+            self.rewrites += rewrites
+        if tail:
+            if len(tail) <= MAX_ADDRESS and address_start.fullmatch(tail):
+                self._held = tail
+            else:
+                self._skip = True
+                body += tail
+        return head + body
+
+    def flush(self) -> bytes:
+        """Rewrite what is held back at the end of the stream."""
+        held, self._held, self._skip = self._held, b"", False
+        if address.fullmatch(held):
+            self.rewrites += 1
+            return ADDRESS
+        return held
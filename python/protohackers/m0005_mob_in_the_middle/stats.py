@@ -0,0 +1,183 @@
+"""Traffic counters of the mob in the middle and the endpoint serving them.
+
+Every session counts, per direction, the bytes, lines and addresses it
+relayed, the seconds it waited for the receiving side to take more data, and
+how long lines took from being read to being written, in a histogram of
+power of two buckets. Counting adds a few integer additions and two clock
+reads per read.
+
+Direction ``up`` is from the client to the upstream and ``down`` is back.
+The endpoint answers any connection with the counters of the open sessions
+and the totals of all sessions as JSON over HTTP/1.0 and closes it.
+"""
+import asyncio
+import json
+import time
+from typing import Any, Dict
+
+BUCKETS = 24  # Bucket i counts latencies under 2**i microseconds, the last the rest
+STATS_PORT = 65534
+REQUEST_TIMEOUT = 1.0  # Seconds to wait for the request before answering
+
+Counters = Dict[str, Any]
+
+
+class Direction:
+    """Counters of one direction of a session."""
+
+    __slots__ = ("bytes", "lines", "rewrites", "blocked", "latency", "_paused")
+
+    def __init__(self) -> None:
+        self.bytes = 0
+        self.lines = 0
+        self.rewrites = 0
+        self.blocked = 0.0  # Seconds waiting for the receiver
+        self.latency = [0] * BUCKETS
+        self._paused = 0.0
+
+    def record(self, data: bytes, rewrites: int, read: float) -> None:
+        """Count relayed data.
+
+        Parameters
+        ----------
+        data : bytes
+            Data as read
+        rewrites : int
+            Addresses rewritten in it
+        read : float
+            ``time.perf_counter()`` when it was read
+        """
+        lines = data.count(b"\n")
+        self.bytes += len(data)
+        self.lines += lines
+        self.rewrites += rewrites
+        if lines:
+            bucket = int((time.perf_counter() - read) * 1e6).bit_length()
+            self.latency[bucket if bucket < BUCKETS else BUCKETS - 1] += lines
+
+    def record_line(self, line: bytes, rewrites: int, read: float) -> None:
+        """Count relayed data holding at most one line, at its end.
+
+        Like `record`, without searching the data for line ends.
+        """
+        self.bytes += len(line)
+        self.rewrites += rewrites
+        if line[-1] == 10:  # Not a line split for being too long
+            self.lines += 1
+            bucket = int((time.perf_counter() - read) * 1e6).bit_length()
+            self.latency[bucket if bucket < BUCKETS else BUCKETS - 1] += 1
+
+    def pause(self) -> None:
+        """Start waiting for the receiver."""
+        self._paused = time.perf_counter()
+
+    def resume(self) -> None:
+        """Stop waiting for the receiver."""
+        self.blocked += time.perf_counter() - self._paused
+
+    def merge(self, other: "Direction") -> None:
+        """Add the counters of another direction to these."""
+        self.bytes += other.bytes
+        self.lines += other.lines
+        self.rewrites += other.rewrites
+        self.blocked += other.blocked
+        self.latency = [a + b for a, b in zip(self.latency, other.latency)]
+
+    def as_dict(self) -> Counters:
+        return {
+            "bytes": self.bytes,
+            "lines": self.lines,
+            "rewrites": self.rewrites,
+            "blocked_seconds": self.blocked,
+            "latency_us": {
+                "le": [1 << i for i in range(BUCKETS - 1)] + ["inf"],
+                "lines": self.latency,
+            },
+        }
+
+
+class Session:
+    """Counters of one session."""
+
+    __slots__ = ("id", "opened", "connect", "up", "down")
+
+    def __init__(self, id: int) -> None:
+        self.id = id
+        self.opened = time.time()
+        self.connect = 0.0  # Seconds waiting for an upstream connection
+        self.up = Direction()
+        self.down = Direction()
+
+    def merge(self, other: "Session") -> None:
+        """Add the counters of another session to these."""
+        self.connect += other.connect
+        self.up.merge(other.up)
+        self.down.merge(other.down)
+
+    def as_dict(self) -> Counters:
+        return {
+            "id": self.id,
+            "opened": self.opened,
+            "connect_seconds": self.connect,
+            "up": self.up.as_dict(),
+            "down": self.down.as_dict(),
+        }
+
+
+class Stats:
+    """Counters of the open sessions and totals of all of them."""
+
+    def __init__(self) -> None:
+        self.sessions: Dict[int, Session] = {}
+        self.closed = Session(-1)  # Totals of the closed sessions
+        self.opened = 0
+
+    def open(self) -> Session:
+        """Start counting a new session."""
+        session = Session(self.opened)
+        self.opened += 1
+        self.sessions[session.id] = session
+        return session
+
+    def close(self, session: Session) -> None:
+        """Add the counters of an ended session to the totals."""
+        if self.sessions.pop(session.id, None) is not None:
+            self.closed.merge(session)
+
+    def as_dict(self) -> Counters:
+        total = Session(-1)
+        total.merge(self.closed)
+        for session in self.sessions.values():
+            total.merge(session)
+        return {
+            "sessions": {"open": len(self.sessions), "total": self.opened},
+            "connect_seconds": total.connect,
+            "up": total.up.as_dict(),
+            "down": total.down.as_dict(),
+            "open": [session.as_dict() for session in self.sessions.values()],
+        }
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Answer a connection to the endpoint with the counters."""
+        try:
+            try:
+                # Read the request, if any, so closing does not reset the connection
+                await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), REQUEST_TIMEOUT)
+            except (
+                asyncio.IncompleteReadError,
+                asyncio.LimitOverrunError,
+                asyncio.TimeoutError,
+            ):
+                pass
+            body = json.dumps(self.as_dict()).encode()
+            writer.write(
+                b"HTTP/1.0 200 OK\r\nContent-Type: application/json\r\n"
+                b"Content-Length: %d\r\n\r\n%s" % (len(body), body)
+            )
+            await writer.drain()
+        except ConnectionError:
+            pass  # The client left before the answer
+        finally:
+            writer.close()
@@ -1,10 +1,20 @@
+import argparse
 import sys
 from protohackers.m0007_line_reversal.line_reversal import run
 
 
 def main():
     try:
-        run()
+        parser = argparse.ArgumentParser()
+        parser.add_argument(
+            "--no-traffic-log",
+            action="store_false",
+            dest="log_traffic",
+            help="do not log every packet",
+        )
+        args = parser.parse_args()
+
+        run(args.log_traffic)
     except KeyboardInterrupt:
         print("Exited by user...")
         sys.exit(1)
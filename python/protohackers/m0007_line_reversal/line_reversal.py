@@ -1,58 +1,151 @@
 import asyncio
+import heapq
+import itertools
+import logging
 from asyncio.transports import DatagramTransport
 from bisect import bisect
 from dataclasses import dataclass
-from time import asctime
 
-from typing import Dict, List, Tuple, TypeAlias
+from typing import Dict, List, Optional, Tuple, TypeAlias
+
+from protohackers.log import get_traffic_logger, setup_logging
 
 Address: TypeAlias = tuple[str, int]  # (host, port)
 
+RETRANSMIT = 3.0  # Seconds before unacknowledged data is sent again
+EXPIRY = 60.0  # Seconds data may stay unacknowledged before the session closes
+
+traffic = get_traffic_logger("line_reversal")
+
 
 def send(transport: DatagramTransport, address: Address, message: str) -> None:
     transport.sendto(message.encode(), address)
-    print(asctime(), "sending", repr(str(message))[:30], "to", address)
+    if traffic.isEnabledFor(logging.DEBUG):
+        traffic.debug("Sending %.30r to %s", message, address)
 
 
 class InvalidMessage(Exception):
     pass
 
 
+class Scheduler:
+    """Timeouts of all sessions of a server in one heap, run by one timer.
+
+    A session has at most one live deadline. Rescheduling or cancelling it
+    leaves the old heap entry in place, it is skipped when it comes due. Only
+    sessions waiting for an ack are scheduled, idle sessions cost nothing.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.loop = loop
+        self._heap: List[Tuple[float, int, "Session"]] = []
+        self._order = itertools.count()  # Breaks ties between equal deadlines
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def time(self) -> float:
+        return self.loop.time()
+
+    def schedule(self, session: "Session", when: float) -> None:
+        """Call `Session.timeout` at loop time `when`, instead of any earlier call.
+
+        Parameters
+        ----------
+        session : Session
+            Session to time out
+        when : float
+            Loop time of the timeout
+        """
+        session.deadline = when
+        heapq.heappush(self._heap, (when, next(self._order), session))
+        if self._timer is None or when < self._timer.when():
+            self._arm(when)
+
+    def cancel(self, session: "Session") -> None:
+        """Drop the timeout of a session, if any."""
+        session.deadline = None
+
+    def _arm(self, when: float) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = self.loop.call_at(when, self._run)
+
+    def _run(self) -> None:
+        # Timeouts scheduling again do not arm the spent timer, it is done last
+        now = self.loop.time()
+        while self._heap and self._heap[0][0] <= now:
+            when, _, session = heapq.heappop(self._heap)
+            if session.deadline == when:
+                session.deadline = None
+                session.timeout(now)
+        self._timer = None
+        if self._heap:
+            self._arm(self._heap[0][0])
+
+
 @dataclass
 class Session:
     session: str
     address: Address
     transport: DatagramTransport
-    message: str
-    read: int
-    sent: int
-    ack: int
-    ttl: int
-
-    async def send_task(self) -> None:
-        reverse = ""
-        while self.ttl > 0 and not self.transport.is_closing():
-            if self.ttl % 3:
-                send(self.transport, self.address, f"/ack/{self.session}/{self.read}/")
-                if len(reverse) != len(self.message):
-                    reverse = self.reverse_lines(self.message)
-                self.send_message(reverse)
-            await asyncio.sleep(1)
-            self.ttl -= 1
-
-    def send_message(self, reverse: str) -> None:
+    scheduler: Scheduler
+    message: str = ""
+    reverse: str = ""  # Complete lines of the message, reversed
+    read: int = 0
+    sent: int = 0
+    ack: int = 0
+    expires: float = 0.0  # Loop time to close by if nothing is acknowledged
+    deadline: Optional[float] = None  # Loop time of the next timeout
+
+    def receive(self, message: str) -> None:
+        self.message = message
+        self.reverse = self.reverse_lines(message[: message.rfind("\n") + 1])
+        if self.sent == self.ack:
+            self.expires = self.scheduler.time() + EXPIRY
+        self.transmit(self.sent)
+
+    def acknowledge(self, ack: int) -> None:
+        self.ack = ack
+        self.expires = self.scheduler.time() + EXPIRY
+        # Resend what was lost, or send what did not fit before
+        self.transmit(ack)
+
+    def transmit(self, start: int) -> None:
+        if start < len(self.reverse):
+            self.send_message(self.reverse, start)
+        if self.sent == self.ack:
+            self.scheduler.cancel(self)
+        elif self.deadline is None or start == self.ack:
+            # Sending from the ack restarts the wait, sending more does not
+            now = self.scheduler.time()
+            self.scheduler.schedule(self, min(now + RETRANSMIT, self.expires))
+
+    def timeout(self, now: float) -> None:
+        if now >= self.expires:
+            traffic.debug("Expired %s", self.session)
+            self.close()
+        else:
+            self.transmit(self.ack)
+
+    def close(self) -> None:
+        self.scheduler.cancel(self)
+        SESSIONS.pop(self.session, None)
+
+    def send_message(self, reverse: str, start: int) -> None:
         limit = 900
         message, sep, _ = reverse.rpartition("\n")
-        message = (message + sep)[self.ack :]
+        message = (message + sep)[start:]
         messages = [message[i : i + limit] for i in range(0, len(message), limit)]
         for i, message in enumerate(messages):
             escaped = message.replace("\\", "\\\\").replace("/", "\\/")
             send(
                 self.transport,
                 self.address,
-                f"/data/{self.session}/{self.ack + i * limit}/{escaped}/",
+                f"/data/{self.session}/{start + i * limit}/{escaped}/",
             )
-            self.sent = self.ack + len(message) + i * limit
+            self.sent = start + len(message) + i * limit
             if i == 5:
                 break
 
@@ -74,15 +167,16 @@ SESSIONS: Dict[str, Session] = {}
 
 
 class LineReversalProtocol:
-    TTL = 60
     NUM_MAX = 2**31 - 1
 
     def __init__(self) -> None:
         self.addr: Address
         self.transport: DatagramTransport
+        self.scheduler: Scheduler
 
     def connection_made(self, transport: DatagramTransport) -> None:
         self.transport = transport
+        self.scheduler = Scheduler(asyncio.get_running_loop())
 
     def get_type_and_session(self, message: str) -> Tuple[str, ...]:
         split_message = message.split("/", maxsplit=3)
@@ -121,13 +215,9 @@ class LineReversalProtocol:
                 session=session,
                 address=self.addr,
                 transport=self.transport,
-                message="",
-                ack=0,
-                read=0,
-                sent=0,
-                ttl=self.TTL,
+                scheduler=self.scheduler,
             )
-        asyncio.create_task(SESSIONS[session].send_task())
+        send(self.transport, self.addr, f"/ack/{session}/{SESSIONS[session].read}/")
 
     def handle_data(self, session_id: str, str_pos: str, message: str) -> None:
         # If the session is not open: send `/close/SESSION/` and stop.
@@ -148,8 +238,8 @@ class LineReversalProtocol:
         if session.read >= pos and len(unescaped) > 0:
             read = pos + len(unescaped)
             if read > session.read:
-                session.message = session.message[:pos] + unescaped
                 session.read = read
+                session.receive(session.message[:pos] + unescaped)
             send(self.transport, self.addr, f"/ack/{session_id}/{session.read}/")
         # If you have not received everything up to POS: send a duplicate of your
         # previous ack (or /ack/SESSION/0/ if none), saying how much you have recevied,
@@ -162,40 +252,29 @@ class LineReversalProtocol:
         if session not in SESSIONS:
             self.handle_close(session)
             return
-        print("ACK", session, length)
+        traffic.debug("ACK %s %s", session, length)
         ack = int(length)
-        current = SESSIONS[session].ack
-        sent = SESSIONS[session].sent
 
         # If the LENGTH value is not larger than the largest LENGTH value in any
         # ack message you've received on this session so far:
         # do nothing and stop (assume it's a duplicate ack that got delayed).
-        if current > ack:
+        if SESSIONS[session].ack >= ack:
             return
         # If the LENGTH value is larger than the total amount of payload you've
         # sent: the peer is misbehaving, close the session.
-        if SESSIONS[session].read < ack:
+        if len(SESSIONS[session].reverse) < ack:
             self.handle_close(session)
             return
         # If the LENGTH value is smaller than the total amount of payload you've sent:
         # retransmit all payload data after the first LENGTH bytes.
-        if sent > ack:
-            SESSIONS[session].sent = ack
-            SESSIONS[session].ack = ack
-            return
         # If the LENGTH value is equal to the total amount of payload you've sent:
-        # don'd send any reply.
-
-        SESSIONS[session].ttl = self.TTL
-        if sent == ack:
-            SESSIONS[session].ack = ack
-            return
+        # don't send any reply, unless there is more to send.
+        SESSIONS[session].acknowledge(ack)
 
     def handle_close(self, session: str) -> None:
         send(self.transport, self.addr, f"/close/{session}/")
         if SESSIONS.get(session):
-            SESSIONS[session].ttl = 0
-            del SESSIONS[session]
+            SESSIONS[session].close()
 
     def datagram_received(self, data: bytes, address: Address) -> None:
         self.addr = address
@@ -220,7 +299,8 @@ async def serve():
         transport.close()
 
 
-def run():
+def run(log_traffic: bool = True):
+    setup_logging(log_traffic)
     print("Running line reversal")
     asyncio.run(serve(), debug=True)
 
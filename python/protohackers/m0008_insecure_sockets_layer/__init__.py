@@ -1,13 +1,23 @@
 """Package for solution to protohackers challenge 8 'Insecure Sockets Layer'."""
 
 
+import argparse
 import sys
 from protohackers.m0008_insecure_sockets_layer.server import run
 
 
 def main():
     try:
-        run()
+        parser = argparse.ArgumentParser()
+        parser.add_argument(
+            "--no-traffic-log",
+            action="store_false",
+            dest="log_traffic",
+            help="do not log every line",
+        )
+        args = parser.parse_args()
+
+        run(args.log_traffic)
     except KeyboardInterrupt:
         print("Exited by user...")
         sys.exit(1)
@@ -1,12 +1,13 @@
 """Obfuscation module implementing a cipher sequence."""
-import logging
 import random
 from functools import partial
 from typing import Callable, Generator
 
+from protohackers.log import get_logger
+
 BYTE_SIZE = 256
 
-logging.basicConfig(level=logging.DEBUG)
+logger = get_logger("insecure_sockets_layer")
 
 
 class CipherError(Exception):
@@ -19,16 +20,16 @@ class Cipher:
     def __init__(self, spec: bytes) -> None:
         """Initialize a cipher."""
         try:
-            logging.info("Got cipher spec: %s", spec.hex())
+            logger.info("Got cipher spec: %s", spec.hex())
             self.cipher_sequence = list(self.get_cipher_sequence(spec))
             self.validate_cipher()
         except ValueError as error:
-            logging.error("Failed to initialize cipher, invalid value: %s", error)
+            logger.error("Failed to initialize cipher, invalid value: %s", error)
             raise CipherError from error
         except CipherError as error:
-            logging.error("Invalid cipher: %s", error)
+            logger.error("Invalid cipher: %s", error)
             raise error
-        logging.info("Initialized cipher: %s", spec.hex())
+        logger.info("Initialized cipher: %s", spec.hex())
 
     @staticmethod
     def reversebits(line: bytearray, **_) -> bytearray:
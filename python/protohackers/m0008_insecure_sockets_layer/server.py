@@ -2,12 +2,14 @@
 import asyncio
 from asyncio import StreamReader, StreamWriter
 from dataclasses import dataclass
-import logging
 from typing import Dict, Optional
 
+from protohackers.framing import BUFFER, LineFramer
+from protohackers.log import get_logger, get_traffic_logger, setup_logging
 from protohackers.m0008_insecure_sockets_layer.obfuscate import Cipher, CipherError
 
-logging.basicConfig(level=logging.DEBUG)
+logger = get_logger("insecure_sockets_layer")
+traffic = get_traffic_logger("insecure_sockets_layer")
 
 
 @dataclass
@@ -33,12 +35,13 @@ class Session:
         """
         self.cipher = cipher
         self.io = io
+        self.framer = LineFramer(max_line=None)  # Lines were never limited
         self.read_pos = 0
         self.send_pos = 0
 
     async def handle(self) -> None:
         """Handle session."""
-        logging.debug("Reading lines")
+        logger.debug("Reading lines")
         if self.io.reader.at_eof():
             raise ConnectionError
         while line := await self.receive():
@@ -49,23 +52,23 @@ class Session:
     async def receive(self) -> str:
         """Recieve and decrypt a line from the connected client.
 
+        Data is decrypted a chunk at a time as it arrives and framed into lines.
+
         Returns
         -------
         str
             Decrypted line
         """
-        line = ""
-        while True:
-            char = await self.io.reader.read(1)
-            if char == b"":
+        while (data := self.framer.next_line()) is None:
+            chunk = await self.io.reader.read(BUFFER)
+            if chunk == b"":
                 return ""
             if self.cipher:
-                char = self.cipher.decrypt(char, self.read_pos)
-            self.read_pos += 1
-            if char == b"\n":
-                break
-            line += char.decode(encoding="ascii")
-        logging.info("Received: %s", repr(line))
+                chunk = self.cipher.decrypt(chunk, self.read_pos)
+            self.read_pos += len(chunk)
+            self.framer.feed(chunk)
+        line = data.decode(encoding="ascii")
+        traffic.info("Received: %r", line)
         return line
 
     async def send(self, line: str) -> None:
@@ -76,7 +79,7 @@ class Session:
         line : str
             Line to send
         """
-        logging.info("Sending: %s", repr(line))
+        traffic.info("Sending: %r", line)
         encoded = line.encode(encoding="ascii")
         if self.cipher:
             encoded = self.cipher.encrypt(encoded, self.send_pos)
@@ -120,7 +123,7 @@ async def handle(reader: StreamReader, writer: StreamWriter) -> None:
     writer : StreamWriter
         Client writer
     """
-    logging.info("New connection %s", reader)
+    logger.info("New connection %s", reader)
     try:
         cipher_spec = await get_cipher_spec(reader)
         cipher = Cipher(cipher_spec)
@@ -138,8 +141,15 @@ async def serve() -> None:
         await server.serve_forever()
 
 
-def run() -> None:
-    """Run the server with a coroutine."""
+def run(log_traffic: bool = True) -> None:
+    """Run the server with a coroutine.
+
+    Parameters
+    ----------
+    log_traffic : bool, optional
+        Log every received and sent line, by default True
+    """
+    setup_logging(log_traffic)
     print("Running insecure socket layer")
     asyncio.run(serve(), debug=True)
 
@@ -0,0 +1,226 @@
+import asyncio
+import socket
+import struct
+
+import pytest
+
+from protohackers.m0003_budget_chat.chat import Chat
+
+
+class StalledTransport:
+    aborted = False
+
+    def abort(self):
+        self.aborted = True
+
+
+class StalledWriter:
+    """Writer of a client that stopped reading."""
+
+    def __init__(self):
+        self.written = []
+        self.transport = StalledTransport()
+
+    def write(self, data):
+        self.written.append(data)
+
+    def writelines(self, data):
+        self.write(b"".join(data))
+
+    async def drain(self):
+        await asyncio.Event().wait()
+
+
+class Writer(StalledWriter):
+    async def drain(self):
+        pass
+
+
+async def stalled_session(policy):
+    return await Chat.Session.create(None, StalledWriter(), "uuid", 2, policy)
+
+
+@pytest.mark.parametrize(
+    "policy, queued",
+    [("drop-oldest", [b"b\n", b"c\n"]), ("drop-newest", [b"a\n", b"b\n"])],
+)
+def test_full_outbox_drops_messages(policy, queued):
+    async def run():
+        session = await stalled_session(policy)
+        for message in (b"a\n", b"b\n", b"c\n"):
+            session.send(message)
+        assert list(session.outbox) == queued
+        assert not session.writer.transport.aborted
+        await asyncio.sleep(0)
+        assert session.writer.written == [queued[0]]
+
+    asyncio.run(run())
+
+
+def test_full_outbox_disconnects():
+    async def run():
+        session = await stalled_session("disconnect")
+        for message in (b"a\n", b"b\n", b"c\n", b"d\n"):
+            session.send(message)
+        assert session.writer.transport.aborted
+        assert not session.outbox
+        await session.close()
+
+    asyncio.run(run())
+
+
+def test_close_drops_stalled_client():
+    async def run():
+        session = await stalled_session("drop-oldest")
+        session.send(b"a\n")
+        await asyncio.wait_for(session.close(0.05), 5)
+        assert session.writer.transport.aborted
+
+    asyncio.run(run())
+
+
+def test_broadcast_skips_stalled_client():
+    async def run():
+        chat = Chat(policy="drop-oldest")
+        server = await asyncio.start_server(chat.handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+
+        async def connect(name):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            await reader.readline()
+            writer.write(f"{name}\n".encode())
+            await reader.readline()
+            return reader, writer
+
+        alice_reader, alice_writer = await connect("alice")
+        stalled = StalledWriter()
+        stalled_session = await Chat.Session.create(
+            None, stalled, "uuid", 4, "drop-oldest"
+        )
+        stalled_session.name = "stalled"
+        chat.sessions["stalled"] = stalled_session
+        bob_reader, bob_writer = await connect("bob")
+        assert await alice_reader.readline() == b"* bob has entered the room\n"
+
+        for i in range(100):
+            bob_writer.write(b"hello %d\n" % i)
+        for i in range(100):
+            line = await asyncio.wait_for(alice_reader.readline(), 5)
+            assert line == b"[bob] hello %d\n" % i
+        assert len(stalled_session.outbox) == 4
+
+        for writer in (alice_writer, bob_writer):
+            writer.close()
+        server.close()
+
+    asyncio.run(run())
+
+
+def test_broadcast_shares_one_buffer():
+    async def run():
+        chat = Chat()
+        for name in ("alice", "bob", "carol"):
+            session = await stalled_session("disconnect")
+            session.name = name
+            chat.sessions[name] = session
+        chat.send(chat.message, "alice", "hi", name="alice")
+        queued = [s.outbox[0] for s in chat.sessions.values() if s.outbox]
+        assert queued == [b"[alice] hi\n"] * 2
+        assert queued[0] is queued[1]
+
+    asyncio.run(run())
+
+
+def test_join_presence_and_unique_names():
+    async def run():
+        chat = Chat()
+        server = await asyncio.start_server(chat.handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+
+        async def connect():
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            await reader.readline()
+            return reader, writer
+
+        alice = await connect()
+        alice[1].write(b"alice\n")
+        assert await alice[0].readline() == b"* The room contains: \n"
+
+        # Both pick the same name before either is answered
+        first, second = await connect(), await connect()
+        first[1].write(b"bob\n")
+        second[1].write(b"bob\n")
+        answers = {await first[0].read(100), await second[0].read(100)}
+        assert answers == {b"* The room contains: alice\n", b"Undefined behaviour"}
+        assert list(chat.sessions) == ["alice", "bob"]
+
+        carol = await connect()
+        carol[1].write(b"carol\n")
+        assert await carol[0].readline() == b"* The room contains: alice,bob\n"
+        alice[1].close()
+        assert await carol[0].readline() == b"* alice has left the room\n"
+        dave = await connect()
+        dave[1].write(b"dave\n")
+        assert await dave[0].readline() == b"* The room contains: bob,carol\n"
+
+        for _, writer in (first, second, carol, dave):
+            writer.close()
+        server.close()
+
+    asyncio.run(run())
+
+
+def test_batched_writes_keep_order():
+    async def run():
+        session = await Chat.Session.create(
+            None, Writer(), "uuid", flush_window=0.01, batch_bytes=8
+        )
+        for i in range(3):
+            session.send(b"%d\n" % i)
+        await asyncio.sleep(0)
+        assert not session.writer.written  # Waiting for the window or a batch
+        session.send(b"3\n")
+        await asyncio.sleep(0)
+        assert session.writer.written == [b"0\n1\n2\n3\n"]
+        session.send(b"4\n")
+        session.send(b"5\n")
+        await asyncio.sleep(0.05)
+        assert session.writer.written[1:] == [b"4\n5\n"]
+        for i in range(6, 11):
+            session.send(b"%d\n" % i)
+        await session.close()
+        assert session.writer.written[2:] == [b"6\n7\n8\n9\n", b"10\n"]
+
+    asyncio.run(run())
+
+
+def test_reset_clients_leave_no_writer_tasks():
+    async def run():
+        chat = Chat()
+        server = await asyncio.start_server(chat.handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        for name in (b"alice", b"bob", b"carol"):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            await reader.readline()
+            writer.write(name + b"\n")
+            await reader.readline()
+            # Close with a reset instead of a clean end of stream
+            linger = struct.pack("ii", 1, 0)
+            writer.get_extra_info("socket").setsockopt(
+                socket.SOL_SOCKET, socket.SO_LINGER, linger
+            )
+            writer.transport.abort()
+        for _ in range(500):
+            writers = [
+                task
+                for task in asyncio.all_tasks()
+                if "Session._write" in repr(task.get_coro())
+            ]
+            if not chat.sessions and not writers:
+                break
+            await asyncio.sleep(0.01)
+        assert not chat.sessions
+        assert not writers
+        server.close()
+
+    asyncio.run(run())
@@ -0,0 +1,115 @@
+import asyncio
+
+from protohackers.m0003_budget_chat.shard import HIGH_WATER, Hub, ShardedChat
+
+
+class Transport:
+    def __init__(self, buffered=0):
+        self.buffered = buffered
+
+    def get_write_buffer_size(self):
+        return self.buffered
+
+
+class Worker:
+    """Writer of a worker that stopped reading."""
+
+    def __init__(self, buffered=0):
+        self.written = []
+        self.transport = Transport(buffered)
+
+    def write(self, data):
+        self.written.append(data)
+
+    def close(self):
+        pass
+
+    async def drain(self):
+        await asyncio.Event().wait()
+
+
+def test_rooms_share_roster_and_order(tmp_path):
+    async def run():
+        path = str(tmp_path / "hub.sock")
+        hub = await asyncio.start_unix_server(Hub().handle, path)
+        ports = []
+        for _ in range(2):
+            chat = ShardedChat()
+            await chat.connect(path)
+            server = await asyncio.start_server(chat.handle, "127.0.0.1", 0)
+            ports.append(server.sockets[0].getsockname()[1])
+
+        async def connect(port, name):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            await reader.readline()
+            writer.write(name + b"\n")
+            return reader, writer
+
+        alice = await connect(ports[0], b"alice")
+        assert await alice[0].readline() == b"* The room contains: \n"
+        bob = await connect(ports[1], b"bob")
+        assert await bob[0].readline() == b"* The room contains: alice\n"
+        assert await alice[0].readline() == b"* bob has entered the room\n"
+
+        # Names are unique across workers
+        other = await connect(ports[0], b"bob")
+        assert await other[0].read(100) == b"Undefined behaviour"
+
+        carol = await connect(ports[0], b"carol")
+        assert await carol[0].readline() == b"* The room contains: alice,bob\n"
+        dave = await connect(ports[1], b"dave")
+        assert await dave[0].readline() == b"* The room contains: alice,bob,carol\n"
+        for reader in (alice[0], alice[0], bob[0], bob[0], carol[0]):
+            await reader.readline()
+
+        for i in range(50):
+            alice[1].write(b"a%d\n" % i)
+            bob[1].write(b"b%d\n" % i)
+        seen = [await carol[0].readline() for _ in range(100)]
+        # Clients on different workers see the same interleaving
+        assert [await dave[0].readline() for _ in range(100)] == seen
+        # Each sender's order holds and alice sees bob's messages like carol
+        assert [line for line in seen if line.startswith(b"[alice]")] == [
+            b"[alice] a%d\n" % i for i in range(50)
+        ]
+        from_bob = [line for line in seen if line.startswith(b"[bob]")]
+        assert from_bob == [b"[bob] b%d\n" % i for i in range(50)]
+        assert [await alice[0].readline() for _ in range(50)] == from_bob
+
+        bob[1].close()
+        assert await carol[0].readline() == b"* bob has left the room\n"
+        for _, writer in (alice, other, carol, dave):
+            writer.close()
+        hub.close()
+
+    asyncio.run(run())
+
+
+def test_hub_only_waits_for_workers_over_high_water():
+    async def run():
+        hub = Hub()
+        behind, slow = Worker(HIGH_WATER + 1), Worker()
+        hub.workers[slow] = set()
+        reader = asyncio.StreamReader()
+        reader.feed_data(b"B  one\nB  two\n")
+        reader.feed_eof()
+        await asyncio.wait_for(hub.handle(reader, Worker()), 5)
+        assert slow.written == [b"B  one\n", b"B  two\n"]
+
+        hub.workers[behind] = set()
+        reader = asyncio.StreamReader()
+        reader.feed_data(b"B  three\n")
+        handler = asyncio.create_task(hub.handle(reader, Worker()))
+        await asyncio.sleep(0.01)
+        assert not handler.done()
+        handler.cancel()
+
+    asyncio.run(run())
+
+
+def test_sharded_names_must_be_alphanumeric():
+    chat = ShardedChat()
+    assert chat.validate_name("bob42") == "bob42"
+    # A space would split the name in hub events
+    for name in ("", "bob!", "a b", "-bob"):
+        assert chat.validate_name(name) is None
@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+from protohackers.framing import LineFramer, LineTooLongError, readline
+
+
+def test_lines_across_chunks():
+    framer = LineFramer(size=8)
+    received = []
+    for chunk in (b"hel", b"lo\nwor", b"ld\n\nrest"):
+        framer.feed(chunk)
+        received.extend(bytes(line) for line in framer.lines())
+    assert received == [b"hello", b"world", b""]
+    assert framer.flush() == b"rest"
+    assert len(framer) == 0
+
+
+def test_consumed_data_is_compacted():
+    framer = LineFramer(size=16)
+    for _ in range(1000):
+        framer.feed(b"0123456789\n")
+        assert framer.next_line() == b"0123456789"
+    assert len(framer._buffer) == 16
+
+
+def test_next_line_keepends():
+    framer = LineFramer()
+    framer.feed(b"a\nb")
+    assert framer.next_line(keepends=True) == b"a\n"
+    assert framer.next_line(keepends=True) is None
+
+
+def test_line_too_long_error():
+    framer = LineFramer(max_line=4)
+    framer.feed(b"1234\n12345")
+    assert framer.next_line() == b"1234"
+    with pytest.raises(LineTooLongError):
+        framer.next_line()
+
+
+def test_line_too_long_split():
+    framer = LineFramer(max_line=4, overflow="split")
+    framer.feed(b"123456789\n")
+    assert [bytes(line) for line in framer.lines()] == [b"1234", b"5678", b"9"]
+
+
+def test_readline_from_stream():
+    async def read_all():
+        reader = asyncio.StreamReader()
+        reader.feed_data(b"one\ntw")
+        reader.feed_data(b"o\nthree")
+        reader.feed_eof()
+        framer = LineFramer()
+        return [await readline(reader, framer) for _ in range(4)]
+
+    assert asyncio.run(read_all()) == [b"one", b"two", b"three", b""]
@@ -0,0 +1,23 @@
+import asyncio
+
+from protohackers.m0008_insecure_sockets_layer.obfuscate import Cipher
+from protohackers.m0008_insecure_sockets_layer.server import handle
+
+
+def test_answers_lines_of_any_length():
+    async def run():
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        reader, writer = await asyncio.open_connection(
+            "127.0.0.1", server.sockets[0].getsockname()[1]
+        )
+        spec = bytes.fromhex("027b050100")
+        cipher = Cipher(spec)
+        toys = ",".join(f"{n}x toy {n}" for n in range(20_000)) + "\n"
+        writer.write(spec + cipher.encrypt(toys.encode(), 0))
+        answer = b"19999x toy 19999\n"
+        received = await asyncio.wait_for(reader.readexactly(len(answer)), 5)
+        assert cipher.decrypt(received, 0) == answer
+        writer.close()
+        server.close()
+
+    asyncio.run(run())
@@ -0,0 +1,85 @@
+import asyncio
+from typing import List, Optional
+
+from protohackers.m0007_line_reversal import line_reversal
+from protohackers.m0007_line_reversal.line_reversal import (
+    SESSIONS,
+    LineReversalProtocol,
+    Scheduler,
+)
+
+
+class Timed:
+    def __init__(self, name: str, fired: List[str]) -> None:
+        self.name = name
+        self.fired = fired
+        self.deadline: Optional[float] = None
+
+    def timeout(self, now: float) -> None:
+        self.fired.append(self.name)
+
+
+def test_scheduler_runs_live_deadlines_in_order():
+    async def run():
+        loop = asyncio.get_running_loop()
+        scheduler = Scheduler(loop)
+        fired: List[str] = []
+        a, b, c = (Timed(name, fired) for name in "abc")
+        now = loop.time()
+        scheduler.schedule(a, now + 0.03)
+        scheduler.schedule(b, now + 0.01)
+        scheduler.schedule(c, now + 0.02)
+        scheduler.schedule(a, now + 0.005)  # Moved ahead of the others
+        scheduler.cancel(c)
+        await asyncio.sleep(0.06)
+        assert fired == ["a", "b"]
+        assert len(scheduler) == 0
+
+    asyncio.run(run())
+
+
+class Client(asyncio.DatagramProtocol):
+    def __init__(self) -> None:
+        self.received: asyncio.Queue = asyncio.Queue()
+
+    def datagram_received(self, data: bytes, address) -> None:
+        self.received.put_nowait(data.decode())
+
+
+def test_unacknowledged_data_is_retransmitted_until_expiry(monkeypatch):
+    monkeypatch.setattr(line_reversal, "RETRANSMIT", 0.05)
+    monkeypatch.setattr(line_reversal, "EXPIRY", 0.3)
+    SESSIONS.clear()
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        server, protocol = await loop.create_datagram_endpoint(
+            LineReversalProtocol, local_addr=("127.0.0.1", 0)
+        )
+        transport, client = await loop.create_datagram_endpoint(
+            Client, remote_addr=server.get_extra_info("sockname")
+        )
+        received = client.received
+        transport.sendto(b"/connect/1/")
+        assert await received.get() == "/ack/1/0/"
+        transport.sendto(b"/data/1/0/hello\n/")
+        assert {await received.get(), await received.get()} == {
+            "/ack/1/6/",
+            "/data/1/0/olleh\n/",
+        }
+        # Nothing acknowledged, sent again every RETRANSMIT seconds
+        assert await received.get() == "/data/1/0/olleh\n/"
+        assert await received.get() == "/data/1/0/olleh\n/"
+        transport.sendto(b"/ack/1/6/")
+        await asyncio.sleep(0.15)
+        assert received.empty()
+        assert SESSIONS["1"].deadline is None
+        # Never acknowledged, the session closes after EXPIRY seconds
+        transport.sendto(b"/data/1/6/again\n/")
+        await asyncio.sleep(0.4)
+        assert "1" not in SESSIONS
+        assert len(protocol.scheduler) == 0
+        transport.close()
+        server.close()
+
+    asyncio.run(run())
@@ -0,0 +1,34 @@
+import atexit
+import logging
+import logging.handlers
+
+from protohackers.log import get_logger, get_traffic_logger, setup_logging
+
+
+def test_setup_logging_writes_through_queue(capsys):
+    listener = setup_logging()
+    try:
+        assert isinstance(
+            logging.getLogger("protohackers").handlers[0], logging.handlers.QueueHandler
+        )
+        get_logger("test").info("Started %d", 1)
+        get_traffic_logger("test").debug("Message %r", b"data")
+    finally:
+        atexit.unregister(listener.stop)
+        listener.stop()
+    out = capsys.readouterr().out
+    assert "protohackers.test - INFO - Started 1" in out
+    assert "protohackers.traffic.test - DEBUG - Message b'data'" in out
+
+
+def test_setup_logging_without_traffic(capsys):
+    listener = setup_logging(traffic=False)
+    try:
+        assert not get_traffic_logger("test").isEnabledFor(logging.CRITICAL)
+        assert get_logger("test").isEnabledFor(logging.DEBUG)
+        get_traffic_logger("test").info("Message")
+    finally:
+        atexit.unregister(listener.stop)
+        listener.stop()
+        logging.getLogger("protohackers.traffic").setLevel(logging.NOTSET)
+    assert "Message" not in capsys.readouterr().out
@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+from protohackers.m0002_means_to_an_end import store as store_module
+from protohackers.m0002_means_to_an_end.store import (
+    CompactPriceStore,
+    DuplicateTimestampError,
+    PriceStore,
+)
+
+STORES = (PriceStore, CompactPriceStore)
+
+
+def mean(prices: dict, min_time: int, max_time: int) -> int:
+    keys = [key for key in prices if min_time <= key <= max_time]
+    return int(sum(prices[key] for key in keys) / len(keys)) if keys else 0
+
+
+@pytest.mark.parametrize("store", STORES)
+def test_example_session(store):
+    prices = store()
+    for time, price in ((12345, 101), (12346, 102), (12347, 100), (40960, 5)):
+        prices.insert(time, price)
+    assert prices.mean(12288, 16384) == 101
+    assert prices.mean(16384, 12288) == 0
+    assert prices.mean(0, 100) == 0
+
+
+@pytest.mark.parametrize("store", STORES)
+def test_duplicate_timestamp(store):
+    prices = store()
+    prices.insert(1, 10)
+    prices.insert(0, 10)
+    for time in (0, 1):
+        with pytest.raises(DuplicateTimestampError):
+            prices.insert(time, 20)
+    assert len(prices) == 2
+
+
+@pytest.mark.parametrize("sorted_share", (0.0, 0.9))
+@pytest.mark.parametrize("store", STORES)
+def test_random_inserts_match_dict(monkeypatch, store, sorted_share):
+    monkeypatch.setattr(store_module, "BLOCK", 4)
+    monkeypatch.setattr(store_module, "COMPACT_BLOCK", 4)
+    rng = random.Random(7)
+    prices, expected, latest = store(), {}, 0
+    for _ in range(2000):
+        if rng.random() < sorted_share:
+            latest = time = latest + rng.randint(1, 3)
+        else:
+            time = rng.randint(-1000, 1000)
+        if time not in expected:
+            price = rng.randint(-(2**31), 2**31 - 1)
+            prices.insert(time, price)
+            expected[time] = price
+        min_time, max_time = sorted(rng.randint(-1100, 4000) for _ in range(2))
+        assert prices.mean(min_time, max_time) == mean(expected, min_time, max_time)
+    assert len(prices) == len(expected)
@@ -0,0 +1,47 @@
+import random
+import re
+
+from protohackers.m0005_mob_in_the_middle.rewrite import ADDRESS, replace
+
+ALPHANUMERIC = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+WORDS = ["Hi", "send", "coins", "to", "please", "7", "7F1u3", "-", "[bob]", "ok?"]
+
+
+def reference_replace(data: bytes) -> bytes:
+    # The str based rewrite this replaced, kept to check it matches
+    pattern = re.compile(r"(?:(?<=\s)|(?<=^))(7[a-zA-Z0-9]{25,36})(?:(?=\s)|(?=$))")
+    message = data.decode(encoding="ascii")
+    for match in re.findall(pattern, message):
+        message = message.replace(match, ADDRESS.decode(encoding="ascii"))
+    return message.encode(encoding="ascii")
+
+
+def random_word(rng: random.Random) -> str:
+    kind = rng.random()
+    if kind < 0.6:
+        return rng.choice(WORDS)
+    # Addresses around the valid lengths, and ones not starting with a 7
+    length = rng.randint(23, 39)
+    first = "7" if kind < 0.9 else rng.choice("6A")
+    suffix = "".join(rng.choice(ALPHANUMERIC) for _ in range(length))
+    return first + suffix + ("-x" if kind > 0.95 else "")
+
+
+def test_matches_reference_on_random_lines():
+    rng = random.Random(5)
+    for _ in range(2000):
+        words = [random_word(rng) for _ in range(rng.randint(0, 8))]
+        separators = [rng.choice([" ", "  ", "\t"]) for _ in words]
+        line = "".join(w + s for w, s in zip(words, separators)).rstrip(" \t")
+        data = bytes(line + rng.choice(["\n", ""]), encoding="ascii")
+        assert replace(data) == reference_replace(data), data
+
+
+def test_rewrites_whole_words_only():
+    address = b"7F1u3wSD5RbOHQmupo9nx4TnhQ"
+    assert replace(b"Send to " + address + b"\n") == b"Send to " + ADDRESS + b"\n"
+    assert replace(address + b" " + address) == ADDRESS + b" " + ADDRESS
+    assert replace(b"x" + address + b"\n") == b"x" + address + b"\n"
+    assert replace(address + b"-1234\n") == address + b"-1234\n"
+    assert replace(b"7" + b"a" * 24 + b"\n") == b"7" + b"a" * 24 + b"\n"
+    assert replace(b"\xff " + address) == b"\xff " + ADDRESS
@@ -0,0 +1,116 @@
+import asyncio
+import functools
+
+from protohackers.m0005_mob_in_the_middle.mob import local_handle
+from protohackers.m0005_mob_in_the_middle.pool import UpstreamPool
+from protohackers.m0005_mob_in_the_middle.rewrite import ADDRESS
+from protohackers.m0005_mob_in_the_middle.stats import Stats
+
+
+async def upstream(greeting: bytes = b"Welcome\n"):
+    # Stand-in chat server, greets and then echoes lines
+    async def handle(reader, writer):
+        writer.write(greeting)
+        while line := await reader.readline():
+            writer.write(b"echo " + line)
+        writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+async def settle(pool: UpstreamPool, idle: int) -> None:
+    while pool.metrics()["idle"] < idle:
+        await asyncio.sleep(0.001)
+
+
+def test_sessions_take_pooled_connections():
+    async def run():
+        server, port = await upstream()
+        pool = UpstreamPool("127.0.0.1", port, size=2)
+        pool.start()
+        await settle(pool, 2)
+        for _ in range(3):
+            reader, writer = (await pool.acquire()).streams()
+            assert await reader.readline() == b"Welcome\n"
+            writer.close()
+            await settle(pool, 2)
+        metrics = pool.metrics()
+        assert (metrics["hits_total"], metrics["misses_total"]) == (3, 0)
+        assert metrics["connects_total"] == 5
+        assert metrics["connect_ms_max"] >= metrics["connect_ms_mean"] > 0
+        pool.close()
+        server.close()
+
+    asyncio.run(run())
+
+
+def test_stale_connections_are_replaced():
+    async def run():
+        server, port = await upstream()
+        pool = UpstreamPool("127.0.0.1", port, size=1, max_idle=0.05)
+        pool.start()
+        await settle(pool, 1)
+        first = pool._idle[0][0]
+        await asyncio.sleep(0.1)
+        assert first.transport.is_closing()
+        await settle(pool, 1)
+        assert pool._idle[0][0] is not first
+
+        pool.close()
+        server.close()
+
+        # Closed by the upstream while idle
+        server, port = await upstream(greeting=b"")
+        pool = UpstreamPool("127.0.0.1", port, size=1)
+        pool.start()
+        await settle(pool, 1)
+        pool._idle[0][0].eof_received()
+        reader, writer = (await pool.acquire()).streams()
+        assert not reader.at_eof()
+        assert (pool.hits, pool.misses) == (0, 1)
+        writer.close()
+        pool.close()
+        server.close()
+
+    asyncio.run(run())
+
+
+def test_unpooled_sessions_connect():
+    async def run():
+        server, port = await upstream()
+        pool = UpstreamPool("127.0.0.1", port, size=0)
+        pool.start()
+        reader, writer = (await pool.acquire()).streams()
+        assert await reader.readline() == b"Welcome\n"
+        assert (pool.hits, pool.misses, pool.connects) == (0, 1, 1)
+        writer.close()
+        pool.close()
+        server.close()
+
+    asyncio.run(run())
+
+
+def test_proxy_relays_through_the_pool():
+    async def run():
+        server, port = await upstream()
+        pool = UpstreamPool("127.0.0.1", port, size=1)
+        pool.start()
+        await settle(pool, 1)
+        proxy = await asyncio.start_server(
+            functools.partial(local_handle, pool=pool, stats=Stats()), "127.0.0.1", 0
+        )
+        reader, writer = await asyncio.open_connection(
+            "127.0.0.1", proxy.sockets[0].getsockname()[1]
+        )
+        assert await reader.readline() == b"Welcome\n"
+        writer.write(b"pay 7F1u3wSD5RbOHQmupo9nx4TnhQ\n")
+        # Rewritten on the way up and again on the way down
+        assert await reader.readline() == b"echo pay " + ADDRESS + b"\n"
+        assert pool.hits == 1
+        writer.close()
+        proxy.close()
+        pool.close()
+        server.close()
+
+    asyncio.run(run())
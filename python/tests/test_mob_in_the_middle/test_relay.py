@@ -0,0 +1,152 @@
+import asyncio
+import functools
+import random
+
+from protohackers.framing import MAX_LINE
+from protohackers.m0005_mob_in_the_middle.mob import local_handle
+from protohackers.m0005_mob_in_the_middle.pool import UpstreamPool
+from protohackers.m0005_mob_in_the_middle.relay import HIGH_WATER, ClientLeg
+from protohackers.m0005_mob_in_the_middle.rewrite import ADDRESS, Rewriter, replace
+from protohackers.m0005_mob_in_the_middle.stats import Stats
+
+TOKENS = [
+    b"7F1u3wSD5RbOHQmupo9nx4TnhQ",
+    b"7iKDZEwPZSqIvDnHvVN2r0hUWXD5rHX",
+    b"7" + b"a" * 36,
+    b"7" + b"a" * 37,
+    b"7abc",
+    b"hello",
+    b"x7F1u3wSD5RbOHQmupo9nx4TnhQ",
+    b"7F1u3wSD5RbOHQmupo9nx4TnhQ!",
+]
+
+
+def test_rewriter_matches_replace_on_any_chunking():
+    rng = random.Random(3)
+    for _ in range(500):
+        stream = b"".join(
+            rng.choice(TOKENS) + rng.choice([b" ", b"\n", b"\t", b"  "])
+            for _ in range(rng.randint(0, 10))
+        ) + rng.choice([b"", rng.choice(TOKENS)])
+        rewriter = Rewriter()
+        cuts = sorted(rng.sample(range(len(stream) + 1), min(len(stream), 5)))
+        chunks = [stream[a:b] for a, b in zip([0, *cuts], [*cuts, len(stream)])]
+        rewritten = b"".join(map(rewriter.feed, chunks)) + rewriter.flush()
+        assert rewritten == replace(stream), (stream, cuts)
+
+
+def test_rewriter_holds_back_only_a_possible_address():
+    rewriter = Rewriter()
+    assert rewriter.feed(b"pay 7F1u3wSD5R") == b"pay "
+    assert rewriter.feed(b"bOHQmupo9nx4TnhQ\nx") == ADDRESS + b"\nx"
+    assert rewriter.feed(b"y" * 100_000) == b"y" * 100_000
+    assert rewriter.feed(b" 7F1u3wSD5RbOHQmupo9nx4TnhQ") == b" "
+    assert rewriter.flush() == ADDRESS
+
+
+async def upstream(received: list):
+    async def handle(reader, writer):
+        writer.write(b"Welcome\n")
+        while data := await reader.read(65536):
+            received.append(data)
+            writer.write(data)
+            await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+def test_relays_lines_of_any_length():
+    async def run():
+        received: list = []
+        server, port = await upstream(received)
+        pool = UpstreamPool("127.0.0.1", port, size=1)
+        pool.start()
+        loop = asyncio.get_running_loop()
+        stats = Stats()
+        proxy = await loop.create_server(
+            lambda: ClientLeg(pool, stats), "127.0.0.1", 0
+        )
+        reader, writer = await asyncio.open_connection(
+            "127.0.0.1", proxy.sockets[0].getsockname()[1]
+        )
+        assert await reader.readline() == b"Welcome\n"
+        line = b"x" * 1_000_000 + b" 7F1u3wSD5RbOHQmupo9nx4TnhQ\n"
+        writer.write(line)
+        expected = b"x" * 1_000_000 + b" " + ADDRESS + b"\n"
+        assert await reader.readexactly(len(expected)) == expected
+        assert b"".join(received) == expected
+        writer.close()
+        proxy.close()
+        pool.close()
+        server.close()
+
+    asyncio.run(run())
+
+
+def test_streams_rewrite_lines_split_by_the_framer():
+    async def run():
+        received: list = []
+        server, port = await upstream(received)
+        pool = UpstreamPool("127.0.0.1", port, size=0)
+        proxy = await asyncio.start_server(
+            functools.partial(local_handle, pool=pool, stats=Stats()), "127.0.0.1", 0
+        )
+        reader, writer = await asyncio.open_connection(
+            "127.0.0.1", proxy.sockets[0].getsockname()[1]
+        )
+        assert await reader.readline() == b"Welcome\n"
+        address = b"7F1u3wSD5RbOHQmupo9nx4TnhQ"
+        # A piece starting inside a word, then an address across pieces
+        first = b"a" * (MAX_LINE - 1) + b"x" + address + b" "
+        second = b"b" * (2 * MAX_LINE - len(first) - 6) + b" " + address
+        line = first + second + b" end\n"
+        writer.write(line)
+        expected = line.replace(b" " + address, b" " + ADDRESS)
+        assert await reader.readexactly(len(expected)) == expected
+        assert b"".join(received) == expected
+        writer.close()
+        proxy.close()
+        server.close()
+
+    asyncio.run(run())
+
+
+def test_stalled_client_pauses_upstream():
+    async def run():
+        loop = asyncio.get_running_loop()
+        sent = 0
+
+        async def flood(reader, writer):
+            nonlocal sent
+            while not writer.is_closing():
+                writer.write(b"y" * 65536)
+                sent += 65536
+                await writer.drain()
+
+        server = await asyncio.start_server(flood, "127.0.0.1", 0)
+        pool = UpstreamPool("127.0.0.1", server.sockets[0].getsockname()[1], size=0)
+        legs = []
+
+        def client_leg():
+            legs.append(ClientLeg(pool, Stats()))
+            return legs[-1]
+
+        proxy = await loop.create_server(client_leg, "127.0.0.1", 0)
+        reader, writer = await asyncio.open_connection(
+            "127.0.0.1", proxy.sockets[0].getsockname()[1], limit=1024
+        )
+        writer.transport.pause_reading()
+        await asyncio.sleep(0.3)
+        stalled = sent
+        await asyncio.sleep(0.2)
+        # The upstream is blocked by the kernel buffers and the proxy holds
+        # no more than its write buffer limit
+        assert sent == stalled
+        assert legs[0].transport.get_write_buffer_size() <= 2 * HIGH_WATER + 262144
+        writer.close()
+        proxy.close()
+        server.close()
+
+    asyncio.run(run())
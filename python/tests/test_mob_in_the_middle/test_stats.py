@@ -0,0 +1,131 @@
+import asyncio
+import functools
+import json
+
+from protohackers.m0005_mob_in_the_middle.mob import local_handle
+from protohackers.m0005_mob_in_the_middle.pool import UpstreamPool
+from protohackers.m0005_mob_in_the_middle.relay import ClientLeg
+from protohackers.m0005_mob_in_the_middle import stats as stats_module
+from protohackers.m0005_mob_in_the_middle.stats import Direction, Stats
+
+ADDRESS = b"7F1u3wSD5RbOHQmupo9nx4TnhQ"
+
+
+def test_direction_counts_lines_and_latency():
+    direction = Direction()
+    direction.record(b"one\ntwo\nthr", 1, 0.0)
+    direction.record(b"ee", 0, 0.0)
+    assert (direction.bytes, direction.lines, direction.rewrites) == (13, 2, 1)
+    assert sum(direction.latency) == 2
+    total = Direction()
+    total.merge(direction)
+    total.merge(direction)
+    assert (total.bytes, total.lines, sum(total.latency)) == (26, 4, 4)
+
+
+async def echo(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    writer.write(b"Welcome\n")
+    while line := await reader.readline():
+        writer.write(line)
+    writer.close()
+
+
+async def fetch(port: int) -> dict:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET / HTTP/1.0\r\n\r\n")
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.0 200 OK")
+    return json.loads(body)
+
+
+def test_sessions_are_counted_and_served():
+    async def run(method: str):
+        upstream = await asyncio.start_server(echo, "127.0.0.1", 0)
+        pool = UpstreamPool("127.0.0.1", upstream.sockets[0].getsockname()[1], 0)
+        stats = Stats()
+        if method == "protocol":
+            loop = asyncio.get_running_loop()
+            proxy = await loop.create_server(
+                lambda: ClientLeg(pool, stats), "127.0.0.1", 0
+            )
+        else:
+            proxy = await asyncio.start_server(
+                functools.partial(local_handle, pool=pool, stats=stats),
+                "127.0.0.1",
+                0,
+            )
+        endpoint = await asyncio.start_server(stats.handle, "127.0.0.1", 0)
+        endpoint_port = endpoint.sockets[0].getsockname()[1]
+
+        reader, writer = await asyncio.open_connection(
+            "127.0.0.1", proxy.sockets[0].getsockname()[1]
+        )
+        await reader.readline()
+        writer.write(b"hi\npay " + ADDRESS + b"\n")
+        await reader.readline()
+        await reader.readline()
+
+        counters = await fetch(endpoint_port)
+        assert counters["sessions"] == {"open": 1, "total": 1}
+        (session,) = counters["open"]
+        assert session["connect_seconds"] > 0
+        assert session["up"]["bytes"] == 3 + 5 + len(ADDRESS)
+        assert (session["up"]["lines"], session["up"]["rewrites"]) == (2, 1)
+        # Rewritten again on the way back
+        assert (session["down"]["lines"], session["down"]["rewrites"]) == (3, 1)
+        assert sum(session["down"]["latency_us"]["lines"]) == 3
+
+        writer.close()
+        while stats.sessions:
+            await asyncio.sleep(0.001)
+        counters = await fetch(endpoint_port)
+        assert counters["sessions"] == {"open": 0, "total": 1}
+        assert counters["up"]["lines"] == 2
+        assert counters["open"] == []
+        for server in (proxy, endpoint, upstream):
+            server.close()
+
+    for method in ("protocol", "streams"):
+        asyncio.run(run(method))
+
+
+def test_answers_a_client_sending_no_request(monkeypatch):
+    monkeypatch.setattr(stats_module, "REQUEST_TIMEOUT", 0.01)
+
+    async def run():
+        endpoint = await asyncio.start_server(Stats().handle, "127.0.0.1", 0)
+        reader, writer = await asyncio.open_connection(
+            "127.0.0.1", endpoint.sockets[0].getsockname()[1]
+        )
+        response = await asyncio.wait_for(reader.read(), 5)
+        assert response.startswith(b"HTTP/1.0 200 OK")
+        writer.close()
+        endpoint.close()
+
+    asyncio.run(run())
+
+
+class ResetWriter:
+    closed = False
+
+    def write(self, data):
+        pass
+
+    async def drain(self):
+        raise ConnectionResetError
+
+    def close(self):
+        self.closed = True
+
+
+def test_client_resetting_mid_answer_is_closed():
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(b"GET / HTTP/1.0\r\n\r\n")
+        writer = ResetWriter()
+        await Stats().handle(reader, writer)
+        assert writer.closed
+
+    asyncio.run(run())
@@ -0,0 +1,56 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from protohackers.m0001_prime_time.cache import PrimeCache
+from protohackers.m0001_prime_time.primality import is_prime
+
+
+def test_lru_evicts_least_recently_used():
+    cache = PrimeCache(max_size=2, policy="lru")
+    cache.get_or_compute(2, is_prime)
+    cache.get_or_compute(4, is_prime)
+    cache.get_or_compute(2, is_prime)
+    cache.get_or_compute(5, is_prime)
+    cache.get_or_compute(2, is_prime)
+    stats = cache.stats
+    assert (stats.hits, stats.misses, stats.evictions, stats.size) == (2, 3, 1, 2)
+
+
+def test_fifo_evicts_oldest():
+    cache = PrimeCache(max_size=2, policy="fifo")
+    cache.get_or_compute(2, is_prime)
+    cache.get_or_compute(4, is_prime)
+    cache.get_or_compute(2, is_prime)
+    cache.get_or_compute(5, is_prime)
+    cache.get_or_compute(2, is_prime)
+    stats = cache.stats
+    assert (stats.hits, stats.misses, stats.evictions) == (1, 4, 2)
+
+
+def test_concurrent_lookups_share_one_computation():
+    cache = PrimeCache()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow_is_prime(num: int) -> bool:
+        calls.append(num)
+        started.set()
+        release.wait()
+        return is_prime(num)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        first = pool.submit(cache.get_or_compute, 2**61 - 1, slow_is_prime)
+        started.wait()
+        others = [
+            pool.submit(cache.get_or_compute, 2**61 - 1, slow_is_prime)
+            for _ in range(3)
+        ]
+        deadline = time.monotonic() + 5
+        while cache.stats.coalesced < 3 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        release.set()
+        assert cache.stats.coalesced == 3
+        assert first.result() and all(other.result() for other in others)
+    assert calls == [2**61 - 1]
+    assert cache.stats.misses == 1
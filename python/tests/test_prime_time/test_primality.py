@@ -0,0 +1,36 @@
+from math import isqrt
+
+from protohackers.m0001_prime_time.primality import is_prime
+
+
+def trial_division(num: int) -> bool:
+    return num >= 2 and all(num % i for i in range(2, isqrt(num) + 1))
+
+
+def test_small_numbers_match_trial_division():
+    for num in range(-10, 20000):
+        assert is_prime(num) == trial_division(num)
+
+
+def test_strong_pseudoprimes_are_composite():
+    # Smallest strong pseudoprimes to the first few prime bases
+    for num in (
+        3215031751,
+        2152302898747,
+        3474749660383,
+        341550071728321,
+        3825123056546413051,
+        318665857834031151167461,
+        3317044064679887385961981,
+    ):
+        assert not is_prime(num)
+
+
+def test_large_primes():
+    for num in (2**61 - 1, 2**89 - 1, 2**127 - 1, 2**521 - 1, 18446744073709551557):
+        assert is_prime(num)
+
+
+def test_large_composites():
+    assert not is_prime((2**61 - 1) * (2**89 - 1))
+    assert not is_prime((2**127 - 1) ** 2)
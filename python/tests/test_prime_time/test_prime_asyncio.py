@@ -0,0 +1,52 @@
+import asyncio
+
+from protohackers.m0001_prime_time.cache import PrimeCache
+from protohackers.m0001_prime_time.offload import Offloader
+from protohackers.m0001_prime_time.prime_asyncio import process
+from protohackers.m0001_prime_time.protocol import Checker
+
+
+def test_batch_answers_in_order():
+    lines = [
+        b'{"method":"isPrime","number":7}',
+        b'{"method":"isPrime","number":8}',
+        b'{"method":"isPrime","number":7.0}',
+    ]
+    checker = Checker(PrimeCache(), Offloader(0))
+    response, malformed = asyncio.run(process(lines, checker))
+    assert not malformed
+    assert response == (
+        b'{"method":"isPrime","prime":true}\n'
+        b'{"method":"isPrime","prime":false}\n'
+        b'{"method":"isPrime","prime":false}\n'
+    )
+
+
+def test_malformed_request_ends_batch():
+    lines = [
+        b'{"method":"isPrime","number":7}',
+        b'{"method":"isPrime","number":"7"}',
+        b'{"method":"isPrime","number":7}',
+    ]
+    checker = Checker(PrimeCache(), Offloader(0))
+    response, malformed = asyncio.run(process(lines, checker))
+    assert malformed
+    assert response == b'{"method":"isPrime","prime":true}\n{}'
+
+
+def test_offloaded_answers_keep_order():
+    lines = [
+        b'{"method":"isPrime","number":%d}' % (2**127 - 1),
+        b'{"method":"isPrime","number":8}',
+        b'{"method":"isPrime","number":%d}' % (2**127 + 1),
+    ]
+    offloader = Offloader(workers=1, threshold=64)
+    try:
+        response, _ = asyncio.run(process(lines, Checker(PrimeCache(), offloader)))
+    finally:
+        offloader.close()
+    assert response == (
+        b'{"method":"isPrime","prime":true}\n'
+        b'{"method":"isPrime","prime":false}\n'
+        b'{"method":"isPrime","prime":false}\n'
+    )
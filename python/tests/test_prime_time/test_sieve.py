@@ -0,0 +1,27 @@
+from protohackers.m0001_prime_time import sieve
+from protohackers.m0001_prime_time.primality import is_prime
+from protohackers.m0001_prime_time.sieve import Sieve
+
+
+def test_sieve_matches_primality():
+    for limit in (1, 2, 3, 10, 17, 1000, 54321):
+        bits = Sieve(limit, sieve.generate(limit))
+        assert all(bits.is_prime(num) == is_prime(num) for num in range(-2, limit))
+
+
+def test_segments(monkeypatch):
+    monkeypatch.setattr(sieve, "SEGMENT", 64)
+    bits = Sieve(10007, sieve.generate(10007))
+    assert all(bits.is_prime(num) == is_prime(num) for num in range(10007))
+
+
+def test_load_saves_and_maps(tmp_path):
+    path = str(tmp_path / "sieve.bin")
+    first = Sieve.load(path, 10000)
+    first.close()
+    mapped = Sieve.load(path, 10000)
+    assert all(mapped.is_prime(num) == is_prime(num) for num in range(10000))
+    mapped.close()
+    other = Sieve.load(path, 5000)
+    assert other.limit == 5000 and other.is_prime(4999)
+    other.close()
@@ -0,0 +1,51 @@
+import os
+
+from protohackers.m0004_unusual_database_program.durable import DurableStore
+from protohackers.m0004_unusual_database_program.store import VERSION
+
+
+def test_inserts_survive_restart(tmp_path):
+    store = DurableStore(str(tmp_path), commit_records=2)
+    for request in (b"a=1", b"b=2", b"a=3", b"version=x", b"c=caf\xc3\xa9"):
+        store.handle(request)
+    store.close()
+
+    store = DurableStore(str(tmp_path))
+    assert store.handle(b"a") == b"a=3"
+    assert store.handle(b"b") == b"b=2"
+    assert store.handle(b"c") == b"c=caf\xc3\xa9"
+    assert store.handle(b"version") == b"version=" + VERSION
+    store.close()
+
+
+def test_snapshot_replaces_logs(tmp_path):
+    store = DurableStore(str(tmp_path))
+    for i in range(100):
+        store.handle(b"key%d=%d" % (i % 10, i))
+    store.snapshot()
+    store.handle(b"key0=after")
+    store.close()
+    assert sorted(os.listdir(tmp_path)) == ["log.1", "snapshot"]
+
+    store = DurableStore(str(tmp_path))
+    assert store.handle(b"key0") == b"key0=after"
+    assert store.handle(b"key9") == b"key9=99"
+    store.close()
+
+
+def test_torn_log_tail_is_dropped(tmp_path):
+    store = DurableStore(str(tmp_path))
+    store.handle(b"a=1")
+    store.handle(b"b=2")
+    store.close()
+    log = tmp_path / "log.0"
+    log.write_bytes(log.read_bytes()[:-1])
+
+    store = DurableStore(str(tmp_path))
+    assert store.handle(b"a") == b"a=1"
+    assert store.handle(b"b") == b"b="
+    store.handle(b"c=3")
+    store.close()
+    store = DurableStore(str(tmp_path))
+    assert store.handle(b"c") == b"c=3"
+    store.close()
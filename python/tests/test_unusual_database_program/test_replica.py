@@ -0,0 +1,124 @@
+import asyncio
+import socket
+
+from protohackers.m0004_unusual_database_program.kv import KvServerProtocol
+from protohackers.m0004_unusual_database_program.replica import (
+    ACK,
+    PrimaryStore,
+    ReplicaStore,
+)
+from protohackers.m0004_unusual_database_program.store import VERSION
+
+
+async def listen(store):
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(
+        lambda: KvServerProtocol(store), local_addr=("127.0.0.1", 0)
+    )
+    return transport
+
+
+async def retrieve(client, address, key: bytes) -> bytes:
+    loop = asyncio.get_running_loop()
+    client.sendto(key, address)
+    return await asyncio.wait_for(loop.sock_recv(client, 1000), 1)
+
+
+def test_primary_and_two_replicas(tmp_path):
+    async def run():
+        path = str(tmp_path / "primary.sock")
+        primary = PrimaryStore(heartbeat=0.005)
+        primary.insert(b"before", b"replicas")
+        server = await asyncio.start_unix_server(primary.replicate, path)
+        heartbeats = asyncio.create_task(primary.send_heartbeats())
+        replicas = [ReplicaStore(max_lag=0.5) for _ in range(2)]
+        followers = [asyncio.create_task(r.follow(path)) for r in replicas]
+        transports = [await listen(store) for store in (primary, *replicas)]
+        primary_address, *replica_addresses = [
+            t.get_extra_info("sockname") for t in transports
+        ]
+        client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        client.setblocking(False)
+
+        for i in range(100):
+            client.sendto(b"key%d=%d" % (i % 10, i), primary_address)
+        client.sendto(b"version=1", primary_address)
+        assert await retrieve(client, primary_address, b"key9") == b"key9=99"
+        # Acknowledged by the heartbeats once applied
+        while primary.metrics()["lag_records_max"] or primary.metrics()["syncing"]:
+            await asyncio.sleep(0.005)
+        assert primary.metrics()["replicas"] == 2
+        for address in replica_addresses:
+            assert await retrieve(client, address, b"key9") == b"key9=99"
+            assert await retrieve(client, address, b"before") == b"before=replicas"
+            assert await retrieve(client, address, b"version") == b"version=" + VERSION
+            # Replicas are read-only
+            client.sendto(b"key0=replica", address)
+            assert await retrieve(client, address, b"key0") == b"key0=90"
+        for replica in replicas:
+            metrics = replica.metrics()
+            assert metrics["sequence"] == 101
+            assert metrics["lag_seconds"] < 0.5
+            assert metrics["retrieves_total"] == 4
+
+        # Without the primary a replica stops answering once too stale
+        heartbeats.cancel()
+        await asyncio.sleep(0.6)
+        client.sendto(b"key0", replica_addresses[0])
+        await asyncio.sleep(0.05)
+        assert replicas[0].refused == 1
+
+        client.close()
+        for transport in transports:
+            transport.close()
+        server.close()
+        for follower in followers:
+            follower.cancel()
+
+    asyncio.run(run())
+
+
+def test_lagging_replica_is_dropped(tmp_path):
+    async def run():
+        path = str(tmp_path / "primary.sock")
+        primary = PrimaryStore(max_buffer=1000)
+        server = await asyncio.start_unix_server(primary.replicate, path)
+        # A replica that acknowledges once and then stops reading
+        reader, writer = await asyncio.open_unix_connection(path)
+        await asyncio.sleep(0.01)
+        writer.write(b"\0" * 8)
+        await asyncio.sleep(0.01)
+        assert primary.metrics()["syncing"] == 0
+        writer.transport.pause_reading()
+        for i in range(100_000):
+            primary.insert(b"key", b"value %d" % i)
+            if not primary.replicas:
+                break
+            await asyncio.sleep(0)
+        assert primary.metrics()["replicas"] == 0
+        writer.close()
+        server.close()
+
+    asyncio.run(run())
+
+
+class Writer:
+    def write(self, data):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_late_ack_does_not_revive_dropped_replica():
+    async def run():
+        primary = PrimaryStore()
+        reader, writer = asyncio.StreamReader(), Writer()
+        replicate = asyncio.create_task(primary.replicate(reader, writer))
+        await asyncio.sleep(0)
+        del primary.replicas[writer]  # Dropped for lagging, as _send does
+        reader.feed_data(ACK.pack(1))
+        await asyncio.wait_for(replicate, 1)
+        assert writer not in primary.replicas
+
+    asyncio.run(run())
@@ -0,0 +1,115 @@
+import multiprocessing
+import socket
+import threading
+
+from protohackers.m0004_unusual_database_program.engine import UdpEngine, bind
+from protohackers.m0004_unusual_database_program.shared import (
+    SharedStore,
+    SharedTable,
+)
+from protohackers.m0004_unusual_database_program.store import VERSION
+
+WORKERS = 3
+CLIENTS = 4
+ROUNDS = 50
+
+
+def test_table_probes_and_fills():
+    table = SharedTable(8)
+    keys = [b"key%d" % i for i in range(6)]
+    for i, key in enumerate(keys):
+        assert table.put(key, b"%d" % i)
+    assert table.put(b"key0", b"new")
+    assert not table.put(b"one too many", b"")
+    assert [table.get(key) for key in keys] == [b"new", b"1", b"2", b"3", b"4", b"5"]
+    assert table.get(b"missing") is None
+    assert len(table) == 6
+    table.close()
+
+
+def test_version_is_immutable():
+    store = SharedStore(16)
+    assert store.handle(b"version=1") is None
+    assert store.handle(b"version") == b"version=" + VERSION
+    assert store.handle(b"empty=") is None
+    assert store.handle(b"empty") == b"empty="
+    store.close()
+
+
+def put(table: SharedTable, key: bytes, value: bytes) -> None:
+    table.put(key, value)
+    table.close()
+
+
+def test_table_is_shared_with_spawned_processes():
+    spawn = multiprocessing.get_context("spawn")
+    table = SharedTable(16, spawn)
+    process = spawn.Process(
+        target=put, args=(table, b"key", b"from a spawned process")
+    )
+    process.start()
+    process.join()
+    assert process.exitcode == 0
+    assert table.get(b"key") == b"from a spawned process"
+    table.close()
+
+
+def serve(engine: UdpEngine) -> None:
+    engine.serve_forever()
+
+
+def client(address, key: bytes, errors: list) -> None:
+    writer = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    readers = [socket.socket(socket.AF_INET, socket.SOCK_DGRAM) for _ in range(3)]
+    for sock in (writer, *readers):
+        sock.settimeout(2)
+    try:
+        for i in range(ROUNDS):
+            expected = b"%s=%d" % (key, i)
+            writer.sendto(expected, address)
+            writer.sendto(key, address)
+            # The retrieve on the socket of the insert reaches the same worker
+            # after it, the reply acknowledges the insert
+            assert writer.recv(1000) == expected  # nosec
+            for reader in readers:
+                reader.sendto(key, address)
+                reply = reader.recv(1000)
+                if reply != expected:
+                    errors.append((expected, reply))
+    except Exception as error:  # Reported by the test thread
+        errors.append(error)
+    finally:
+        for sock in (writer, *readers):
+            sock.close()
+
+
+def test_workers_read_their_writes():
+    store = SharedStore(1024)
+    sockets = [bind(("127.0.0.1", 0))]
+    address = sockets[0].getsockname()
+    sockets += [bind(address) for _ in range(WORKERS - 1)]
+    workers = [
+        multiprocessing.Process(
+            target=serve, args=(UdpEngine(store, sock),), daemon=True
+        )
+        for sock in sockets
+    ]
+    for worker in workers:
+        worker.start()
+    for sock in sockets:
+        sock.close()
+
+    errors: list = []
+    clients = [
+        threading.Thread(target=client, args=(address, b"key%d" % i, errors))
+        for i in range(CLIENTS)
+    ]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    for worker in workers:
+        worker.terminate()
+        worker.join()
+    store.close()
+    assert errors == []
@@ -0,0 +1,47 @@
+import socket
+
+from protohackers.m0004_unusual_database_program.engine import UdpEngine, bind
+from protohackers.m0004_unusual_database_program.store import VERSION, KvStore
+
+
+def test_insert_and_retrieve():
+    store = KvStore()
+    assert store.handle(b"foo=bar") is None
+    assert store.handle(b"foo") == b"foo=bar"
+    assert store.handle(b"foo=bar=baz") is None
+    assert store.handle(b"foo") == b"foo=bar=baz"
+    assert store.handle(b"=empty key") is None
+    assert store.handle(b"") == b"=empty key"
+    assert store.handle(b"missing") == b"missing="
+
+
+def test_version_is_immutable():
+    store = KvStore()
+    assert store.handle(b"version=1") is None
+    assert store.handle(b"version") == b"version=" + VERSION
+
+
+def test_cached_response_follows_inserts():
+    store = KvStore()
+    assert store.handle(b"k=1") is None
+    assert store.handle(b"k") == b"k=1"
+    assert store.handle(b"k=2") is None
+    assert store.handle(memoryview(bytearray(b"k"))) == b"k=2"
+    assert store.handle(b"\xff=\xfe") is None
+    assert store.handle(b"\xff") == b"\xff=\xfe"
+
+
+def test_engine_answers_a_batch():
+    server = bind(("127.0.0.1", 0))
+    engine = UdpEngine(KvStore(), server, batch=4)
+    client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    client.settimeout(1)
+    address = server.getsockname()
+    for request in (b"a=1", b"a", b"b=2", b"b", b"x" * 1000, b"c"):
+        client.sendto(request, address)
+    assert engine.poll() == 4
+    assert engine.poll() == 2
+    assert engine.poll() == 0
+    assert [client.recv(1000) for _ in range(3)] == [b"a=1", b"b=2", b"c="]
+    client.close()
+    server.close()